@@ -5,6 +5,7 @@ const path = require('path');
 const jwt = require('jsonwebtoken');
 const bcrypt = require('bcryptjs');
 const fs = require('fs');
+const crypto = require('crypto');
 
 // Load users
 const USERS_FILE = path.join(__dirname, 'users.json');
@@ -65,6 +66,17 @@ const clients = new Map();
 const assignedPCs = new Set(); // Track which PC names are assigned
 const statusListeners = new Set(); // Track connections that want status updates
 const HEARTBEAT_INTERVAL = 10000; // 10 seconds
+const RESUME_GRACE_MS = 30000; // keep a dropped PC's slot this long for a resume
+const COMMAND_REPLAY_TTL_MS = 15000; // older unacknowledged commands are not replayed
+const FIRE_LEAD_MS = 250; // dual bets fire this long after dispatch so both PCs can prepare
+const BET_ACK_TIMEOUT_MS = 1500; // a live PC acknowledges placeBet within about one round trip
+const BET_COMPLETION_GRACE_MS = 2000; // slack on top of the duration a PC predicts for its bet
+let nextCmdId = 1;
+
+// Wall-clock time with sub-millisecond resolution, used for client clock sync
+function nowMs() {
+  return performance.timeOrigin + performance.now();
+}
 
 // New: room structure per user
 const rooms = new Map(); // user -> {clients,map}
@@ -72,9 +84,11 @@ const rooms = new Map(); // user -> {clients,map}
 function getRoom(user) {
   if (!rooms.has(user)) {
     rooms.set(user, {
+      id: user,
       clients: new Map(), // clientId -> clientData
       assignedPCs: new Set(),
       statusListeners: new Set(),
+      sessions: new Map(), // resumeToken -> { pc, ws, pending: Map(cmdId -> { message, sentAt }), expiry }
     });
   }
   return rooms.get(user);
@@ -91,6 +105,7 @@ wss.on('connection', (ws, req) => {
   let clientUser = null;
 
   ws.on('message', (message) => {
+    const receivedAt = nowMs();
     try {
       const data = JSON.parse(message);
       console.log('Received:', data);
@@ -138,6 +153,10 @@ wss.on('connection', (ws, req) => {
         
         clientUser = payload.user;
         room = getRoom(clientUser);
+        // Reconnecting desktop client: take back its PC slot instead of a new assignment
+        if (data.resume) {
+          resumeSession(ws, room, clientId, data.resume);
+        }
         // proceed; do not process further this initial hello
         return;
       }
@@ -147,9 +166,47 @@ wss.on('connection', (ws, req) => {
         if (room && room.clients.has(clientId)) {
           room.clients.get(clientId).isAlive = true;
         }
+        if (data.t0 != null) {
+          ws.send(JSON.stringify({ type: 'clockSync', t0: data.t0, t1: receivedAt, t2: nowMs() }));
+        }
         return; // no further processing
       }
 
+      // Clock sync request: echo the client's send time with our receive/send times
+      if (data.type === 'clockPing') {
+        ws.send(JSON.stringify({ type: 'clockSync', t0: data.t0, t1: receivedAt, t2: nowMs() }));
+        return;
+      }
+
+      // Completion of a command removes it from the resume replay list
+      if (data.cmdId != null && ['betSuccess', 'betError', 'cancelSuccess', 'cancelError'].includes(data.type)) {
+        acknowledgeCommand(room, ws, data.cmdId);
+      }
+
+      // Reconnect and clock statistics reported by desktop clients
+      if (data.type === 'clientMetrics') {
+        console.log(`Client metrics from ${data.pc}:`, data.metrics);
+        if (data.metrics && data.metrics.clock) {
+          const { offsetMs, rttMs } = data.metrics.clock;
+          console.log(`${data.pc} clock offset ${offsetMs} ms (rtt ${rttMs} ms)`);
+        }
+        for (const client of room.clients.values()) {
+          if (client.ws === ws) client.metrics = data.metrics;
+        }
+        return;
+      }
+
+      if (data.type === 'clientReady') {
+        console.log(`${data.pc} ready after ${data.totalMs} ms warm-up:`, data.warmUpMs);
+        if (data.errors && Object.keys(data.errors).length) {
+          console.warn(`${data.pc} warm-up errors:`, data.errors);
+        }
+        for (const client of room.clients.values()) {
+          if (client.ws === ws) client.warmUp = { ms: data.warmUpMs, totalMs: data.totalMs, errors: data.errors };
+        }
+        return;
+      }
+
       // Handle status listener registration
       if (data.type === 'registerStatusListener') {
         if (!room) return;
@@ -205,11 +262,17 @@ wss.on('connection', (ws, req) => {
           isAlive: true,
         });
 
+        // Token the client presents on reconnect to keep this PC slot
+        const resumeToken = crypto.randomBytes(16).toString('hex');
+        room.sessions.set(resumeToken, { pc: data.pc, ws, pending: new Map(), expiry: null });
+        ws.resumeToken = resumeToken;
+
         ws.send(
           JSON.stringify({
             type: 'registered',
             clientId: clientId,
             pc: data.pc,
+            resumeToken,
           }),
         );
 
@@ -219,6 +282,31 @@ wss.on('connection', (ws, req) => {
         delete ws.tempAssignedPC;
       }
 
+      // PC decoded a placeBet: it is alive, so wait for its own estimate instead of the ack timeout
+      if (data.type === 'betAck') {
+        const activeBet = activeBets.get(betKey(room, data.table));
+        const entry = activeBet && activeBet[data.pc];
+        console.log(`${data.pc} acknowledged bet (predicted ${data.predictedMs} ms)`);
+        if (entry && entry.cmdId === data.cmdId && entry.status === 'pending') {
+          entry.status = 'acked';
+          entry.ackedAt = Date.now();
+          entry.predictedMs = data.predictedMs;
+          armBetWatchdog(room, activeBet.betId, data.pc, (Number(data.predictedMs) || 0) + BET_COMPLETION_GRACE_MS, 'did not finish in time', data.table);
+        }
+        return;
+      }
+
+      // Chip placed: push the completion deadline out by the PC's remaining estimate
+      if (data.type === 'betProgress') {
+        const activeBet = activeBets.get(betKey(room, data.table));
+        const entry = activeBet && activeBet[data.pc];
+        if (entry && entry.cmdId === data.cmdId && isOutstanding(entry)) {
+          entry.placed = data.placed;
+          armBetWatchdog(room, activeBet.betId, data.pc, (Number(data.remainingMs) || 0) + BET_COMPLETION_GRACE_MS, 'stalled while placing chips', data.table);
+        }
+        return;
+      }
+
       // Handle bet error
       if (data.type === 'betError') {
         console.log(`Bet error from ${data.pc}:`, data.message);
@@ -238,6 +326,7 @@ wss.on('connection', (ws, req) => {
               JSON.stringify({
                 type: 'betError',
                 pc: data.pc,
+                table: data.table,
                 message: data.message,
                 platform: data.platform,
                 amount: data.amount,
@@ -254,23 +343,31 @@ wss.on('connection', (ws, req) => {
         });
 
         // Handle bet failure for simultaneous betting
-        const activeBet = activeBets.get(room.id);
-        if (activeBet) {
+        const key = betKey(room, data.table);
+        const activeBet = activeBets.get(key);
+        if (activeBet && !isResultFor(activeBet, data)) {
+          // A late result of an earlier bet must not fail (and cancel) the one in flight
+          console.log(`Ignoring betError from ${data.pc} for another bet (cmdId ${data.cmdId}, betId ${data.betId})`);
+        } else if (activeBet) {
           // Mark this PC as failed
+          clearTimeout(activeBet[data.pc].watchdog);
           activeBet[data.pc] = { status: 'failed', error: data.message, errorType: data.errorType };
           
           // Cancel the opposite PC's bet if it's still pending
           const oppositePC = data.pc === 'PC1' ? 'PC2' : 'PC1';
-          if (activeBet[oppositePC] && activeBet[oppositePC].status === 'pending') {
+          if (activeBet[oppositePC] && isOutstanding(activeBet[oppositePC])) {
             console.log(`Cancelling bet on ${oppositePC} due to failure on ${data.pc}`);
-            sendCancelBet(oppositePC, data.platform, data.amount, data.side, room);
+            clearTimeout(activeBet[oppositePC].watchdog);
+            sendCancelBet(oppositePC, data.platform, data.amount, data.side, room, data.table);
             activeBet[oppositePC] = { status: 'cancelled', reason: `Cancelled due to failure on ${data.pc}` };
           }
           
           // Clean up the bet tracking after a short delay
           setTimeout(() => {
-            activeBets.delete(room.id);
-            console.log(`Cleaned up bet tracking for room ${room.id}`);
+            if (activeBets.get(key) === activeBet) {
+              activeBets.delete(key);
+              console.log(`Cleaned up bet tracking for ${key}`);
+            }
           }, 5000);
         } else {
           // For single PC bets, don't automatically cancel the opposite PC
@@ -279,21 +376,34 @@ wss.on('connection', (ws, req) => {
         }
       }
 
+      // A failed cancel is not a bet failure: report it without touching bet tracking
+      if (data.type === 'cancelError') {
+        console.log(`Cancel error from ${data.pc}:`, data.errorType, data.message);
+        return;
+      }
+
       // Handle bet success
       if (data.type === 'betSuccess') {
         console.log(`Bet success from ${data.pc}:`, data);
+        if (data.skewMs != null) {
+          console.log(`${data.pc} fired ${data.skewMs} ms from the scheduled instant`);
+        }
         
         // Handle bet success for simultaneous betting
-        const activeBet = activeBets.get(room.id);
-        if (activeBet) {
+        const key = betKey(room, data.table);
+        const activeBet = activeBets.get(key);
+        if (activeBet && !isResultFor(activeBet, data)) {
+          console.log(`Ignoring betSuccess from ${data.pc} for another bet (cmdId ${data.cmdId}, betId ${data.betId})`);
+        } else if (activeBet) {
           // Mark this PC as successful
-          activeBet[data.pc] = { status: 'success', timestamp: Date.now() };
+          clearTimeout(activeBet[data.pc].watchdog);
+          activeBet[data.pc] = { status: 'success', timestamp: Date.now(), skewMs: data.skewMs };
           
           // Check if both PCs have completed
           const pc1Status = activeBet.PC1.status;
           const pc2Status = activeBet.PC2.status;
           
-          if (pc1Status !== 'pending' && pc2Status !== 'pending') {
+          if (!isOutstanding(activeBet.PC1) && !isOutstanding(activeBet.PC2)) {
             // Both PCs have completed (success or failure)
             if (pc1Status === 'success' && pc2Status === 'success') {
               console.log(`Both PCs successfully placed bets for ${activeBet.betId}`);
@@ -302,8 +412,8 @@ wss.on('connection', (ws, req) => {
             }
             
             // Clean up the bet tracking
-            activeBets.delete(room.id);
-            console.log(`Cleaned up bet tracking for room ${room.id}`);
+            activeBets.delete(key);
+            console.log(`Cleaned up bet tracking for ${key}`);
           }
         }
       }
@@ -322,12 +432,16 @@ wss.on('connection', (ws, req) => {
     if (room) {
       for (const [id, client] of room.clients.entries()) {
         if (client.ws === ws) {
-          // Free up the PC assignment
-          if (client.pc) {
+          room.clients.delete(id);
+          const session = ws.resumeToken ? room.sessions.get(ws.resumeToken) : null;
+          if (session) {
+            // Hold the slot for a while so the client can resume it
+            if (session.ws === ws) detachSession(room, ws.resumeToken, session);
+          } else if (client.pc) {
+            // Free up the PC assignment
             room.assignedPCs.delete(client.pc);
             console.log(`Freed up ${client.pc}`);
           }
-          room.clients.delete(id);
           break;
         }
       }
@@ -344,6 +458,76 @@ wss.on('connection', (ws, req) => {
   });
 });
 
+// Start the grace period of a dropped PC session
+function detachSession(room, token, session) {
+  session.ws = null;
+  console.log(`${session.pc} disconnected, holding slot for ${RESUME_GRACE_MS} ms`);
+  session.expiry = setTimeout(() => {
+    room.sessions.delete(token);
+    room.assignedPCs.delete(session.pc);
+    console.log(`Resume window expired, freed up ${session.pc}`);
+    broadcastStatus(room);
+  }, RESUME_GRACE_MS);
+}
+
+// Reattach a reconnecting client to its PC slot and replay unacknowledged commands
+function resumeSession(ws, room, clientId, token) {
+  const session = room.sessions.get(token);
+  if (!session) {
+    ws.send(JSON.stringify({ type: 'resumeRejected' }));
+    return;
+  }
+  if (session.expiry) {
+    clearTimeout(session.expiry);
+    session.expiry = null;
+  }
+  // A half-open previous connection is replaced by the new one
+  if (session.ws && session.ws !== ws) {
+    for (const [id, client] of room.clients.entries()) {
+      if (client.ws === session.ws) room.clients.delete(id);
+    }
+    session.ws.terminate();
+  }
+  session.ws = ws;
+  ws.resumeToken = token;
+  room.assignedPCs.add(session.pc);
+  room.clients.set(clientId, { ws, pc: session.pc, id: clientId, isAlive: true });
+  ws.send(JSON.stringify({ type: 'resumed', clientId, pc: session.pc, resumeToken: token }));
+  console.log(`${session.pc} resumed session`);
+
+  const now = Date.now();
+  session.pending.forEach((entry, cmdId) => {
+    if (now - entry.sentAt > COMMAND_REPLAY_TTL_MS) {
+      session.pending.delete(cmdId);
+      return;
+    }
+    console.log(`Replaying ${entry.message.type} ${cmdId} to ${session.pc}`);
+    ws.send(JSON.stringify(entry.message));
+  });
+  broadcastStatus(room);
+}
+
+function acknowledgeCommand(room, ws, cmdId) {
+  const session = ws.resumeToken ? room.sessions.get(ws.resumeToken) : null;
+  if (session) session.pending.delete(cmdId);
+}
+
+// Send a command to a PC, remembering it until acknowledged so it can be replayed on resume
+// Returns the cmdId the PC will echo back, or null when the PC is not connected
+function sendCommandToPC(room, targetPC, command) {
+  let sent = null;
+  room.clients.forEach((client) => {
+    if (client.pc === targetPC && client.ws.readyState === WebSocket.OPEN) {
+      const message = { ...command, cmdId: nextCmdId++ };
+      const session = client.ws.resumeToken ? room.sessions.get(client.ws.resumeToken) : null;
+      if (session) session.pending.set(message.cmdId, { message, sentAt: Date.now() });
+      client.ws.send(JSON.stringify(message));
+      sent = message.cmdId;
+    }
+  });
+  return sent;
+}
+
 // Send status to a specific client
 function sendStatusToClientRoom(ws, room) {
   if (!room) return;
@@ -417,10 +601,8 @@ setInterval(() => {
 
       if (client.isAlive === false) {
         console.log(`Heartbeat missed from ${client.pc}, terminating connection`);
+        // The close handler frees the slot or holds it for a resume
         client.ws.terminate();
-        room.clients.delete(id);
-        room.assignedPCs.delete(client.pc);
-        broadcastStatus(room);
         return;
       }
 
@@ -434,14 +616,21 @@ setInterval(() => {
   });
 }, HEARTBEAT_INTERVAL);
 
-// Track active bets for each room
-const activeBets = new Map(); // roomId -> { betId, PC1: { status, startTime }, PC2: { status, startTime } }
+// Track active bets for each room, and per table when the PCs bet on several tables
+const activeBets = new Map(); // betKey -> { betId, table, PC1: { status, startTime }, PC2: { status, startTime } }
+
+function betKey(room, table) {
+  return table == null ? room.id : `${room.id}:${table}`;
+}
 
 // API endpoint to send bet command
 app.post('/api/bet', (req, res) => {
-  const { platform, pc, amount, side, single = false, user } = req.body;
+  // table: layout profile name on the PCs when they bet on several tables at once
+  const { platform, pc, amount, side, single = false, user, fireDelayMs, table } = req.body;
+  // Callers may pass their own betId so that retrying a request never places the bet twice
+  const betId = req.body.betId || `${user}_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`;
 
-  console.log('Bet request:', { platform, pc, amount, side });
+  console.log('Bet request:', { platform, pc, amount, side, table });
 
   const selectedPC = pc;
   const oppositePC = pc === 'PC1' ? 'PC2' : 'PC1';
@@ -450,21 +639,17 @@ app.post('/api/bet', (req, res) => {
   let sentCount = 0;
   const room = getRoom(user);
 
+  // Controller-clock instant at which the PCs click; single bets only get one when asked for
+  const lead = fireDelayMs != null ? Number(fireDelayMs) : single ? null : FIRE_LEAD_MS;
+  const fireAt = lead != null ? Math.round(nowMs() + lead) : undefined;
+
   // Helper to send bet to a specific PC
   const sendBetToPC = (targetPC, targetSide) => {
-    room.clients.forEach((client) => {
-      if (client.pc === targetPC && client.ws.readyState === WebSocket.OPEN) {
-        client.ws.send(
-          JSON.stringify({
-            type: 'placeBet',
-            platform,
-            amount,
-            side: targetSide,
-          }),
-        );
-        sentCount += 1;
-      }
-    });
+    const cmdId = sendCommandToPC(room, targetPC, { type: 'placeBet', betId, platform, amount, side: targetSide, fireAt, table });
+    if (cmdId) {
+      sentCount += 1;
+    }
+    return cmdId;
   };
 
   if (single) {
@@ -472,7 +657,7 @@ app.post('/api/bet', (req, res) => {
     sendBetToPC(selectedPC, side);
 
     if (sentCount === 1) {
-      res.json({ success: true, message: `Bet command sent to ${selectedPC}` });
+      res.json({ success: true, message: `Bet command sent to ${selectedPC}`, betId });
     } else {
       res.status(404).json({ success: false, message: `${selectedPC} is not connected` });
     }
@@ -480,7 +665,6 @@ app.post('/api/bet', (req, res) => {
   }
 
   // For simultaneous betting, track the bet state
-  const betId = `${user}_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`;
   const betState = {
     betId,
     PC1: { status: 'pending', startTime: Date.now() },
@@ -488,75 +672,78 @@ app.post('/api/bet', (req, res) => {
     platform,
     amount,
     side,
-    oppositeSide
+    oppositeSide,
+    table
   };
   
-  activeBets.set(room.id, betState);
-  console.log(`Started tracking bet ${betId} for room ${room.id}`);
+  const key = betKey(room, table);
+  activeBets.set(key, betState);
+  console.log(`Started tracking bet ${betId} for ${key}`);
 
   // Send to both PCs
-  sendBetToPC(selectedPC, side);
-  sendBetToPC(oppositePC, oppositeSide);
+  betState[selectedPC].cmdId = sendBetToPC(selectedPC, side);
+  betState[oppositePC].cmdId = sendBetToPC(oppositePC, oppositeSide);
 
   if (sentCount === 2) {
-    // Set up timeout to handle unresponsive PCs
-    const timeoutDuration = 10000; // 10 seconds
-    setTimeout(() => {
-      const currentBet = activeBets.get(room.id);
-      if (currentBet && currentBet.betId === betId) {
-        // Check for any PCs that are still pending
-        if (currentBet.PC1.status === 'pending') {
-          console.log(`PC1 timed out for bet ${betId}, cancelling PC2 if still pending`);
-          currentBet.PC1 = { status: 'timeout', reason: 'No response within timeout period' };
-          if (currentBet.PC2.status === 'pending') {
-            sendCancelBet('PC2', platform, amount, side, room);
-            currentBet.PC2 = { status: 'cancelled', reason: 'Cancelled due to PC1 timeout' };
-          }
-        }
-        if (currentBet.PC2.status === 'pending') {
-          console.log(`PC2 timed out for bet ${betId}, cancelling PC1 if still pending`);
-          currentBet.PC2 = { status: 'timeout', reason: 'No response within timeout period' };
-          if (currentBet.PC1.status === 'pending') {
-            sendCancelBet('PC1', platform, amount, side, room);
-            currentBet.PC1 = { status: 'cancelled', reason: 'Cancelled due to PC2 timeout' };
-          }
-        }
-        
-        // Clean up after timeout
-        setTimeout(() => {
-          activeBets.delete(room.id);
-          console.log(`Cleaned up timed out bet tracking for room ${room.id}`);
-        }, 2000);
-      }
-    }, timeoutDuration);
-    
-    res.json({ success: true, message: 'Bet commands sent to both PCs', betId });
+    // A PC that does not acknowledge quickly is treated as dead and its partner is cancelled
+    armBetWatchdog(room, betId, 'PC1', BET_ACK_TIMEOUT_MS, 'did not acknowledge', table);
+    armBetWatchdog(room, betId, 'PC2', BET_ACK_TIMEOUT_MS, 'did not acknowledge', table);
+    res.json({ success: true, message: 'Bet commands sent to both PCs', betId, fireAt });
   } else {
     // Clean up if we couldn't send to both PCs
-    activeBets.delete(room.id);
+    activeBets.delete(key);
     res.status(404).json({ success: false, message: 'One or both PCs are not connected' });
   }
 });
 
-// Utility: cancel bet on a specific PC
-function sendCancelBet(targetPC, platform = '', amount = null, side = '', room) {
-  let sent = false;
-  room.clients.forEach((client) => {
-    if (client.pc === targetPC && client.ws.readyState === WebSocket.OPEN) {
-      client.ws.send(
-        JSON.stringify({
-          type: 'cancelBet',
-          platform,
-          amount,
-          side,
-        }),
-      );
-      sent = true;
-      console.log(`Cancel bet command sent to ${targetPC}`);
+function isOutstanding(entry) {
+  return entry.status === 'pending' || entry.status === 'acked';
+}
+
+// Whether a betSuccess/betError answers this PC's part of the tracked bet
+function isResultFor(bet, data) {
+  const entry = bet[data.pc];
+  if (!entry) return false;
+  if (data.cmdId != null && entry.cmdId != null) return entry.cmdId === data.cmdId;
+  return data.betId != null && data.betId === bet.betId;
+}
+
+// (Re)start the deadline for one PC's part of a simultaneous bet
+function armBetWatchdog(room, betId, pc, delayMs, reason, table) {
+  const bet = activeBets.get(betKey(room, table));
+  if (!bet || bet.betId !== betId) return;
+  clearTimeout(bet[pc].watchdog);
+  bet[pc].watchdog = setTimeout(() => expireBetPC(room, betId, pc, reason, table), delayMs);
+}
+
+function expireBetPC(room, betId, pc, reason, table) {
+  const key = betKey(room, table);
+  const bet = activeBets.get(key);
+  if (!bet || bet.betId !== betId || !isOutstanding(bet[pc])) return;
+  console.log(`${pc} ${reason} for bet ${betId}`);
+  bet[pc] = { status: 'timeout', reason };
+  const oppositePC = pc === 'PC1' ? 'PC2' : 'PC1';
+  if (isOutstanding(bet[oppositePC])) {
+    console.log(`Cancelling bet on ${oppositePC} due to ${pc} timeout`);
+    clearTimeout(bet[oppositePC].watchdog);
+    sendCancelBet(oppositePC, bet.platform, bet.amount, bet.side, room, table);
+    bet[oppositePC] = { status: 'cancelled', reason: `Cancelled due to ${pc} timeout` };
+  }
+  // Clean up after timeout
+  setTimeout(() => {
+    if (activeBets.get(key) === bet) {
+      activeBets.delete(key);
+      console.log(`Cleaned up timed out bet tracking for ${key}`);
     }
-  });
-  
-  if (!sent) {
+  }, 2000);
+}
+
+// Utility: cancel bet on a specific PC (only on one table when given; all tables otherwise)
+function sendCancelBet(targetPC, platform = '', amount = null, side = '', room, table) {
+  const sent = sendCommandToPC(room, targetPC, { type: 'cancelBet', platform, amount, side, table });
+  if (sent) {
+    console.log(`Cancel bet command sent to ${targetPC}`);
+  } else {
     console.log(`Could not send cancel bet command to ${targetPC} - not connected`);
   }
   
@@ -581,7 +768,8 @@ app.get('/api/status', (req, res) => {
 
 // API endpoint to send cancel to connected PCs only
 app.post('/api/cancelBetAll', (req, res) => {
-  const { user } = req.body;
+  // table: only cancel on that table when the PCs bet on several
+  const { user, table } = req.body;
   let cancelledCount = 0;
   
   if (user) {
@@ -589,7 +777,7 @@ app.post('/api/cancelBetAll', (req, res) => {
     // Only send cancel to connected PCs
     room.clients.forEach((client) => {
       if (client.ws.readyState === WebSocket.OPEN) {
-        if (sendCancelBet(client.pc, '', null, '', room)) {
+        if (sendCancelBet(client.pc, '', null, '', room, table)) {
           cancelledCount++;
         }
       }
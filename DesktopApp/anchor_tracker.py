@@ -0,0 +1,100 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from cv_utils import grab_region, load_image, load_match_mode, match_template, match_template_multiscale_masked, reduce_channels, reduce_frame, resize_image, virtual_screen_bounds
+
+# Scales tried when the anchor has to be searched for on the whole screen
+DEFAULT_SCALES = [0.5, 0.6, 0.67, 0.75, 0.8, 0.9, 1.0, 1.1, 1.25, 1.5, 1.75, 2.0]
+
+
+class AnchorTracker:
+	"""Keeps the on-screen origin and scale of the table anchor up to date.
+
+	The anchor is first looked for in a small window around its last known
+	origin at the last detected scale. Only when that misses is the whole
+	virtual screen swept across all scales. Matching runs in the template's
+	calibrated match mode (cv_utils.load_match_mode), full BGR by default.
+	"""
+
+	def __init__(self, template_path: str, origin: Tuple[int, int], threshold: float = 0.8,
+			search_margin: int = 80, scales: Optional[List[float]] = None,
+			logger: Optional[Callable[[str], None]] = None):
+		self.mode = load_match_mode(template_path)
+		self.template = reduce_channels(load_image(template_path), self.mode)
+		self.threshold = threshold
+		self.search_margin = search_margin
+		self.scales = scales or DEFAULT_SCALES
+		self.logger = logger
+		# Global screen coordinates of the anchor's top-left corner
+		self.origin: Tuple[int, int] = (int(origin[0]), int(origin[1]))
+		# Size of the anchor on screen relative to the captured template
+		self.scale = 1.0
+		# Whether origin/scale come from a successful match (or a fresh capture)
+		self.found = False
+		self._scaled: Dict[float, np.ndarray] = {1.0: self.template}
+
+	def log(self, msg: str) -> None:
+		if self.logger:
+			self.logger(msg)
+
+	def _template_at(self, scale: float) -> np.ndarray:
+		tpl = self._scaled.get(scale)
+		if tpl is None:
+			tpl = resize_image(self.template, scale)
+			self._scaled[scale] = tpl
+		return tpl
+
+	def reset(self, origin: Tuple[int, int], scale: float = 1.0) -> None:
+		"""Pin the anchor to a known location, e.g. right after it was captured"""
+		self.origin = (int(origin[0]), int(origin[1]))
+		self.scale = scale
+		self.found = True
+
+	def locate(self) -> bool:
+		"""Re-locate the anchor; returns False if it is not visible anywhere"""
+		if self._local_search():
+			return True
+		if self._full_search():
+			return True
+		self.found = False
+		self.log("Anchor not found on screen")
+		return False
+
+	def _local_search(self) -> bool:
+		tpl = self._template_at(self.scale)
+		th, tw = tpl.shape[:2]
+		vl, vt, vw, vh = virtual_screen_bounds()
+		left = max(vl, self.origin[0] - self.search_margin)
+		top = max(vt, self.origin[1] - self.search_margin)
+		right = min(vl + vw, self.origin[0] + tw + self.search_margin)
+		bottom = min(vt + vh, self.origin[1] + th + self.search_margin)
+		if right - left < tw or bottom - top < th:
+			return False
+		img = reduce_frame(grab_region(left, top, right - left, bottom - top), self.mode)
+		res = match_template(img, tpl, self.threshold)
+		if res is None:
+			return False
+		self.origin = (left + res[0], top + res[1])
+		self.found = True
+		return True
+
+	def _full_search(self) -> bool:
+		left, top, width, height = virtual_screen_bounds()
+		img = reduce_frame(grab_region(left, top, width, height), self.mode)
+		res = match_template_multiscale_masked(img, self.template, None, self.scales, self.threshold)
+		if res is None:
+			return False
+		x, y, w, h, score, s = res
+		self.origin = (left + x, top + y)
+		self.scale = s
+		self._template_at(s)
+		self.found = True
+		self.log(f"Anchor re-located at ({self.origin[0]},{self.origin[1]}) scale={s:.2f} score={score:.3f}")
+		return True
+
+	def to_screen(self, rel_x: int, rel_y: int) -> Tuple[int, int]:
+		"""Map an anchor-relative offset (template pixels) to global screen coordinates"""
+		return (int(round(self.origin[0] + rel_x * self.scale)), int(round(self.origin[1] + rel_y * self.scale)))
+
+	def to_relative(self, x: int, y: int) -> Tuple[int, int]:
+		"""Inverse of to_screen for the current origin and scale"""
+		return (int(round((x - self.origin[0]) / self.scale)), int(round((y - self.origin[1]) / self.scale)))
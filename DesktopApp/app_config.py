@@ -0,0 +1,39 @@
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+@dataclass
+class Config:
+	controller_http: str
+	controller_ws: str
+	raw: dict
+	# Usual stake sizes; compositions up to the largest are precomputed after login
+	warm_up_amounts: Tuple[int, ...] = ()
+	# Opt-in session recording (see session_recorder.py); one subdirectory per login
+	record_dir: Optional[str] = None
+	record_scale: float = 0.5
+	record_max_mb: int = 512
+	# Layout profiles of the tables this client bets on at once; empty for one table
+	tables: Tuple[str, ...] = ()
+
+
+def load_config() -> Config:
+    # Environment overrides allow pointing the app at another controller, e.g. fake_controller.py
+    server_config = {
+        'controller': {
+            'http_url': os.environ.get('CONTROLLER_HTTP_URL', 'http://localhost:3000'),
+            # The controller serves WebSocket on the same port as HTTP
+            'ws_url': os.environ.get('CONTROLLER_WS_URL', 'ws://localhost:3000')
+        }
+    }
+    return Config(
+        controller_http=server_config['controller']['http_url'],
+        controller_ws=server_config['controller']['ws_url'],
+        raw=server_config,
+        warm_up_amounts=tuple(int(a) for a in os.environ.get('WARM_UP_AMOUNTS', '').split(',') if a.strip()),
+        record_dir=os.environ.get('RECORD_SESSION_DIR') or None,
+        record_scale=float(os.environ.get('RECORD_SCALE', '0.5')),
+        record_max_mb=int(os.environ.get('RECORD_MAX_MB', '512')),
+        tables=tuple(t.strip() for t in os.environ.get('BET_TABLES', '').split(',') if t.strip())
+    )
@@ -0,0 +1,187 @@
+"""Micro-benchmark of the bet engine (MacroBaccarat) without touching the mouse.
+
+Clicks go to a RecordingInputBackend whose SimulatedClock advances by the
+time each real click and pause would take. The wall-clock duration of a bet
+can therefore be reported without waiting for it, next to the real CPU time
+spent on composing and planning. Each combination of chip set and amount
+reports:
+
+- compose_ms: ChipComposer.compose, uncached
+- prepare_ms: prepare_bet; the first call after a config change is reported separately as cold
+- clicks and chips in the plan
+- predicted_ms: what betAck would announce with the initial estimates
+- simulated_ms: clock time execute_plan takes on a real table
+- alloc_kb / alloc_blocks: peak memory and allocations of a cold prepare_bet (tracemalloc)
+- cancel: clicks and simulated time of cancel_bet after the bet
+
+	python bench_macro.py --output macro.json --baseline bench_macro_baseline.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Sequence
+
+import cv_utils
+from config_snapshot import ConfigSnapshot, build_snapshot
+from input_backend import RecordingInputBackend, SimulatedClock
+from macro_betting import ChipComposer, MacroBaccarat
+from macro_config import ChipConfig, Position
+
+# Chip sets and the stakes benchmarked with them
+CHIP_SETS: Dict[str, Sequence[int]] = {
+	'assets': (1000, 25000, 125000, 500000, 1250000, 2500000, 5000000, 50000000),
+	'classic': (1, 5, 25, 100, 500, 1000, 5000),
+	'sparse': (1000, 25000),
+}
+AMOUNTS: Dict[str, Sequence[int]] = {
+	'assets': (1000, 26000, 150000, 1000000, 7775000, 57776000, 250000000),
+	'classic': (5, 30, 135, 1000, 2480, 12345, 99999),
+	'sparse': (1000, 26000, 99000, 1000000, 10000000),
+}
+REPEATS = 200
+# Regression limits used by --baseline
+TIME_TOLERANCE = 0.5  # compose/prepare times may grow by 50 % ...
+TIME_SLACK_MS = 0.25  # ... plus this much, since they are microseconds and noisy
+ALLOC_TOLERANCE = 0.25
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+	if not values:
+		return None
+	ordered = sorted(values)
+	index = min(len(ordered) - 1, max(0, round(pct / 100.0 * (len(ordered) - 1))))
+	return ordered[index]
+
+
+class BenchLayout:
+	"""Stands in for MacroConfig: a fixed, fully configured layout without an anchor"""
+
+	def __init__(self, version: int, chips: Sequence[int]):
+		positions = {
+			'player_area': Position(600, 500, 200, 120, 'player_area'),
+			'banker_area': Position(900, 500, 200, 120, 'banker_area'),
+			'cancel_button': Position(1200, 900, 40, 40, 'cancel_button'),
+		}
+		chip_configs = [ChipConfig(amount, Position(300 + 80 * i, 950, 60, 60, f"chip_{amount}")) for i, amount in enumerate(chips)]
+		self.snapshot = build_snapshot(version, 'bench', positions, chip_configs)
+
+	def get_snapshot(self) -> ConfigSnapshot:
+		return self.snapshot
+
+	def get_anchor_tracker(self):
+		return None
+
+	def is_configured(self) -> bool:
+		return self.snapshot.is_configured()
+
+
+def _p50_ms(func, repeats: int) -> float:
+	samples = []
+	for _ in range(repeats):
+		started = time.perf_counter()
+		func()
+		samples.append((time.perf_counter() - started) * 1000.0)
+	return round(percentile(samples, 50), 4)
+
+
+def bench_case(chip_set: str, chips: Sequence[int], amount: int, version: int, repeats: int) -> dict:
+	backend = RecordingInputBackend(SimulatedClock())
+	cv_utils.set_input_backend(backend)
+	try:
+		layout = BenchLayout(version, chips)
+		# A new engine has no composer yet: its first prepare_bet is the cold one
+		started = time.perf_counter()
+		MacroBaccarat(layout).prepare_bet(amount, 'Player')
+		cold_ms = (time.perf_counter() - started) * 1000.0
+
+		macro = MacroBaccarat(layout)
+		macro.now_ms = backend.clock.now_ms
+		predicted_ms = macro.predict_duration_ms(amount)
+		tracemalloc.start()
+		plan, reason = macro.prepare_bet(amount, 'Player')
+		_, peak = tracemalloc.get_traced_memory()
+		blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+		tracemalloc.stop()
+		result = {'chip_set': chip_set, 'amount': amount, 'reason': reason, 'prepare_cold_ms': round(cold_ms, 4),
+			'alloc_kb': round(peak / 1024.0, 2), 'alloc_blocks': blocks, 'predicted_ms': round(predicted_ms, 1)}
+		if plan is None:
+			return result
+
+		composer = ChipComposer(chips)
+		result['compose_ms'] = _p50_ms(lambda: composer.compose(amount), repeats)
+		result['prepare_ms'] = _p50_ms(lambda: macro.prepare_bet(amount, 'Player'), repeats)
+		result['chips'] = len(plan.composition)
+		result['clicks'] = len(plan.clicks)
+
+		backend.reset()
+		started_ms = backend.clock.now_ms()
+		macro.execute_plan(plan)
+		result['simulated_ms'] = round(backend.clock.now_ms() - started_ms, 1)
+
+		backend.reset()
+		started_ms = backend.clock.now_ms()
+		macro.cancel_bet()
+		result['cancel'] = {'clicks': len(backend.clicks), 'simulated_ms': round(backend.clock.now_ms() - started_ms, 1)}
+		return result
+	finally:
+		cv_utils.set_input_backend(None)
+
+
+def run(repeats: int = REPEATS) -> dict:
+	cases = []
+	version = 0
+	for chip_set, chips in CHIP_SETS.items():
+		for amount in AMOUNTS[chip_set]:
+			version += 1
+			cases.append(bench_case(chip_set, chips, amount, version, repeats))
+	return {
+		'meta': {'repeats': repeats, 'python': platform.python_version(), 'machine': platform.machine()},
+		'cases': cases,
+	}
+
+
+def compare(results: dict, baseline: dict) -> List[str]:
+	"""Regressions of results against baseline (empty if none)"""
+	base_cases = {(c['chip_set'], c['amount']): c for c in baseline.get('cases', [])}
+	problems = []
+	for case in results['cases']:
+		base = base_cases.get((case['chip_set'], case['amount']))
+		if base is None:
+			continue
+		name = f"{case['chip_set']} {case['amount']}"
+		for key in ('compose_ms', 'prepare_ms', 'prepare_cold_ms'):
+			if key in base and case.get(key, 0.0) > base[key] * (1.0 + TIME_TOLERANCE) + TIME_SLACK_MS:
+				problems.append(f"{name}: {key} {case[key]} vs baseline {base[key]}")
+		if case['alloc_kb'] > base['alloc_kb'] * (1.0 + ALLOC_TOLERANCE):
+			problems.append(f"{name}: allocated {case['alloc_kb']} KB vs baseline {base['alloc_kb']} KB")
+		for key in ('clicks', 'simulated_ms'):
+			if key in base and case.get(key) != base[key]:
+				problems.append(f"{name}: {key} {case.get(key)} vs baseline {base[key]}")
+	return problems
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark MacroBaccarat with a simulated input backend')
+	parser.add_argument('--repeats', type=int, default=REPEATS)
+	parser.add_argument('--output', help='write the results as JSON')
+	parser.add_argument('--baseline', help='compare against these results; exit 1 on regression')
+	args = parser.parse_args()
+
+	results = run(args.repeats)
+	for case in results['cases']:
+		print(f"{case['chip_set']:>8} {case['amount']:>11}  compose {case.get('compose_ms', '-'):>8} ms  "
+			f"prepare {case.get('prepare_ms', '-'):>8} ms (cold {case['prepare_cold_ms']:.3f})  "
+			f"clicks {case.get('clicks', '-'):>3}  predicted {case['predicted_ms']:>7} ms  "
+			f"simulated {case.get('simulated_ms', '-'):>7} ms  alloc {case['alloc_kb']} KB {case['reason']}")
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(results, f, indent=2)
+	if args.baseline:
+		with open(args.baseline, 'r') as f:
+			problems = compare(results, json.load(f))
+		for problem in problems:
+			print(f"REGRESSION {problem}", file=sys.stderr)
+		sys.exit(1 if problems else 0)
@@ -0,0 +1,237 @@
+"""Latency and accuracy benchmark for the cv_utils template matchers.
+
+Generates synthetic table screens (synthetic_screens.py) for every
+combination of resolution, object scale, noise level and background. Then
+it runs match_template, match_template_masked,
+match_template_multiscale_masked and find_any on each screen (and, with --pool N, MatchPool.find_any on N worker
+processes):
+
+- Each matcher is asked for one template that is on the screen and one that
+  is not.
+- A hit is a match overlapping the true box with IoU >= 0.5.
+- A false positive is a match for an absent template, or one in the wrong
+  place.
+
+Latency percentiles, hit rate and false-positive rate are reported per
+matcher (and per resolution) as JSON. With --baseline the run is compared
+against stored results, and the exit code is 1 on a regression.
+
+	python bench_matching.py --output results.json --baseline bench_matching_baseline.json
+	python bench_matching.py --quick --output bench_matching_baseline.json   # refresh the baseline
+
+Latencies depend on the machine; refresh the baseline on the machine that
+runs the comparison.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from cv_utils import build_nonwhite_mask, find_any, match_template, match_template_masked, match_template_multiscale_masked
+from match_pool import MatchPool
+from synthetic_screens import BACKGROUNDS, Template, generate_screen, iou, load_templates
+
+RESOLUTIONS = {'1080p': (1920, 1080), '1440p': (2560, 1440), '4k': (3840, 2160)}
+MULTISCALE_SCALES = [0.9, 1.0, 1.1]
+THRESHOLD = 0.8
+HIT_IOU = 0.5
+# Regression limits used by --baseline
+LATENCY_TOLERANCE = 0.25  # p50 may grow by 25 %
+RATE_TOLERANCE = 0.02  # hit rate may drop / false-positive rate rise by 2 points
+
+Match = Optional[Tuple[int, int, int, int]]
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+	if not values:
+		return None
+	ordered = sorted(values)
+	index = min(len(ordered) - 1, max(0, round(pct / 100.0 * (len(ordered) - 1))))
+	return ordered[index]
+
+
+class Tally:
+	def __init__(self):
+		self.latencies: List[float] = []
+		self.hits = 0
+		self.positives = 0  # queries whose template is on screen
+		self.false_positives = 0
+		self.queries = 0
+
+	def add(self, ms: float, found: Match, truth: Match) -> None:
+		self.latencies.append(ms)
+		self.queries += 1
+		if truth is not None:
+			self.positives += 1
+		if found is None:
+			return
+		if truth is not None and iou(found, truth) >= HIT_IOU:
+			self.hits += 1
+		else:
+			self.false_positives += 1
+
+	def summary(self) -> dict:
+		return {
+			'calls': self.queries,
+			'latency_ms': {f"p{p}": round(percentile(self.latencies, p), 3) for p in (50, 90, 99)} | {
+				'mean': round(sum(self.latencies) / len(self.latencies), 3)},
+			'hit_rate': round(self.hits / self.positives, 4) if self.positives else None,
+			'false_positive_rate': round(self.false_positives / self.queries, 4) if self.queries else None,
+		}
+
+
+def _timed(func: Callable, *args) -> Tuple[float, object]:
+	started = time.perf_counter()
+	result = func(*args)
+	return (time.perf_counter() - started) * 1000.0, result
+
+
+class MatchingBenchmark:
+	def __init__(self, templates: Dict[str, Template], pool: Optional[MatchPool] = None):
+		self.templates = templates
+		self.pool = pool
+		self.chips = sorted(name for name in templates if name.startswith('chip_'))
+		self.areas = sorted(name for name in templates if not name.startswith('chip_'))
+		self.masks = {name: build_nonwhite_mask(t.bgr, t.alpha) for name, t in templates.items()}
+		self.tallies: Dict[Tuple[str, str], Tally] = {}
+
+	def tally(self, matcher: str, resolution: str) -> Tally:
+		return self.tallies.setdefault((matcher, resolution), Tally())
+
+	def run_screen(self, resolution: str, size: Tuple[int, int], scale: float, noise: float, background: str,
+			rng: np.random.Generator, seed: int) -> None:
+		# One bet area and three chips on screen; the rest of each kind is absent
+		area = self.areas[int(rng.integers(len(self.areas)))]
+		chips = [self.chips[i] for i in rng.choice(len(self.chips), 3, replace=False)]
+		screen = generate_screen(self.templates, [area] + chips, size[0], size[1], scale, noise, background, seed)
+		img = screen.image
+		present = chips[0]
+		absent = next(name for name in self.chips if name not in chips)
+		for name in (area, present, absent):
+			truth = screen.box_of(name)
+			tpl, mask = self.templates[name].bgr, self.masks[name]
+			ms, res = _timed(match_template, img, tpl, THRESHOLD)
+			self.tally('match_template', resolution).add(ms, res and res[:4], truth)
+			ms, res = _timed(match_template_masked, img, tpl, mask, THRESHOLD)
+			self.tally('match_template_masked', resolution).add(ms, res and res[:4], truth)
+			ms, res = _timed(match_template_multiscale_masked, img, tpl, mask, MULTISCALE_SCALES, THRESHOLD)
+			self.tally('match_template_multiscale_masked', resolution).add(ms, res and res[:4], truth)
+		# find_any over every chip: the best match must be one of the chips on screen
+		ms, res = _timed(find_any, img, [self.templates[name].bgr for name in self.chips], THRESHOLD)
+		truth = None
+		if res is not None:
+			truth = screen.box_of(self.chips[res[5]])
+		self.tally('find_any', resolution).add(ms, res and res[:4], truth or screen.box_of(present))
+		if self.pool is not None:
+			ms, res = _timed(self.pool.find_any, img, self.chips, THRESHOLD)
+			truth = screen.box_of(res[5]) if res is not None else None
+			self.tally('pool_find_any', resolution).add(ms, res and res[:4], truth or screen.box_of(present))
+
+	def report(self) -> dict:
+		matchers: Dict[str, dict] = {}
+		for (matcher, resolution), tally in sorted(self.tallies.items()):
+			entry = matchers.setdefault(matcher, {'by_resolution': {}})
+			entry['by_resolution'][resolution] = tally.summary()
+		for matcher, entry in matchers.items():
+			merged = Tally()
+			for (name, _), tally in self.tallies.items():
+				if name == matcher:
+					merged.latencies += tally.latencies
+					merged.hits += tally.hits
+					merged.positives += tally.positives
+					merged.false_positives += tally.false_positives
+					merged.queries += tally.queries
+			entry.update(merged.summary())
+		return matchers
+
+
+def compare(results: dict, baseline: dict) -> List[str]:
+	"""Regressions of results against baseline (empty if none)"""
+	problems = []
+	for matcher, base in baseline.get('matchers', {}).items():
+		current = results['matchers'].get(matcher)
+		if current is None:
+			problems.append(f"{matcher}: missing from results")
+			continue
+		for resolution, base_res in base.get('by_resolution', {}).items():
+			cur_res = current['by_resolution'].get(resolution)
+			if cur_res is None:
+				continue
+			base_p50, cur_p50 = base_res['latency_ms']['p50'], cur_res['latency_ms']['p50']
+			if cur_p50 > base_p50 * (1.0 + LATENCY_TOLERANCE):
+				problems.append(f"{matcher} @ {resolution}: p50 {cur_p50:.2f} ms vs baseline {base_p50:.2f} ms")
+		if base['hit_rate'] is not None and current['hit_rate'] is not None and current['hit_rate'] < base['hit_rate'] - RATE_TOLERANCE:
+			problems.append(f"{matcher}: hit rate {current['hit_rate']:.3f} vs baseline {base['hit_rate']:.3f}")
+		if current['false_positive_rate'] > base['false_positive_rate'] + RATE_TOLERANCE:
+			problems.append(f"{matcher}: false-positive rate {current['false_positive_rate']:.3f} vs baseline {base['false_positive_rate']:.3f}")
+	return problems
+
+
+def run(resolutions: List[str], scales: List[float], noises: List[float], backgrounds: List[str], trials: int,
+		seed: int = 0, progress: Optional[Callable[[str], None]] = None, pool_workers: int = 0) -> dict:
+	templates = load_templates()
+	pool = None
+	if pool_workers:
+		# Chips are matched unmasked by find_any; the pool gets them the same way
+		pool = MatchPool({name: (t.bgr, None) for name, t in templates.items() if name.startswith('chip_')}, pool_workers)
+		pool.start()
+	bench = MatchingBenchmark(templates, pool)
+	rng = np.random.default_rng(seed)
+	started = time.perf_counter()
+	try:
+		for resolution in resolutions:
+			for scale in scales:
+				for noise in noises:
+					for background in backgrounds:
+						for _ in range(trials):
+							bench.run_screen(resolution, RESOLUTIONS[resolution], scale, noise, background, rng, int(rng.integers(1 << 31)))
+					if progress:
+						progress(f"{resolution} scale={scale} noise={noise} done ({time.perf_counter() - started:.0f} s)")
+	finally:
+		if pool is not None:
+			pool.close()
+	return {
+		'meta': {
+			'resolutions': resolutions, 'scales': scales, 'noise': noises, 'backgrounds': backgrounds,
+			'trials': trials, 'seed': seed, 'pool_workers': pool_workers, 'threshold': THRESHOLD, 'opencv': cv2.__version__,
+			'numpy': np.__version__, 'python': platform.python_version(), 'machine': platform.machine(),
+			'duration_s': round(time.perf_counter() - started, 1),
+		},
+		'matchers': bench.report(),
+	}
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark the template matchers on synthetic screens')
+	parser.add_argument('--resolutions', default='1080p,1440p,4k', help=f"comma list of {', '.join(RESOLUTIONS)}")
+	parser.add_argument('--scales', default='0.9,1.0,1.1', help='object scale relative to the captured template')
+	parser.add_argument('--noise', default='0,8,16', help='gaussian noise sigma levels')
+	parser.add_argument('--backgrounds', default=','.join(BACKGROUNDS))
+	parser.add_argument('--trials', type=int, default=2, help='screens per combination')
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('--quick', action='store_true', help='1080p and 4k, scale 1.0, noise 0 and 8, cluttered background, one screen each')
+	parser.add_argument('--pool', type=int, default=0, metavar='N', help='also benchmark MatchPool.find_any with N worker processes')
+	parser.add_argument('--output', help='write the results as JSON')
+	parser.add_argument('--baseline', help='compare against these results; exit 1 on regression')
+	args = parser.parse_args()
+
+	if args.quick:
+		args.resolutions, args.scales, args.noise, args.backgrounds, args.trials = '1080p,4k', '1.0', '0,8', 'clutter', 1
+	results = run(args.resolutions.split(','), [float(s) for s in args.scales.split(',')],
+		[float(n) for n in args.noise.split(',')], args.backgrounds.split(','), args.trials, args.seed,
+		progress=lambda msg: print(msg, file=sys.stderr, flush=True), pool_workers=args.pool)
+	print(json.dumps(results, indent=2))
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(results, f, indent=2)
+	if args.baseline:
+		with open(args.baseline, 'r') as f:
+			problems = compare(results, json.load(f))
+		for problem in problems:
+			print(f"REGRESSION {problem}", file=sys.stderr)
+		sys.exit(1 if problems else 0)
@@ -0,0 +1,308 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from clock_sync import local_ms
+from controller_client import ControllerClient
+from input_scheduler import InputScheduler
+from macro_betting import MacroBaccarat
+from macro_config import MacroConfig, TableLayout
+from session_recorder import SessionRecorder
+
+# Refuse fire-at instants further ahead than this (bad clock estimate or stale command)
+MAX_FIRE_LEAD_MS = 10000
+
+# Bet errors raised before any click; a resend with the same betId may run again.
+# Every other outcome is final and is answered from the client's result cache.
+RETRYABLE_ERRORS = frozenset({
+	'invalid_side', 'invalid_amount', 'not_configured', 'anchor_not_found', 'bet_area_not_found',
+	'no_chips_configured', 'cannot_compose_amount', 'chip_not_found', 'invalid_fire_time', 'stale_command',
+})
+
+
+class BetRunner:
+	"""Executes placeBet / cancelBet commands from the controller with MacroBaccarat.
+
+	Shared by the Tk app and the headless client; create_client() returns
+	the ControllerClient that feeds it.
+
+	A client can bet on several tables (for_tables()). Each table has its own
+	engine and layout profile; commands name theirs in a 'table' field, which
+	is echoed in every reply, and commands without one go to the first
+	table. The ControllerClient queues bets per table, so bets on different
+	tables are prepared concurrently. Their clicks then take turns on the one
+	mouse through the engines' shared InputScheduler.
+	"""
+
+	def __init__(self, macro_betting: MacroBaccarat, log: Optional[Callable[[str], None]] = None,
+			tables: Optional[Dict[str, MacroBaccarat]] = None):
+		self.macro_betting = macro_betting
+		# Table name -> engine when betting on several tables; empty for a single table
+		self.tables: Dict[str, MacroBaccarat] = dict(tables or {})
+		self.log = log or (lambda msg: None)
+		self.client: Optional[ControllerClient] = None
+		# Result of warm_up(), reported to the controller as clientReady
+		self.warm_up_report: Optional[dict] = None
+		self._loop: Optional[asyncio.AbstractEventLoop] = None
+		self.recorder: Optional[SessionRecorder] = None
+
+	@classmethod
+	def for_tables(cls, config: MacroConfig, profiles: Iterable[str], log: Optional[Callable[[str], None]] = None) -> 'BetRunner':
+		"""Runner for one table per layout profile, all clicking through one InputScheduler"""
+		log = log or (lambda msg: None)
+		scheduler = InputScheduler()
+		tables = {name: MacroBaccarat(TableLayout(config, name), logger=lambda msg, name=name: log(f"[{name}] {msg}"),
+			input_scheduler=scheduler, table=name) for name in profiles}
+		if not tables:
+			raise ValueError('No tables given')
+		return cls(next(iter(tables.values())), log, tables)
+
+	def engine_for(self, data: dict) -> Optional[MacroBaccarat]:
+		"""Engine of the table a command is for (None for an unknown table)"""
+		table = data.get('table')
+		if table is None or not self.tables:
+			return self.macro_betting
+		return self.tables.get(str(table))
+
+	def engines(self) -> List[MacroBaccarat]:
+		return list(self.tables.values()) or [self.macro_betting]
+
+	def handlers(self) -> Dict[str, Callable]:
+		return {
+			'placeBet': self.on_place_bet,
+			'cancelBet': self.on_cancel_bet,
+		}
+
+	def create_client(self, ws_url: str, token: str, **kwargs) -> ControllerClient:
+		"""ControllerClient wired to this runner"""
+		self.client = ControllerClient(
+			ws_url,
+			token,
+			handlers=self.handlers(),
+			on_drop=self.on_dropped_command,
+			on_accept=self.on_bet_accepted,
+			on_ready=self.on_session_ready,
+			**kwargs,
+		)
+		return self.client
+
+	def start_warm_up(self, amounts: Iterable[int] = ()) -> threading.Thread:
+		"""Warm up capture, matching, input and compositions on a background thread"""
+		thread = threading.Thread(target=self._warm_up, args=(tuple(amounts),), name='warm-up', daemon=True)
+		thread.start()
+		return thread
+
+	def _warm_up(self, amounts: tuple) -> None:
+		started = time.perf_counter()
+		if self.tables:
+			# Step times add up over the tables; errors are named after their table
+			report = {'steps': {}, 'errors': {}}
+			for name, engine in self.tables.items():
+				part = engine.warm_up(amounts)
+				for step, ms in part['steps'].items():
+					report['steps'][step] = round(report['steps'].get(step, 0.0) + ms, 1)
+				for step, error in part['errors'].items():
+					report['errors'][f"{name}: {step}"] = error
+		else:
+			report = self.macro_betting.warm_up(amounts)
+		report['totalMs'] = round((time.perf_counter() - started) * 1000.0, 1)
+		self.warm_up_report = report
+		loop = self._loop
+		if loop is not None and self.client is not None and self.client.pc_name:
+			asyncio.run_coroutine_threadsafe(self._report_ready(), loop)
+
+	def start_recording(self, base_dir: str, scale: float, max_bytes: int) -> SessionRecorder:
+		"""Record frames, clicks and bet traffic to a new subdirectory of base_dir"""
+		self.stop_recording()
+		path = os.path.join(base_dir, time.strftime('%Y%m%d-%H%M%S'))
+		self.recorder = SessionRecorder(path, scale=scale, max_bytes=max_bytes, log=self.log)
+		self.recorder.start()
+		return self.recorder
+
+	def stop_recording(self) -> None:
+		if self.recorder is not None:
+			self.recorder.stop()
+			self.recorder = None
+
+	async def on_session_ready(self, resumed: bool):
+		self._loop = asyncio.get_running_loop()
+		if self.warm_up_report is not None:
+			await self._report_ready()
+
+	async def _report_ready(self):
+		"""Tell the controller warm-up is finished (sent again after every reconnect)"""
+		report = self.warm_up_report
+		message = {'type': 'clientReady', 'warmUpMs': report['steps'], 'totalMs': report['totalMs'], 'errors': report['errors']}
+		if self.tables:
+			message['tables'] = list(self.tables)
+		await self._send(message)
+
+	async def on_place_bet(self, data: dict):
+		self.log(f"Cmd: placeBet {data.get('amount')} {data.get('side')}")
+		self._record('command', data, frame=True)
+		await self._handle_place_bet(data)
+		self._record_frame()
+
+	async def on_cancel_bet(self, data: dict):
+		self.log('Cmd: cancelBet')
+		self._record('command', data, frame=True)
+		await self._handle_cancel_bet(data)
+		self._record_frame()
+
+	def _record(self, kind: str, message: dict, frame: bool = False) -> None:
+		recorder = self.recorder
+		if recorder is not None:
+			recorder.record_event(kind, message=dict(message))
+			if frame:
+				recorder.request_frame()
+
+	def _record_frame(self) -> None:
+		recorder = self.recorder
+		if recorder is not None:
+			recorder.request_frame()
+
+	async def on_bet_accepted(self, data: dict, ahead: list):
+		"""Tell the controller right away that we are alive and how long the bet should take"""
+		engine = self.engine_for(data)
+		if engine is None:
+			# Rejected with betError when its turn comes
+			return
+		amount = int(data.get('amount', 0))
+		fire_at = data.get('fireAt')
+		lead_ms = 0.0 if fire_at is None else max(0.0, self.client.clock.to_local_ms(float(fire_at)) - local_ms())
+		# Bets queued ahead of this one (including the running one) finish first
+		queued_ms = sum(engine.predict_duration_ms(int(d.get('amount', 0))) for d in ahead)
+		own_ms = engine.predict_duration_ms(amount)
+		if len(self.tables) > 1:
+			# Shorter bets on other tables get the mouse first
+			queued_ms = max(queued_ms, engine.input.backlog_ms(own_ms))
+		predicted_ms = max(lead_ms, queued_ms) + own_ms
+		await self._send(self._tagged(data, {'type': 'betAck', 'cmdId': data.get('cmdId'), 'betId': data.get('betId'), 'amount': amount, 'side': data.get('side'), 'predictedMs': round(predicted_ms), 'queued': len(ahead)}))
+
+	async def on_dropped_command(self, data: dict, reason: str):
+		"""A queued bet was skipped (stale or cancelled); the controller still gets an answer"""
+		self.log(f"Skipped placeBet {data.get('amount')} {data.get('side')}: {reason}")
+		await self._send(self._tagged(data, {'type': 'betError', 'message': self.error_message(reason), 'platform': data.get('platform', 'Pragmatic'), 'amount': data.get('amount'), 'side': data.get('side'), 'errorType': reason, 'cmdId': data.get('cmdId'), 'betId': data.get('betId'), 'retryable': reason in RETRYABLE_ERRORS}))
+
+	@staticmethod
+	def _tagged(data: dict, message: dict) -> dict:
+		"""Echo the command's table in a reply"""
+		if 'table' in data:
+			message['table'] = data['table']
+		return message
+
+	async def _handle_place_bet(self, data: dict):
+		platform = data.get('platform', 'Pragmatic')
+		amount = int(data.get('amount', 0))
+		side = data.get('side', 'Player')
+		# Echoed back so the controller can drop the command from its replay list
+		cmd_id = data.get('cmdId')
+		bet_id = data.get('betId')
+		loop = asyncio.get_running_loop()
+		
+		fire_at = data.get('fireAt')
+		fire_at_local = None if fire_at is None else self.client.clock.to_local_ms(float(fire_at))
+		lead_ms = 0.0 if fire_at_local is None else max(0.0, fire_at_local - local_ms())
+		
+		engine = self.engine_for(data)
+		if engine is None:
+			self.log(f"Error: unknown table {data.get('table')}")
+			await self._send(self._tagged(data, {'type': 'betError', 'message': self.error_message('unknown_table'), 'platform': platform, 'amount': amount, 'side': side, 'errorType': 'unknown_table', 'cmdId': cmd_id, 'betId': bet_id, 'retryable': False}))
+			return
+		
+		# Use macro-based betting only
+		if not engine.is_configured():
+			self.log("Error: Macro positions not configured")
+			await self._send(self._tagged(data, {'type': 'betError', 'message': 'Macro positions not configured', 'platform': platform, 'amount': amount, 'side': side, 'errorType': 'not_configured', 'cmdId': cmd_id, 'betId': bet_id, 'retryable': True}))
+			return
+		
+		# Resolve the clicks first so only the clicking itself happens at the fire instant.
+		# Both steps block (screen capture, mouse), so keep them off the event loop.
+		plan, reason = await loop.run_in_executor(None, engine.prepare_bet, amount, side)
+		if plan is not None and lead_ms > MAX_FIRE_LEAD_MS:
+			plan, reason = None, 'invalid_fire_time'
+		
+		if plan is not None:
+			def on_progress(placed: int, total: int, chip: int, remaining_ms: float):
+				progress = self._tagged(data, {'type': 'betProgress', 'cmdId': cmd_id, 'betId': bet_id, 'chip': chip, 'placed': placed, 'total': total, 'remainingMs': round(remaining_ms)})
+				asyncio.run_coroutine_threadsafe(self._send(progress), loop)
+			
+			fired_at = await loop.run_in_executor(None, engine.execute_plan, plan, fire_at_local, on_progress)
+			if fired_at is None:
+				plan, reason = None, 'aborted'
+		
+		if plan is not None:
+			result = self._tagged(data, {'type': 'betSuccess', 'platform': platform, 'amount': amount, 'side': side, 'cmdId': cmd_id, 'betId': bet_id})
+			if fire_at is not None:
+				# Positive skew: clicked after the agreed instant (e.g. command arrived late)
+				result['skewMs'] = round(self.client.clock.controller_ms(fired_at) - float(fire_at), 2)
+				result['clockSynced'] = self.client.clock.synced
+				self.log(f"Bet success: amount={amount} side={side} skew={result['skewMs']} ms")
+			else:
+				self.log(f"Bet success: amount={amount} side={side}")
+			await self._send(result)
+		else:
+			self.log(f"Bet error: {reason}")
+			await self._send(self._tagged(data, {'type': 'betError', 'message': self.error_message(reason), 'platform': platform, 'amount': amount, 'side': side, 'errorType': reason, 'cmdId': cmd_id, 'betId': bet_id, 'retryable': reason in RETRYABLE_ERRORS}))
+
+	async def _handle_cancel_bet(self, data: dict):
+		cmd_id = data.get('cmdId')
+		# A cancel naming a table only touches that table; otherwise every table is cancelled
+		table = data.get('table')
+		if table is not None and self.tables:
+			engine = self.engine_for(data)
+			if engine is None:
+				await self._send(self._tagged(data, {'type': 'cancelError', 'message': self.error_message('unknown_table'), 'errorType': 'unknown_table', 'cmdId': cmd_id}))
+				return
+			engines = [engine]
+		else:
+			table = None
+			engines = self.engines()
+		# Stop the bet in progress before its next click and forget bets still waiting
+		for engine in engines:
+			engine.abort()
+		await self.client.drop_queued('cancelled', None if table is None else str(table))
+		# Use macro-based cancel only
+		loop = asyncio.get_running_loop()
+		ok, reason = True, 'ok'
+		for engine in engines:
+			engine_ok, engine_reason = await loop.run_in_executor(None, engine.cancel_bet)
+			if ok and not engine_ok:
+				ok, reason = engine_ok, engine_reason
+		
+		if not ok:
+			self.log(f"Cancel error: {reason}")
+			await self._send(self._tagged(data, {'type': 'cancelError', 'message': self.error_message(reason), 'errorType': reason, 'cmdId': cmd_id}))
+		else:
+			self.log("Cancel success")
+			await self._send(self._tagged(data, {'type': 'cancelSuccess', 'cmdId': cmd_id}))
+
+	async def _send(self, obj: dict):
+		self._record('sent', obj)
+		if self.client:
+			await self.client.send(obj)
+
+	def error_message(self, code: str) -> str:
+		return {
+			'invalid_side': 'Invalid bet side',
+			'invalid_amount': 'Invalid bet amount',
+			'wrong_tab': 'Cannot place bet: You are not on the betting tab. Please navigate to the casino game.',
+			'not_betting_time': 'Cannot place bet: You are on the right tab but it is not betting time. Please wait for the betting phase.',
+			'cannot_compose_amount': 'Cannot compose amount with available chips',
+			'no_chips_found': 'No chip templates found on screen',
+			'cancel_unavailable': 'Cancel button not configured',
+			'cancel_not_found': 'Cancel button not found',
+			'not_configured': 'Macro positions not configured. Please configure positions first.',
+			'bet_area_not_found': 'Bet area position not found in configuration',
+			'chip_not_found': 'Chip position not found in configuration',
+			'cancel_button_not_configured': 'Cancel button position not configured',
+			'no_chips_configured': 'No chips are configured. Please configure at least one chip position.',
+			'anchor_not_found': 'Table anchor not found on screen. Make sure the table window is visible.',
+			'stale_command': 'Bet arrived too late for its scheduled time and was skipped',
+			'cancelled': 'Bet was cancelled before it started',
+			'aborted': 'Bet was cancelled while being placed',
+			'invalid_fire_time': 'Scheduled bet time is too far in the future; check the clock sync with the Controller.',
+			'unknown_table': 'This client has no layout for the requested table',
+		}.get(code, code)
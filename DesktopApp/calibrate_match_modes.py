@@ -0,0 +1,202 @@
+"""Choose a reduced-channel match mode per template and store it next to it.
+
+Matching a single-channel image costs about a third of matching BGR. For
+each template this script compares full BGR matching against grayscale and
+against the template's dominant channel (the one with the most contrast).
+It uses synthetic screens (synthetic_screens.py) and, optionally, the
+frames of a recorded session. Per mode it reports:
+
+- hit_rate: the best match lands on the template (IoU >= 0.5, score >= threshold)
+- margin: median of best score minus the best score elsewhere on the screen (the runner-up)
+- worst_margin: the smallest such difference
+- ms: median time per match
+
+A reduced mode is accepted only when its hit rate is within HIT_TOLERANCE
+of BGR and its margins stay within MARGIN_TOLERANCE of BGR. If several are
+accepted, the one with the larger margin wins. With --write the choice goes
+to <template>.match.json (cv_utils.save_match_mode), which AnchorTracker and
+other callers read with cv_utils.load_match_mode.
+
+	python calibrate_match_modes.py assets/chips/*.png assets/player_area.png --write
+	python calibrate_match_modes.py anchors/table.png --recording recordings/session-1 --write
+
+Recorded frames have no ground truth; the BGR match of each frame is taken
+as the truth, and frames where BGR finds nothing are skipped.
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from cv_utils import build_nonwhite_mask, reduce_channels, reduce_frame, resize_image, resize_mask, save_match_mode
+from frame_source import FrameArchive
+from synthetic_screens import BACKGROUNDS, Template, generate_screen, iou, load_template, load_templates, template_name
+
+THRESHOLD = 0.8
+HIT_IOU = 0.5
+HIT_TOLERANCE = 0.02  # a reduced mode may miss 2 points more than BGR
+MARGIN_TOLERANCE = 0.25  # and keep 75 % of BGR's median and worst margin
+SCREENS = 12
+NOISE_LEVELS = (0.0, 8.0, 16.0)
+MAX_RECORDED_FRAMES = 50
+
+Box = Tuple[int, int, int, int]
+
+
+def dominant_channel(bgr: np.ndarray, mask: Optional[np.ndarray] = None) -> str:
+	"""The colour channel with the highest contrast inside the template"""
+	pixels = bgr[mask > 0] if mask is not None else bgr.reshape(-1, 3)
+	return ('blue', 'green', 'red')[int(np.argmax(pixels.std(axis=0)))]
+
+
+class Probe:
+	"""A template in one match mode, matched the way cv_utils does (masked when it has alpha)"""
+
+	def __init__(self, template: Template, mode: str):
+		self.mode = mode
+		self.tpl = reduce_channels(template.bgr, mode)
+		self.mask = build_nonwhite_mask(template.bgr, template.alpha) if template.alpha is not None else None
+
+	def response(self, img: np.ndarray, scale: float = 1.0) -> Tuple[np.ndarray, int, int]:
+		tpl, mask = self.tpl, self.mask
+		if scale != 1.0:
+			tpl = resize_image(tpl, scale)
+			mask = resize_mask(mask, scale) if mask is not None else None
+		frame = reduce_frame(img, self.mode)
+		if mask is None:
+			res = cv2.matchTemplate(frame, tpl, cv2.TM_CCOEFF_NORMED)
+		else:
+			res = cv2.matchTemplate(frame, tpl, cv2.TM_CCORR_NORMED, mask=mask)
+		# Masked correlation can produce inf/nan on flat regions
+		np.nan_to_num(res, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+		return res, tpl.shape[1], tpl.shape[0]
+
+
+class ModeTally:
+	def __init__(self):
+		self.hits = 0
+		self.trials = 0
+		self.margins: List[float] = []
+		self.ms: List[float] = []
+
+	def add(self, probe: Probe, img: np.ndarray, truth: Box, scale: float = 1.0) -> None:
+		started = time.perf_counter()
+		res, w, h = probe.response(img, scale)
+		_, best, _, loc = cv2.minMaxLoc(res)
+		self.ms.append((time.perf_counter() - started) * 1000.0)
+		self.trials += 1
+		if best >= THRESHOLD and iou((loc[0], loc[1], w, h), truth) >= HIT_IOU:
+			self.hits += 1
+		# Score on the template vs the best score anywhere it is not
+		tx, ty = truth[:2]
+		x0, y0 = max(0, tx - w // 2), max(0, ty - h // 2)
+		x1, y1 = min(res.shape[1], tx + w // 2 + 1), min(res.shape[0], ty + h // 2 + 1)
+		on_target = float(res[y0:y1, x0:x1].max()) if x1 > x0 and y1 > y0 else 0.0
+		res[y0:y1, x0:x1] = -1.0
+		self.margins.append(on_target - float(res.max()))
+
+	def summary(self) -> dict:
+		return {
+			'hit_rate': round(self.hits / self.trials, 4) if self.trials else None,
+			'margin': round(statistics.median(self.margins), 4) if self.margins else None,
+			'worst_margin': round(min(self.margins), 4) + 0.0 if self.margins else None,
+			'ms': round(statistics.median(self.ms), 2) if self.ms else None,
+			'trials': self.trials,
+		}
+
+
+def accepted(reduced: dict, bgr: dict) -> bool:
+	if not reduced['trials'] or reduced['hit_rate'] < bgr['hit_rate'] - HIT_TOLERANCE:
+		return False
+	for key in ('margin', 'worst_margin'):
+		# BGR margins can be negative on hard screens; then only require no worse
+		floor = bgr[key] * (1.0 - MARGIN_TOLERANCE) if bgr[key] > 0 else bgr[key]
+		if reduced[key] < floor:
+			return False
+	return True
+
+
+def synthetic_trials(template: Template, others: Dict[str, Template], screens: int, seed: int):
+	"""(image, truth box, scale) with the template and three distractors on varied backgrounds"""
+	rng = np.random.default_rng(seed)
+	pool = others | {template.name: template}
+	# Leave out the template itself, also when it is loaded under another name
+	names = [name for name, other in others.items() if name != template.name
+		and not (other.bgr.shape == template.bgr.shape and np.array_equal(other.bgr, template.bgr))]
+	for i in range(screens):
+		picked = [names[j] for j in rng.choice(len(names), min(3, len(names)), replace=False)] if names else []
+		screen = generate_screen(pool, [template.name] + picked, 1920, 1080, 1.0, NOISE_LEVELS[i % len(NOISE_LEVELS)],
+			BACKGROUNDS[i % len(BACKGROUNDS)], int(rng.integers(1 << 31)))
+		yield screen.image, screen.box_of(template.name), 1.0
+
+
+def recorded_trials(template: Template, path: str, limit: int = MAX_RECORDED_FRAMES):
+	"""Recorded frames with the BGR match as the truth (frames where BGR misses are skipped)"""
+	archive = FrameArchive(path)
+	probe = Probe(template, 'bgr')
+	step = max(1, len(archive) // limit)
+	for index in range(0, len(archive), step):
+		frame, info = archive.frame(index)
+		if frame.shape[0] < template.bgr.shape[0] * info.scale or frame.shape[1] < template.bgr.shape[1] * info.scale:
+			continue
+		res, w, h = probe.response(frame, info.scale)
+		_, best, _, loc = cv2.minMaxLoc(res)
+		if best >= THRESHOLD:
+			yield frame, (loc[0], loc[1], w, h), info.scale
+
+
+def calibrate(template: Template, others: Dict[str, Template], screens: int = SCREENS, recording: Optional[str] = None,
+		seed: int = 0) -> dict:
+	candidates = ['bgr', 'gray', dominant_channel(template.bgr, template.alpha)]
+	probes = {mode: Probe(template, mode) for mode in candidates}
+	tallies = {mode: ModeTally() for mode in candidates}
+	sources = [synthetic_trials(template, others, screens, seed)]
+	if recording:
+		sources.append(recorded_trials(template, recording))
+	for source in sources:
+		for img, truth, scale in source:
+			for mode, probe in probes.items():
+				tallies[mode].add(probe, img, truth, scale)
+	results = {mode: tally.summary() for mode, tally in tallies.items()}
+	chosen = 'bgr'
+	for mode in candidates[1:]:
+		if accepted(results[mode], results['bgr']) and (chosen == 'bgr' or results[mode]['margin'] > results[chosen]['margin']):
+			chosen = mode
+	return {'mode': chosen, 'candidates': results}
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Pick grayscale / single-channel matching per template where it is as accurate as BGR')
+	parser.add_argument('templates', nargs='+', help='template PNGs (globs allowed)')
+	parser.add_argument('--screens', type=int, default=SCREENS, help='synthetic screens per template')
+	parser.add_argument('--recording', help='also check against the frames of this recorded session')
+	parser.add_argument('--assets', help='distractor templates for the synthetic screens (default: assets/)')
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('--write', action='store_true', help='store the chosen mode next to each template')
+	args = parser.parse_args()
+
+	distractors = load_templates(args.assets)
+	paths = [p for pattern in args.templates for p in (sorted(glob.glob(pattern)) or [pattern])]
+	report = {}
+	for path in paths:
+		template = load_template(path, template_name(path))
+		if template is None:
+			print(f"{path}: unreadable, skipped")
+			continue
+		result = calibrate(template, distractors, args.screens, args.recording, args.seed)
+		report[path] = result
+		bgr = result['candidates']['bgr']
+		chosen = result['candidates'][result['mode']]
+		print(f"{path}: {result['mode']} (hit {chosen['hit_rate']} vs {bgr['hit_rate']}, margin {chosen['margin']} vs {bgr['margin']}, "
+			f"{chosen['ms']} ms vs {bgr['ms']} ms)")
+		if args.write:
+			save_match_mode(path, result['mode'], {'threshold': THRESHOLD, 'candidates': result['candidates'],
+				'recording': os.path.abspath(args.recording) if args.recording else None})
+	if not args.write:
+		print(json.dumps(report, indent=2))
@@ -0,0 +1,74 @@
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Optional, Tuple
+
+# Wall-clock epoch (ms) of perf_counter() == 0, fixed at import so local time never jumps
+_EPOCH_ANCHOR_MS = time.time() * 1000.0 - time.perf_counter() * 1000.0
+
+
+def local_ms() -> float:
+	"""Monotonic local clock in epoch milliseconds"""
+	return time.perf_counter() * 1000.0 + _EPOCH_ANCHOR_MS
+
+
+def wait_until_local_ms(target: float, spin_ms: float = 2.0) -> float:
+	"""Block until local_ms() reaches target; returns the local_ms() reading on wake.
+
+	Sleeps coarsely while far from the target (sleep can overshoot by a
+	scheduler tick), then spins the last spin_ms for sub-millisecond accuracy.
+	"""
+	while True:
+		now = local_ms()
+		remaining = target - now
+		if remaining <= 0:
+			return now
+		if remaining > spin_ms:
+			time.sleep((remaining - spin_ms) / 1000.0)
+
+
+class ClockSync:
+	"""NTP-style estimate of the controller clock from request/response timestamps.
+
+	Each sample is (t0 local send, t1 controller receive, t2 controller send,
+	t3 local receive). The offset of the sample with the smallest round trip in
+	the recent window is used, since queueing delay only ever adds to the RTT
+	and skews the offset of slow samples.
+	"""
+
+	def __init__(self, window: int = 8):
+		self.samples: Deque[Tuple[float, float]] = deque(maxlen=window)  # (rtt_ms, offset_ms)
+		self.offset_ms = 0.0
+		self.rtt_ms: Optional[float] = None
+		self.sample_count = 0
+
+	@property
+	def synced(self) -> bool:
+		return self.sample_count > 0
+
+	def add_sample(self, t0: float, t1: float, t2: float, t3: float) -> None:
+		rtt = (t3 - t0) - (t2 - t1)
+		if rtt < 0:
+			return
+		offset = ((t1 - t0) + (t2 - t3)) / 2.0
+		self.samples.append((rtt, offset))
+		self.sample_count += 1
+		self.rtt_ms, self.offset_ms = min(self.samples)
+
+	def controller_ms(self, local: Optional[float] = None) -> float:
+		"""Controller time (epoch ms) for a local_ms() reading (default: now)"""
+		return (local_ms() if local is None else local) + self.offset_ms
+
+	def to_local_ms(self, controller: float) -> float:
+		"""Local local_ms() reading at which the controller clock shows `controller`"""
+		return controller - self.offset_ms
+
+	def controller_iso(self) -> str:
+		return datetime.fromtimestamp(self.controller_ms() / 1000.0, timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+	def stats(self) -> dict:
+		return {
+			'offsetMs': round(self.offset_ms, 3),
+			'rttMs': None if self.rtt_ms is None else round(self.rtt_ms, 3),
+			'samples': self.sample_count,
+		}
@@ -0,0 +1,101 @@
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Mapping, Optional, Tuple
+
+REQUIRED_POSITIONS = ('player_area', 'banker_area', 'cancel_button')
+
+
+@dataclass(frozen=True, slots=True)
+class PositionRecord:
+    """Read-only copy of a Position"""
+    x: int
+    y: int
+    width: int
+    height: int
+    name: str
+    rel_x: Optional[int] = None
+    rel_y: Optional[int] = None
+
+
+@dataclass(frozen=True, slots=True)
+class ChipRecord:
+    amount: int
+    position: PositionRecord
+
+
+class AnchorRef:
+    """The table anchor of a published layout and its tracker, created on first use.
+
+    Republishing an unchanged anchor reuses its AnchorRef, so the tracker
+    keeps its fix; a new or changed anchor gets a new one.
+    """
+    __slots__ = ('anchor', '_create', '_tracker', '_lock')
+
+    def __init__(self, anchor: Any, create: Callable[[Any], Any], tracker: Any = None):
+        self.anchor = anchor
+        self._create = create
+        self._tracker = tracker
+        self._lock = threading.Lock()
+
+    def tracker(self):
+        if self._tracker is None:
+            with self._lock:
+                if self._tracker is None:
+                    self._tracker = self._create(self.anchor)
+        return self._tracker
+
+
+@dataclass(frozen=True, slots=True)
+class ConfigSnapshot:
+    """Immutable view of one layout, safe to read from any thread without locking.
+
+    The configuration UI never changes a published snapshot; it publishes a
+    new one with a higher version instead. The anchor tracker travels with
+    the rel offsets measured against it, so one bet resolves every click
+    through the same anchor.
+    """
+    version: int
+    profile: Optional[str]
+    positions: Mapping[str, PositionRecord]
+    chips: Tuple[ChipRecord, ...]
+    chips_by_amount: Mapping[int, PositionRecord]
+    denominations: Tuple[int, ...]  # distinct chip amounts, largest first
+    anchor: Optional[AnchorRef] = None
+
+    def get_position(self, name: str) -> Optional[PositionRecord]:
+        return self.positions.get(name)
+
+    def get_chip_position(self, amount: int) -> Optional[PositionRecord]:
+        return self.chips_by_amount.get(amount)
+
+    def is_configured(self) -> bool:
+        return all(name in self.positions for name in REQUIRED_POSITIONS)
+
+    def get_anchor_tracker(self):
+        """Tracker of this layout's table anchor (None without an anchor)"""
+        return self.anchor.tracker() if self.anchor is not None else None
+
+
+def _record(pos) -> PositionRecord:
+    return PositionRecord(pos.x, pos.y, pos.width, pos.height, pos.name, pos.rel_x, pos.rel_y)
+
+
+def build_snapshot(version: int, profile: Optional[str], positions: Mapping, chips: Iterable,
+                   anchor: Optional[AnchorRef] = None) -> ConfigSnapshot:
+    """Copy mutable Position/ChipConfig objects into a new snapshot"""
+    position_records = {name: _record(pos) for name, pos in positions.items()}
+    chip_records = tuple(ChipRecord(int(chip.amount), _record(chip.position)) for chip in chips)
+    by_amount = {}
+    for chip in chip_records:
+        # First entry wins, as with the old linear scan
+        by_amount.setdefault(chip.amount, chip.position)
+    return ConfigSnapshot(
+        version=version,
+        profile=profile,
+        positions=MappingProxyType(position_records),
+        chips=chip_records,
+        chips_by_amount=MappingProxyType(by_amount),
+        denominations=tuple(sorted(by_amount, reverse=True)),
+        anchor=anchor
+    )
@@ -0,0 +1,119 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+from typing import Callable, Optional, Tuple
+
+
+class ConfigPersister:
+    """Write-behind JSON persistence with external-change detection.
+
+    save() only records the latest data and (re)arms a short timer, so a burst
+    of edits costs one write. Writes go to a temp file in the same directory
+    that is then renamed over the target, so readers never see a partial
+    file. A polling watcher reports edits made by other programs.
+    """
+
+    def __init__(self, path: str, on_external_change: Optional[Callable[[dict], None]] = None,
+                 debounce_s: float = 0.3, poll_s: float = 1.0):
+        self.path = path
+        self.on_external_change = on_external_change
+        self.debounce_s = debounce_s
+        self.poll_s = poll_s
+        self._lock = threading.Lock()
+        self._pending: Optional[dict] = None
+        self._timer: Optional[threading.Timer] = None
+        self._known_stat: Optional[Tuple[int, int]] = None
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        atexit.register(self.flush)
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def read(self) -> dict:
+        """Read the file and remember its state so it is not reported as an external change"""
+        with self._lock:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self._known_stat = self._stat()
+        return data
+
+    def save(self, data: dict) -> None:
+        """Schedule data to be written once edits settle"""
+        with self._lock:
+            self._pending = data
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce_s, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Write pending data now (called by the timer and at exit)"""
+        with self._lock:
+            data = self._pending
+            self._pending = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if data is None:
+                return
+            try:
+                self._write_atomic(data)
+            except Exception as e:
+                print(f"Error saving config: {e}")
+
+    def _write_atomic(self, data: dict) -> None:
+        directory = os.path.dirname(self.path) or '.'
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.json', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._known_stat = self._stat()
+
+    def start_watching(self) -> None:
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, name='config-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.flush()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_s):
+            with self._lock:
+                stat = self._stat()
+                if stat is None or stat == self._known_stat or self._pending is not None:
+                    continue
+                try:
+                    with open(self.path, 'r') as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    # Editor still writing; try again on the next poll
+                    continue
+                self._known_stat = stat
+            if self.on_external_change:
+                try:
+                    self.on_external_change(data)
+                except Exception as e:
+                    print(f"Error applying external config change: {e}")
@@ -0,0 +1,417 @@
+import asyncio
+import json
+import random
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+
+from clock_sync import ClockSync, local_ms
+from lazy_import import lazy_module
+
+websockets = lazy_module('websockets', __name__)
+
+Handler = Callable[[dict], Awaitable[None]]
+
+# Clock samples taken right after a session starts, before heartbeats refine them
+CLOCK_BURST_SAMPLES = 5
+CLOCK_BURST_INTERVAL_S = 0.1
+
+# Commands of these types wait their turn per table; everything else runs immediately
+QUEUED_TYPES = ('placeBet',)
+# A queued bet whose fire instant passed this long ago is dropped instead of clicked late
+STALE_AFTER_MS = 1000
+# How often queue/reconnect/clock metrics are pushed to the controller
+METRICS_INTERVAL_S = 30
+# Outgoing messages that finish a bet; remembered by betId to answer resends
+# (unless marked retryable, i.e. nothing was clicked)
+RESULT_TYPES = ('betSuccess', 'betError')
+
+
+class Backoff:
+	"""Exponential backoff with full jitter: sleep a random time in [0, min(cap, base * 2^n)]"""
+
+	def __init__(self, base_s: float = 0.05, cap_s: float = 5.0):
+		self.base_s = base_s
+		self.cap_s = cap_s
+		self.attempt = 0
+
+	def next_delay(self) -> float:
+		ceiling = min(self.cap_s, self.base_s * (2 ** self.attempt))
+		self.attempt += 1
+		return random.uniform(0, ceiling)
+
+	def reset(self) -> None:
+		self.attempt = 0
+
+
+class ResultCache:
+	"""Bounded, time-expiring map of bet id -> final result message"""
+
+	def __init__(self, max_entries: int = 512, ttl_s: float = 600.0):
+		self.max_entries = max_entries
+		self.ttl_s = ttl_s
+		self._entries: 'OrderedDict[str, Tuple[float, dict]]' = OrderedDict()
+
+	def _expire(self, now: float) -> None:
+		while self._entries:
+			key, (expires_at, _) = next(iter(self._entries.items()))
+			if expires_at > now:
+				break
+			del self._entries[key]
+
+	def get(self, key) -> Optional[dict]:
+		self._expire(time.monotonic())
+		entry = self._entries.get(key)
+		return None if entry is None else entry[1]
+
+	def put(self, key, result: dict) -> None:
+		now = time.monotonic()
+		self._expire(now)
+		self._entries.pop(key, None)
+		self._entries[key] = (now + self.ttl_s, result)
+		while len(self._entries) > self.max_entries:
+			self._entries.popitem(last=False)
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+
+class ControllerClient:
+	"""WebSocket session with the controller: hello -> requestAssignment -> register.
+
+	Reconnects with jittered exponential backoff. After the first registration
+	the controller hands out a resume token; presenting it on reconnect keeps
+	the same PC slot and makes the controller replay commands that were not
+	acknowledged before the drop. Commands other than the session handshake
+	are passed to the registered handlers.
+
+	Heartbeat pongs carry the local send time so the controller can answer
+	with its own timestamps; together with a short burst of clockPing
+	requests per session these feed the ClockSync estimate that stamps all
+	outgoing messages with controller-aligned time.
+
+	Commands of the queued types (bets) run one at a time per table, in
+	arrival order; a command whose id is already queued or running is dropped
+	as a duplicate and one whose fireAt is long past is dropped as stale
+	(reported through on_drop). on_accept is told about every queued command
+	as soon as it arrives, together with the commands ahead of it, so it can
+	be acknowledged before it gets its turn. Results sent for a betId are
+	cached for a while; a bet that arrives again with the same betId (resend
+	after a reconnect, retried HTTP request) is answered from the cache
+	instead of being clicked twice. All other handlers, e.g. cancelBet, run as
+	soon as they arrive so they are never stuck behind a bet. on_ready runs
+	after every registration (new or resumed session).
+	"""
+
+	def __init__(self, ws_url: str, token: str, handlers: Optional[Dict[str, Handler]] = None,
+			log: Optional[Callable[[str], None]] = None,
+			on_status: Optional[Callable[[str], None]] = None,
+			on_error: Optional[Callable[[str], None]] = None,
+			backoff: Optional[Backoff] = None, log_messages: bool = True,
+			on_drop: Optional[Callable[[dict, str], Awaitable[None]]] = None,
+			on_accept: Optional[Callable[[dict, list], Awaitable[None]]] = None,
+			on_ready: Optional[Callable[[bool], Awaitable[None]]] = None,
+			queued_types: Tuple[str, ...] = QUEUED_TYPES):
+		self.ws_url = ws_url
+		self.token = token
+		self.handlers: Dict[str, Handler] = dict(handlers or {})
+		self.log = log or (lambda msg: None)
+		self.on_status = on_status or (lambda text: None)
+		self.on_error = on_error or (lambda message: None)
+		self.backoff = backoff or Backoff()
+		self.log_messages = log_messages
+		self.on_drop = on_drop
+		self.on_accept = on_accept
+		self.on_ready = on_ready
+		self.queued_types = set(queued_types)
+		self.ws = None
+		self.pc_name: Optional[str] = None
+		self.resume_token: Optional[str] = None
+		self.keep_running = False
+		self.clock = ClockSync()
+		self.metrics = {
+			'connect_attempts': 0,
+			'reconnects': 0,
+			'resumed_sessions': 0,
+			'last_reconnect_ms': None,
+			'last_reconnect_attempts': 0,
+		}
+		self.queue_metrics = {
+			'executed': 0,
+			'dropped_duplicate': 0,
+			'dropped_stale': 0,
+			'answered_from_cache': 0,
+			'max_depth': 0,
+			'last_wait_ms': None,
+			'max_wait_ms': 0.0,
+			'total_wait_ms': 0.0,
+		}
+		self._disconnected_at: Optional[float] = None
+		self._attempts_since_drop = 0
+		self._queues: Dict[str, Deque[Tuple[float, dict]]] = {}
+		self._queue_ready: Dict[str, asyncio.Event] = {}
+		self._workers: Dict[str, asyncio.Task] = {}
+		self._running: Dict[str, dict] = {}
+		self._active_ids: Set = set()
+		self.results = ResultCache()
+		self._tasks: Set[asyncio.Task] = set()
+
+	async def close(self) -> None:
+		"""End the session without reconnecting (run on the client's event loop)"""
+		self.keep_running = False
+		if self.ws is not None:
+			await self.ws.close()
+
+	async def run(self) -> None:
+		self.keep_running = True
+		metrics_task = asyncio.ensure_future(self._report_metrics_periodically())
+		try:
+			await self._run()
+		finally:
+			metrics_task.cancel()
+			for worker in self._workers.values():
+				worker.cancel()
+
+	async def _run(self) -> None:
+		while self.keep_running:
+			self.metrics['connect_attempts'] += 1
+			self._attempts_since_drop += 1
+			try:
+				async with websockets.connect(self.ws_url) as ws:
+					self.ws = ws
+					await self._start_session(ws)
+					async for msg in ws:
+						if not self.keep_running:
+							break
+						data = json.loads(msg)
+						if self.log_messages and data.get('type') != 'clockSync':
+							self.log(f"Recv: {data}")
+						if not await self._handle(data):
+							self.keep_running = False
+							break
+			except Exception as e:
+				if self.keep_running:
+					self.on_status(f'WS error: {e}. Reconnecting...')
+					self.log(f'WS error: {e}. Reconnecting...')
+			finally:
+				self.ws = None
+			if not self.keep_running:
+				break
+			if self._disconnected_at is None:
+				self._disconnected_at = time.perf_counter()
+				self._attempts_since_drop = 0
+			await asyncio.sleep(self.backoff.next_delay())
+
+	async def _start_session(self, ws) -> None:
+		hello = {'type': 'hello', 'token': self.token}
+		if self.resume_token:
+			hello['resume'] = self.resume_token
+		await ws.send(json.dumps(hello))
+		if self.resume_token:
+			self.on_status('Reconnected. Resuming session...')
+		else:
+			await ws.send(json.dumps({'type': 'requestAssignment'}))
+			self.on_status('Connected. Awaiting assignment...')
+
+	async def _handle(self, data: dict) -> bool:
+		"""Process one message; returns False when the session must end for good"""
+		msg_type = data.get('type')
+		if msg_type == 'ping':
+			await self.ws.send(json.dumps({'type': 'pong', 't0': local_ms()}))
+		elif msg_type == 'clockSync':
+			self.clock.add_sample(data['t0'], data['t1'], data['t2'], local_ms())
+		elif msg_type == 'assignment':
+			self.pc_name = data['pc']
+			await self.ws.send(json.dumps({'type': 'register', 'pc': self.pc_name}))
+		elif msg_type == 'registered':
+			self.resume_token = data.get('resumeToken') or self.resume_token
+			await self._session_ready(resumed=False)
+		elif msg_type == 'resumed':
+			self.pc_name = data.get('pc', self.pc_name)
+			self.resume_token = data.get('resumeToken') or self.resume_token
+			await self._session_ready(resumed=True)
+		elif msg_type == 'resumeRejected':
+			# Slot expired on the controller; start over with a fresh assignment
+			self.log('Session could not be resumed; requesting a new assignment')
+			self.resume_token = None
+			self.pc_name = None
+			await self.ws.send(json.dumps({'type': 'requestAssignment'}))
+		elif msg_type == 'error':
+			# Invalid token / license issues / no free slot: retrying will not help
+			message = data.get('message', 'Unknown error')
+			self.log(f"Error: {message}")
+			self.on_error(message)
+			return False
+		elif msg_type == 'shutdown':
+			self.log(f"Controller requested shutdown: {data.get('reason', '')}")
+			return False
+		elif msg_type in self.queued_types:
+			self._enqueue(data)
+		else:
+			handler = self.handlers.get(msg_type)
+			if handler is not None:
+				self._spawn(handler(data))
+		return True
+
+	def _spawn(self, coro) -> None:
+		"""Run a handler without holding up the message loop"""
+		task = asyncio.ensure_future(coro)
+		self._tasks.add(task)
+		task.add_done_callback(self._task_done)
+
+	def _task_done(self, task: asyncio.Task) -> None:
+		self._tasks.discard(task)
+		if not task.cancelled() and task.exception() is not None:
+			self.log(f"Handler error: {task.exception()}")
+
+	@staticmethod
+	def command_id(data: dict):
+		return data.get('betId') or data.get('cmdId')
+
+	def _enqueue(self, data: dict) -> None:
+		command_id = self.command_id(data)
+		cached = self.results.get(data.get('betId')) if data.get('betId') else None
+		if cached is not None:
+			self.queue_metrics['answered_from_cache'] += 1
+			self.log(f"Bet {data['betId']} already handled; resending its result")
+			# New cmdId so the controller can settle the resent command
+			self._spawn(self.send(dict(cached, cmdId=data.get('cmdId'), duplicate=True)))
+			return
+		if command_id is not None and command_id in self._active_ids:
+			# Replayed or resent while the original is still waiting or running; it will answer
+			self.queue_metrics['dropped_duplicate'] += 1
+			self.log(f"Dropping duplicate {data.get('type')} {command_id}")
+			return
+		table = str(data.get('table', 'default'))
+		queue = self._queues.setdefault(table, deque())
+		ahead = ([self._running[table]] if table in self._running else []) + [queued for _, queued in queue]
+		queue.append((time.perf_counter(), data))
+		if self.on_accept:
+			self._spawn(self.on_accept(data, ahead))
+		if command_id is not None:
+			self._active_ids.add(command_id)
+		self.queue_metrics['max_depth'] = max(self.queue_metrics['max_depth'], len(queue))
+		self._queue_ready.setdefault(table, asyncio.Event()).set()
+		worker = self._workers.get(table)
+		if worker is None or worker.done():
+			self._workers[table] = asyncio.ensure_future(self._work(table))
+
+	async def _work(self, table: str) -> None:
+		queue = self._queues[table]
+		ready = self._queue_ready[table]
+		while True:
+			if not queue:
+				ready.clear()
+				await ready.wait()
+				continue
+			enqueued_at, data = queue.popleft()
+			command_id = self.command_id(data)
+			try:
+				wait_ms = (time.perf_counter() - enqueued_at) * 1000.0
+				self._record_wait(wait_ms)
+				fire_at = data.get('fireAt')
+				if fire_at is not None and self.clock.controller_ms() - float(fire_at) > STALE_AFTER_MS:
+					self.queue_metrics['dropped_stale'] += 1
+					self.log(f"Dropping stale {data.get('type')} {command_id} (waited {wait_ms:.0f} ms)")
+					if self.on_drop:
+						await self.on_drop(data, 'stale_command')
+					continue
+				handler = self.handlers.get(data.get('type'))
+				if handler is not None:
+					self._running[table] = data
+					await handler(data)
+				self.queue_metrics['executed'] += 1
+			except asyncio.CancelledError:
+				raise
+			except Exception as e:
+				self.log(f"Handler error: {e}")
+			finally:
+				self._running.pop(table, None)
+				self._active_ids.discard(command_id)
+
+	def _record_wait(self, wait_ms: float) -> None:
+		m = self.queue_metrics
+		m['last_wait_ms'] = round(wait_ms, 2)
+		m['max_wait_ms'] = max(m['max_wait_ms'], round(wait_ms, 2))
+		m['total_wait_ms'] += wait_ms
+
+	async def drop_queued(self, reason: str, table: Optional[str] = None) -> int:
+		"""Remove queued (not yet running) commands, e.g. after a cancel, reporting each via on_drop.
+		With table, only that table's queue is emptied."""
+		dropped = []
+		queues = self._queues.values() if table is None else [q for name, q in self._queues.items() if name == table]
+		for queue in queues:
+			while queue:
+				_, data = queue.popleft()
+				self._active_ids.discard(self.command_id(data))
+				dropped.append(data)
+		if dropped:
+			self.log(f"Dropped {len(dropped)} queued command(s): {reason}")
+		if self.on_drop:
+			for data in dropped:
+				await self.on_drop(data, reason)
+		return len(dropped)
+
+	def queue_stats(self) -> dict:
+		m = self.queue_metrics
+		started = m['executed'] + m['dropped_stale']
+		return dict(
+			m,
+			total_wait_ms=round(m['total_wait_ms'], 2),
+			avg_wait_ms=round(m['total_wait_ms'] / started, 2) if started else None,
+			depth={name: len(queue) for name, queue in self._queues.items()},
+		)
+
+	async def _session_ready(self, resumed: bool) -> None:
+		self.backoff.reset()
+		self.on_status(f'Assigned as {self.pc_name}. Ready.')
+		asyncio.ensure_future(self._clock_burst(self.ws))
+		if self.on_ready is not None:
+			self._spawn(self.on_ready(resumed))
+		if self._disconnected_at is None:
+			return
+		elapsed_ms = (time.perf_counter() - self._disconnected_at) * 1000.0
+		self._disconnected_at = None
+		self.metrics['reconnects'] += 1
+		self.metrics['last_reconnect_ms'] = round(elapsed_ms, 1)
+		self.metrics['last_reconnect_attempts'] = self._attempts_since_drop
+		if resumed:
+			self.metrics['resumed_sessions'] += 1
+		self.log(f"Reconnected as {self.pc_name} in {elapsed_ms:.0f} ms after {self._attempts_since_drop} attempt(s) ({'resumed' if resumed else 'new session'})")
+
+	async def _clock_burst(self, ws) -> None:
+		"""Take a few quick clock samples, then report metrics including the estimate"""
+		try:
+			for _ in range(CLOCK_BURST_SAMPLES):
+				await ws.send(json.dumps({'type': 'clockPing', 't0': local_ms()}))
+				await asyncio.sleep(CLOCK_BURST_INTERVAL_S)
+		except Exception:
+			return
+		self.log(f"Clock offset to controller {self.clock.offset_ms:+.1f} ms (rtt {self.clock.rtt_ms} ms)")
+		await self.report_metrics()
+
+	async def report_metrics(self) -> None:
+		await self.send({'type': 'clientMetrics', 'metrics': dict(self.metrics, clock=self.clock.stats(), queue=self.queue_stats())})
+
+	async def _report_metrics_periodically(self) -> None:
+		while True:
+			await asyncio.sleep(METRICS_INTERVAL_S)
+			if self.ws is not None:
+				await self.report_metrics()
+
+	async def send(self, obj: dict) -> None:
+		try:
+			# Always include pc name if assigned
+			if self.pc_name and 'pc' not in obj:
+				obj['pc'] = self.pc_name
+			if obj.get('type') in RESULT_TYPES and obj.get('betId') and not obj.get('duplicate') and not obj.get('retryable'):
+				self.results.put(obj['betId'], {k: v for k, v in obj.items() if k not in ('cmdId', 'timestamp')})
+			# Add controller-aligned timestamp for server/UI logs
+			if 'timestamp' not in obj:
+				obj['timestamp'] = self.clock.controller_iso()
+			if self.ws:
+				await self.ws.send(json.dumps(obj))
+				if self.log_messages:
+					self.log(f"Sent: {obj}")
+		except Exception as e:
+			self.log(f"Send error: {e}")
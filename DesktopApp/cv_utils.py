@@ -1,21 +1,68 @@
+from __future__ import annotations
+
+import json
+import threading
 import time
+from collections import OrderedDict
 from typing import Optional, Tuple, List
-import cv2
-import numpy as np
-import mss
-import pyautogui
 import os
 
-pyautogui.FAILSAFE = False
+from lazy_import import lazy_module
+
+# Heavy dependencies are imported on first use, not when this module is imported
+cv2 = lazy_module('cv2', __name__)
+np = lazy_module('numpy', __name__, 'np')
+mss = lazy_module('mss', __name__)
+pyautogui = lazy_module('pyautogui', __name__, on_load=lambda module: setattr(module, 'FAILSAFE', False))
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Monitor selection globals
+# Monitor selection globals (MON_* are filled in when the monitor is first probed)
 SELECTED_MONITOR_INDEX = 1
 MON_LEFT = 0
 MON_TOP = 0
 MON_WIDTH = 0
 MON_HEIGHT = 0
+_monitor_probed = False
+
+# Replaces live capture when set (see set_frame_source)
+_frame_source = None
+# Called with (kind, x, y) for every mouse action, e.g. by the session recorder
+_input_observer = None
+# Replaces PyAutoGUI when set (see set_input_backend)
+_input_backend = None
+# Per-thread mss instance and reusable capture / grayscale / match-result buffers
+_local = threading.local()
+# Bytes of buffers kept per thread: a 4K capture with its grayscale and channel planes plus small results
+BUFFER_BYTES = 96 * 1024 * 1024
+# Larger match results (full-screen searches, one per scale) are allocated per match instead of kept
+RESULT_BUFFER_BYTES = 4 * 1024 * 1024
+
+
+def _buffer(kind: str, shape: Tuple[int, ...], dtype) -> np.ndarray:
+	"""Reusable array of this shape for the calling thread (least recently used ones are dropped)"""
+	buffers = getattr(_local, 'buffers', None)
+	if buffers is None:
+		buffers = _local.buffers = OrderedDict()
+		_local.buffer_bytes = 0
+	key = (kind, shape)
+	buf = buffers.get(key)
+	if buf is None:
+		buf = buffers[key] = np.empty(shape, dtype)
+		_local.buffer_bytes += buf.nbytes
+		while _local.buffer_bytes > BUFFER_BYTES and len(buffers) > 1:
+			_local.buffer_bytes -= buffers.popitem(last=False)[1].nbytes
+	else:
+		buffers.move_to_end(key)
+	return buf
+
+
+def _grabber():
+	"""mss instance of the calling thread; creating one per capture costs more than the grab"""
+	sct = getattr(_local, 'sct', None)
+	if sct is None:
+		sct = _local.sct = mss.mss()
+	return sct
 
 
 def list_monitors() -> List[dict]:
@@ -24,9 +71,20 @@ def list_monitors() -> List[dict]:
 
 
 def set_selected_monitor(index: int) -> None:
-	global SELECTED_MONITOR_INDEX, MON_LEFT, MON_TOP, MON_WIDTH, MON_HEIGHT
+	"""Select the monitor to capture; it is probed on the next capture, not now"""
+	global SELECTED_MONITOR_INDEX, _monitor_probed
+	SELECTED_MONITOR_INDEX = index
+	_monitor_probed = False
+
+
+def ensure_monitor() -> None:
+	"""Probe the selected monitor once (falls back to the primary if it is gone)"""
+	global SELECTED_MONITOR_INDEX, MON_LEFT, MON_TOP, MON_WIDTH, MON_HEIGHT, _monitor_probed
+	if _monitor_probed:
+		return
 	with mss.mss() as sct:
 		monitors = sct.monitors
+		index = SELECTED_MONITOR_INDEX
 		if index < 1 or index >= len(monitors):
 			index = 1
 		SELECTED_MONITOR_INDEX = index
@@ -35,20 +93,119 @@ def set_selected_monitor(index: int) -> None:
 		MON_TOP = mon.get('top', 0)
 		MON_WIDTH = mon.get('width', 0)
 		MON_HEIGHT = mon.get('height', 0)
+	_monitor_probed = True
+
+
+def set_frame_source(source) -> None:
+	"""Serve screenshot(), grab_region() and virtual_screen_bounds() from a
+	frame_source.FrameSource (e.g. a recorded session); None captures live"""
+	global _frame_source
+	_frame_source = source
+
+
+def get_frame_source():
+	return _frame_source
+
+
+def set_input_backend(backend) -> None:
+	"""Send clicks and input pauses to an input_backend.InputBackend; None uses PyAutoGUI"""
+	global _input_backend
+	_input_backend = backend
 
-# Initialize defaults
-try:
-	set_selected_monitor(1)
-except Exception:
-	pass
+
+def input_pause(seconds: float) -> None:
+	"""Pause between mouse actions (simulated time with a recording backend)"""
+	if _input_backend is not None:
+		_input_backend.pause(seconds)
+	else:
+		time.sleep(seconds)
+
+
+def set_input_observer(callback) -> None:
+	"""callback(kind, x, y) is told about every click before it is made; None removes it"""
+	global _input_observer
+	_input_observer = callback
 
 
 def screenshot() -> np.ndarray:
+	"""The selected monitor as contiguous BGR.
+
+	A live capture is written into a buffer owned by the calling thread and
+	overwritten by that thread's next capture of the same size; copy it to
+	keep it longer.
+	"""
+	if _frame_source is not None:
+		return _frame_source.frame()
+	return capture_monitor()
+
+
+def screenshot_gray() -> np.ndarray:
+	"""screenshot() as single-channel grayscale, in a reusable per-thread buffer"""
+	return to_gray(screenshot())
+
+
+def to_gray(img: np.ndarray) -> np.ndarray:
+	"""Grayscale of a BGR image into a per-thread buffer (valid until the next call with this shape)"""
+	dst = _buffer('gray', img.shape[:2], np.uint8)
+	cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=dst)
+	return dst
+
+
+def virtual_screen_bounds() -> Tuple[int, int, int, int]:
+	"""Bounding box (left, top, width, height) of all monitors combined"""
+	if _frame_source is not None:
+		return _frame_source.virtual_bounds()
+	return capture_bounds()
+
+
+def grab_region(left: int, top: int, width: int, height: int) -> np.ndarray:
+	"""Capture an arbitrary screen rectangle (global coordinates) as BGR"""
+	if _frame_source is not None:
+		return _frame_source.region(left, top, width, height)
+	return capture_region(left, top, width, height)
+
+
+def _to_bgr(shot, kind: str) -> np.ndarray:
+	# mss returns BGRA; convert straight from its buffer into a contiguous BGR one.
+	# A BGRA slice [:, :, :3] would be copied by OpenCV on every matchTemplate instead
+	bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+	dst = _buffer(kind, (shot.height, shot.width, 3), np.uint8)
+	cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=dst)
+	return dst
+
+
+def capture_monitor() -> np.ndarray:
+	"""Live capture of the selected monitor as BGR (reused buffer, see screenshot())"""
+	ensure_monitor()
+	mon = {'left': MON_LEFT, 'top': MON_TOP, 'width': MON_WIDTH, 'height': MON_HEIGHT}
+	return _to_bgr(_grabber().grab(mon), 'monitor')
+
+
+def capture_bounds() -> Tuple[int, int, int, int]:
 	with mss.mss() as sct:
-		mon = sct.monitors[SELECTED_MONITOR_INDEX]
-		img = np.array(sct.grab(mon))
-		# mss returns BGRA; convert to BGR
-		return img[:, :, :3]
+		mon = sct.monitors[0]
+		return mon['left'], mon['top'], mon['width'], mon['height']
+
+
+def capture_region(left: int, top: int, width: int, height: int) -> np.ndarray:
+	return _to_bgr(_grabber().grab({'left': left, 'top': top, 'width': width, 'height': height}), 'region')
+
+
+def _response(img: np.ndarray, template: np.ndarray, method: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+	"""matchTemplate into a per-thread result buffer, reused for every match with the same image and template shape.
+	Results above RESULT_BUFFER_BYTES (full-screen searches) get a temporary array instead."""
+	ih, iw = img.shape[:2]
+	th, tw = template.shape[:2]
+	shape = (ih - th + 1, iw - tw + 1)
+	if shape[0] * shape[1] * 4 > RESULT_BUFFER_BYTES:
+		res = np.empty(shape, np.float32)
+	else:
+		res = _buffer('result', shape, np.float32)
+	if mask is None:
+		cv2.matchTemplate(img, template, method, result=res)
+	else:
+		cv2.matchTemplate(img, template, method, result=res, mask=mask)
+	return res
 
 
 def match_template(img: np.ndarray, template: np.ndarray, threshold: float = 0.8) -> Optional[Tuple[int, int, int, int, float]]:
@@ -57,7 +214,7 @@ def match_template(img: np.ndarray, template: np.ndarray, threshold: float = 0.8
 	ih, iw = img.shape[:2]
 	if th > ih or tw > iw:
 		return None
-	res = cv2.matchTemplate(img, template, cv2.TM_CCOEFF_NORMED)
+	res = _response(img, template, cv2.TM_CCOEFF_NORMED)
 	min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
 	if max_val >= threshold:
 		h, w = template.shape[:2]
@@ -75,7 +232,7 @@ def match_template_masked(img: np.ndarray, template: np.ndarray, mask: np.ndarra
 	if mask is not None and (mask.shape[0] != th or mask.shape[1] != tw):
 		# size mismatch; cannot match
 		return None
-	res = cv2.matchTemplate(img, template, cv2.TM_CCORR_NORMED, mask=mask)
+	res = _response(img, template, cv2.TM_CCORR_NORMED, mask)
 	min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
 	if max_val >= threshold:
 		h, w = template.shape[:2]
@@ -104,6 +261,55 @@ def load_image_with_alpha(path: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
 	return img, None
 
 
+# Channel reductions a template may be matched in (see calibrate_match_modes.py);
+# the single-channel ones cost about a third of 'bgr'
+MATCH_MODES = ('bgr', 'gray', 'blue', 'green', 'red')
+_CHANNEL_INDEX = {'blue': 0, 'green': 1, 'red': 2}
+
+
+def reduce_channels(img: np.ndarray, mode: str) -> np.ndarray:
+	"""Copy of a BGR image (e.g. a template) in match mode `mode`"""
+	if mode == 'bgr' or img.ndim == 2:
+		return img
+	if mode == 'gray':
+		return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+	return np.ascontiguousarray(img[:, :, _CHANNEL_INDEX[mode]])
+
+
+def reduce_frame(img: np.ndarray, mode: str) -> np.ndarray:
+	"""reduce_channels for captured frames, into a per-thread buffer per mode and shape"""
+	if mode == 'bgr' or img.ndim == 2:
+		return img
+	if mode == 'gray':
+		return to_gray(img)
+	dst = _buffer(mode, img.shape[:2], np.uint8)
+	cv2.extractChannel(img, _CHANNEL_INDEX[mode], dst=dst)
+	return dst
+
+
+def match_mode_path(template_path: str) -> str:
+	"""Sidecar file next to a template recording its match mode: chip.png -> chip.match.json"""
+	return os.path.splitext(template_path)[0] + '.match.json'
+
+
+def load_match_mode(template_path: str) -> str:
+	"""Match mode stored for a template; 'bgr' when none was calibrated"""
+	abs_path = template_path if os.path.isabs(template_path) else os.path.join(BASE_DIR, template_path)
+	try:
+		with open(match_mode_path(abs_path), 'r') as f:
+			mode = json.load(f).get('mode', 'bgr')
+	except (OSError, ValueError, AttributeError):
+		return 'bgr'
+	return mode if mode in MATCH_MODES else 'bgr'
+
+
+def save_match_mode(template_path: str, mode: str, report: Optional[dict] = None) -> None:
+	if mode not in MATCH_MODES:
+		raise ValueError(f"Unknown match mode '{mode}'")
+	with open(match_mode_path(template_path), 'w') as f:
+		json.dump({'mode': mode, **(report or {})}, f, indent=2)
+
+
 def build_nonwhite_mask(template_bgr: np.ndarray, alpha: Optional[np.ndarray] = None, white_thresh: int = 240) -> np.ndarray:
 	# Mask where pixel is NOT near white and (if alpha provided) alpha > 0
 	b, g, r = cv2.split(template_bgr)
@@ -137,13 +343,19 @@ def get_monitor_for_coordinates(x: int, y: int) -> dict:
 def click_center(box: Tuple[int, int, int, int], move_delay_ms: int = 100, post_click_ms: int = 150) -> None:
 	x, y, w, h = box
 	
-	# Get the monitor that contains these coordinates
-	target_monitor = get_monitor_for_coordinates(x, y)
-	
 	# Click at the exact position (x, y) without adding width/height offsets
 	# since the stored coordinates are the exact click positions
 	cx, cy = x, y
 	
+	if _input_observer is not None:
+		_input_observer('click', cx, cy)
+	if _input_backend is not None:
+		_input_backend.click(cx, cy, move_delay_ms, post_click_ms)
+		return
+	
+	# Get the monitor that contains these coordinates
+	target_monitor = get_monitor_for_coordinates(x, y)
+	
 	print(f"Clicking at exact position ({cx}, {cy}) on monitor: {target_monitor['left']},{target_monitor['top']} {target_monitor['width']}x{target_monitor['height']}")
 	
 	pyautogui.moveTo(cx, cy, duration=move_delay_ms / 1000.0)
@@ -151,6 +363,15 @@ def click_center(box: Tuple[int, int, int, int], move_delay_ms: int = 100, post_
 	time.sleep(post_click_ms / 1000.0)
 
 
+def warm_up_input() -> None:
+	"""Load PyAutoGUI and move the mouse to where it already is"""
+	if _input_backend is not None:
+		_input_backend.warm_up()
+		return
+	x, y = pyautogui.position()
+	pyautogui.moveTo(x, y)
+
+
 def find_any(img: np.ndarray, templates: List[np.ndarray], threshold: float) -> Optional[Tuple[int, int, int, int, float, int]]:
 	best = None
 	best_idx = -1
@@ -213,6 +434,100 @@ def match_template_multiscale_masked(img: np.ndarray, tpl_bgr: np.ndarray, mask:
 	return best
 
 
+# Default overlap (IoU) above which find_all treats two matches as the same instance
+NMS_OVERLAP = 0.3
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, overlap: float = NMS_OVERLAP, max_results: Optional[int] = None) -> np.ndarray:
+	"""Indices of the boxes (N x 4: x, y, w, h) kept by greedy non-maximum suppression, best score first"""
+	x0, y0 = boxes[:, 0].astype(np.float32), boxes[:, 1].astype(np.float32)
+	x1, y1 = x0 + boxes[:, 2], y0 + boxes[:, 3]
+	areas = boxes[:, 2].astype(np.float32) * boxes[:, 3]
+	order = np.argsort(-scores, kind='stable')
+	keep = []
+	while order.size and (max_results is None or len(keep) < max_results):
+		best, rest = order[0], order[1:]
+		keep.append(best)
+		# Overlap of the best remaining box with all others at once
+		iw = np.clip(np.minimum(x1[best], x1[rest]) - np.maximum(x0[best], x0[rest]), 0, None)
+		ih = np.clip(np.minimum(y1[best], y1[rest]) - np.maximum(y0[best], y0[rest]), 0, None)
+		inter = iw * ih
+		iou = inter / (areas[best] + areas[rest] - inter)
+		order = rest[iou <= overlap]
+	return np.asarray(keep, dtype=np.intp)
+
+
+def _peaks(res: np.ndarray, w: int, h: int, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+	"""Local maxima of a response map above threshold as (N x 4 boxes, scores)"""
+	# Masked correlation yields inf/nan on flat image areas
+	np.nan_to_num(res, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+	# A pixel is a peak if it is the maximum of a window about half the template size;
+	# this leaves NMS a handful of candidates per instance instead of every pixel above threshold
+	kernel = np.ones((max(1, h // 4) * 2 + 1, max(1, w // 4) * 2 + 1), np.uint8)
+	ys, xs = np.nonzero((res >= threshold) & (res >= cv2.dilate(res, kernel)))
+	boxes = np.column_stack([xs, ys, np.full(xs.size, w), np.full(xs.size, h)])
+	return boxes, res[ys, xs].astype(np.float32)
+
+
+def _ranked(boxes: np.ndarray, scores: np.ndarray, overlap: float, max_results: Optional[int], extra=None) -> List[tuple]:
+	keep = nms(boxes, scores, overlap, max_results) if len(scores) else []
+	return [tuple(int(v) for v in boxes[i]) + (float(scores[i]),) + ((extra[i],) if extra is not None else ()) for i in keep]
+
+
+def find_all(img: np.ndarray, template: np.ndarray, threshold: float = 0.8, overlap: float = NMS_OVERLAP,
+		max_results: Optional[int] = None) -> List[Tuple[int, int, int, int, float]]:
+	"""Every instance of template (like match_template, TM_CCOEFF_NORMED), best score first"""
+	th, tw = template.shape[:2]
+	ih, iw = img.shape[:2]
+	if th > ih or tw > iw:
+		return []
+	boxes, scores = _peaks(_response(img, template, cv2.TM_CCOEFF_NORMED), tw, th, threshold)
+	return _ranked(boxes, scores, overlap, max_results)
+
+
+def find_all_masked(img: np.ndarray, template: np.ndarray, mask: np.ndarray, threshold: float = 0.8,
+		overlap: float = NMS_OVERLAP, max_results: Optional[int] = None) -> List[Tuple[int, int, int, int, float]]:
+	"""Every instance of template (like match_template_masked), best score first"""
+	th, tw = template.shape[:2]
+	ih, iw = img.shape[:2]
+	if th > ih or tw > iw:
+		return []
+	if mask is not None and (mask.shape[0] != th or mask.shape[1] != tw):
+		return []
+	boxes, scores = _peaks(_response(img, template, cv2.TM_CCORR_NORMED, mask), tw, th, threshold)
+	return _ranked(boxes, scores, overlap, max_results)
+
+
+def find_all_multiscale_masked(img: np.ndarray, tpl_bgr: np.ndarray, mask: Optional[np.ndarray], scales: List[float],
+		threshold: float, overlap: float = NMS_OVERLAP, max_results: Optional[int] = None) -> List[Tuple[int, int, int, int, float, float]]:
+	"""Every instance at any of the scales, (x, y, w, h, score, scale) best score first.
+
+	Peaks of all scales go through one NMS, so an instance matched at several
+	scales is reported once, at its best scale.
+	"""
+	ih, iw = img.shape[:2]
+	all_boxes, all_scores, all_scales = [], [], []
+	for s in scales:
+		tpl_scaled = resize_image(tpl_bgr, s)
+		th, tw = tpl_scaled.shape[:2]
+		if th > ih or tw > iw:
+			continue
+		mask_scaled = resize_mask(mask, s) if mask is not None else None
+		if mask_scaled is not None and (mask_scaled.shape[0] != th or mask_scaled.shape[1] != tw):
+			mask_scaled = None
+		if mask_scaled is not None:
+			res = _response(img, tpl_scaled, cv2.TM_CCORR_NORMED, mask_scaled)
+		else:
+			res = _response(img, tpl_scaled, cv2.TM_CCOEFF_NORMED)
+		boxes, scores = _peaks(res, tw, th, threshold)
+		all_boxes.append(boxes)
+		all_scores.append(scores)
+		all_scales += [s] * len(scores)
+	if not all_scores:
+		return []
+	return _ranked(np.concatenate(all_boxes), np.concatenate(all_scores), overlap, max_results, all_scales)
+
+
 def bottom_roi(img: np.ndarray, bottom_ratio: float = 0.4) -> Tuple[np.ndarray, int]:
 	bottom_ratio = min(max(bottom_ratio, 0.05), 1.0)
 	h = img.shape[0]
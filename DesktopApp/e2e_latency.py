@@ -0,0 +1,209 @@
+"""End-to-end latency of the desktop client against a fake table window.
+
+Starts fake_table.py (a Tk window showing the bundled assets that reacts to
+real clicks), an in-process FakeController and headless.py with the layout
+profile the fake table writes. Then it sends bets while the table is open
+and reports, per bet and as p50/p90/p99 across all bets:
+
+- first_chip_ms: placeBet sent -> first chip lands on the table
+- all_chips_ms: placeBet sent -> the table shows the full amount
+- result_ms: placeBet sent -> betSuccess / betError arrives at the controller
+
+All three are measured with time.time(). Every process runs on the same
+machine, so no clock offset applies. Needs a display; on a plain Linux box
+run it under Xvfb:
+
+	xvfb-run -s "-screen 0 1920x1080x24" python e2e_latency.py --bets 20 --output e2e.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+from fake_controller import FakeController, now_ms
+from load_test import percentile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_AMOUNTS = (1000, 26000, 150000, 1276000)
+SIDES = ('Player', 'Banker')
+STARTUP_TIMEOUT_S = 60.0
+BET_TIMEOUT_S = 15.0
+
+
+class TableEvents:
+	"""JSON-line events printed by fake_table.py, read on a background task"""
+
+	def __init__(self, proc: asyncio.subprocess.Process):
+		self.proc = proc
+		self.events: List[dict] = []
+		self.betting_open = False
+		self._changed = asyncio.Condition()
+		self._reader = asyncio.ensure_future(self._read())
+
+	async def _read(self) -> None:
+		while True:
+			line = await self.proc.stdout.readline()
+			if not line:
+				break
+			try:
+				event = json.loads(line)
+			except ValueError:
+				continue
+			async with self._changed:
+				if event.get('event') == 'phase':
+					self.betting_open = event['open']
+				self.events.append(event)
+				self._changed.notify_all()
+
+	async def wait_for(self, predicate, since: int = 0, timeout: float = BET_TIMEOUT_S) -> dict:
+		deadline = time.perf_counter() + timeout
+		async with self._changed:
+			while True:
+				for event in self.events[since:]:
+					if predicate(event):
+						return event
+				since = len(self.events)
+				remaining = deadline - time.perf_counter()
+				if remaining <= 0:
+					raise TimeoutError('Fake table event did not arrive in time')
+				try:
+					await asyncio.wait_for(self._changed.wait(), remaining)
+				except asyncio.TimeoutError:
+					pass
+
+	def stack_total(self, side: str) -> int:
+		"""Amount on side now; stacks are cleared whenever betting opens"""
+		for event in reversed(self.events):
+			if event.get('event') == 'phase' and event['open']:
+				return 0
+			if event.get('event') in ('chip', 'cancel') and event['side'] == side:
+				return event['total']
+		return 0
+
+	async def wait_open(self, min_left_s: float, open_s: float) -> None:
+		"""Wait until betting is open with at least min_left_s of the phase left"""
+		while True:
+			if self.betting_open:
+				opened = next(e for e in reversed(self.events) if e.get('event') == 'phase')
+				if opened['t_ms'] + open_s * 1000.0 - now_ms() >= min_left_s * 1000.0:
+					return
+			count = len(self.events)
+			await self.wait_for(lambda e: e.get('event') == 'phase' and e['open'], since=count, timeout=STARTUP_TIMEOUT_S)
+
+
+def summary(values: List[float]) -> dict:
+	return {f"p{p}": round(percentile(values, p), 1) if values else None for p in (50, 90, 99)} | {'count': len(values)}
+
+
+async def measure_bet(controller: FakeController, table: TableEvents, pc: str, amount: int, side: str) -> dict:
+	table_since, controller_since = len(table.events), len(controller.events)
+	sent_ms = now_ms()
+	cmd_id = await controller.send_bet(pc, amount, side)
+	result = {'amount': amount, 'side': side, 'cmdId': cmd_id}
+
+	def chip_on(event: dict) -> bool:
+		return event.get('event') == 'chip' and event['side'] == side
+
+	# Earlier bets of the same phase are still on the table
+	base = table.stack_total(side)
+	first = await table.wait_for(chip_on, table_since)
+	result['first_chip_ms'] = round(first['t_ms'] - sent_ms, 1)
+	done = await table.wait_for(lambda e: chip_on(e) and e['total'] - base >= amount, table_since)
+	result['all_chips_ms'] = round(done['t_ms'] - sent_ms, 1)
+	result['chips'] = sum(1 for e in table.events[table_since:] if chip_on(e) and e['t_ms'] <= done['t_ms'])
+	result['total'] = done['total'] - base
+	outcome = await _first_result(controller, pc, cmd_id, controller_since)
+	result['result'] = outcome.data.get('type')
+	# Event.at is perf_counter(); convert it to wall-clock time like the table's stamps
+	result['result_ms'] = round(now_ms() - (time.perf_counter() - outcome.at) * 1000.0 - sent_ms, 1)
+	return result
+
+
+async def _first_result(controller: FakeController, pc: str, cmd_id: int, since: int):
+	"""betSuccess or betError for cmd_id, whichever arrives"""
+	waits = [asyncio.ensure_future(controller.wait_for(kind, pc, cmd_id, BET_TIMEOUT_S, since)) for kind in ('betSuccess', 'betError')]
+	done, pending = await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+	for task in pending:
+		task.cancel()
+	return done.pop().result()
+
+
+async def run(args) -> dict:
+	workdir = tempfile.mkdtemp(prefix='e2e-latency-')
+	config_path = os.path.join(workdir, 'macro_config.json')
+	controller = FakeController(http_port=args.http_port, ws_port=args.ws_port, verbose=args.verbose)
+	await controller.start()
+
+	table_proc = await asyncio.create_subprocess_exec(
+		sys.executable, os.path.join(HERE, 'fake_table.py'), '--config-out', config_path,
+		'--open-s', str(args.open_s), '--closed-s', str(args.closed_s),
+		cwd=HERE, stdout=asyncio.subprocess.PIPE)
+	table = TableEvents(table_proc)
+	client_proc: Optional[asyncio.subprocess.Process] = None
+	try:
+		await table.wait_for(lambda e: e.get('event') == 'ready', timeout=STARTUP_TIMEOUT_S)
+		env = dict(os.environ, CONTROLLER_HTTP_URL=controller.http_url, CONTROLLER_WS_URL=controller.ws_url,
+			CONTROLLER_USER='test', CONTROLLER_PASSWORD='test')
+		client_proc = await asyncio.create_subprocess_exec(
+			sys.executable, os.path.join(HERE, 'headless.py'), '--config', config_path, '--profile', 'fake_table',
+			cwd=HERE, env=env, stdout=None if args.verbose else asyncio.subprocess.DEVNULL)
+		await controller.wait_connected(['PC1'], timeout=STARTUP_TIMEOUT_S)
+		# Let the warm-up finish so the first bet is not measured cold
+		await controller.wait_for('clientReady', 'PC1', timeout=STARTUP_TIMEOUT_S)
+
+		bets = []
+		for i in range(args.bets):
+			amount = args.amounts[i % len(args.amounts)]
+			side = SIDES[i % len(SIDES)]
+			await table.wait_open(args.min_open_left_s, args.open_s)
+			try:
+				bet = await measure_bet(controller, table, 'PC1', amount, side)
+			except (TimeoutError, asyncio.TimeoutError):
+				bet = {'amount': amount, 'side': side, 'result': 'timeout'}
+			bets.append(bet)
+			print(json.dumps(bet), file=sys.stderr, flush=True)
+			await asyncio.sleep(args.gap_s)
+
+		measured = [b for b in bets if 'all_chips_ms' in b]
+		return {
+			'meta': {'bets': args.bets, 'amounts': list(args.amounts), 'open_s': args.open_s,
+				'display': os.environ.get('DISPLAY')},
+			'first_chip_ms': summary([b['first_chip_ms'] for b in measured]),
+			'all_chips_ms': summary([b['all_chips_ms'] for b in measured]),
+			'result_ms': summary([b['result_ms'] for b in measured if 'result_ms' in b]),
+			'failed': sum(1 for b in bets if b.get('result') != 'betSuccess'),
+			'rejected_clicks': sum(1 for e in table.events if e.get('event') == 'rejected'),
+			'bets': bets,
+		}
+	finally:
+		for proc in (client_proc, table_proc):
+			if proc is not None and proc.returncode is None:
+				proc.terminate()
+				await proc.wait()
+		await controller.stop()
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Measure command-to-chip latency against a fake table window')
+	parser.add_argument('--bets', type=int, default=20)
+	parser.add_argument('--amounts', type=lambda s: tuple(int(a) for a in s.split(',')), default=DEFAULT_AMOUNTS,
+		help='comma list of stakes, used in turn')
+	parser.add_argument('--open-s', type=float, default=12.0, help='seconds the fake table stays open')
+	parser.add_argument('--closed-s', type=float, default=3.0)
+	parser.add_argument('--min-open-left-s', type=float, default=4.0, help='only bet with at least this long left to bet')
+	parser.add_argument('--gap-s', type=float, default=0.5, help='pause between bets')
+	parser.add_argument('--http-port', type=int, default=3100)
+	parser.add_argument('--ws-port', type=int, default=3101)
+	parser.add_argument('--output', help='write the report as JSON')
+	parser.add_argument('--verbose', action='store_true', help='show controller and client logs')
+	args = parser.parse_args()
+
+	report = asyncio.run(run(args))
+	print(json.dumps({k: v for k, v in report.items() if k != 'bets'}, indent=2))
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(report, f, indent=2)
@@ -0,0 +1,399 @@
+"""Stand-in for the Node controller, for local end-to-end tests and benchmarks.
+
+Speaks the same protocol as Controller/server.js: POST /api/login, /api/bet
+and /api/cancelBetAll over HTTP, and hello / requestAssignment / register /
+ping-pong / clockPing / placeBet / cancelBet / betAck / betProgress /
+betSuccess / betError over WebSocket, including session resume. It can be
+driven from Python (FakeController methods) or from a JSON script:
+
+	python fake_controller.py --script scenario.json
+
+	[
+		{"at": 3.0, "action": "bet", "pc": "PC1", "amount": 25, "side": "Player"},
+		{"at": 3.0, "action": "delay", "ms": 40},
+		{"at": 5.0, "action": "disconnect", "pc": "PC2"},
+		{"at": 8.0, "action": "cancel", "pc": "PC1"}
+	]
+
+Bets and cancels take an optional "table" (a layout profile name), passed
+through to the PCs as /api/bet and /api/cancelBetAll do.
+
+Point the desktop app at it with CONTROLLER_HTTP_URL / CONTROLLER_WS_URL.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import secrets
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import websockets
+
+PCS = ('PC1', 'PC2')
+HEARTBEAT_INTERVAL_S = 10.0
+RESUME_GRACE_S = 30.0
+FIRE_LEAD_MS = 250
+
+
+def now_ms() -> float:
+	return time.time() * 1000.0
+
+
+@dataclass
+class Session:
+	pc: str
+	resume_token: str
+	ws: Optional[object] = None
+	pending: Dict[int, dict] = field(default_factory=dict)  # cmdId -> message awaiting its result
+	expiry: Optional[asyncio.TimerHandle] = None
+
+
+@dataclass
+class Event:
+	"""A message received from a desktop client"""
+	at: float  # time.perf_counter() on arrival
+	pc: Optional[str]
+	data: dict
+
+
+class FakeController:
+	def __init__(self, host: str = '127.0.0.1', http_port: int = 3100, ws_port: int = 3101,
+			users: Optional[Dict[str, str]] = None, verbose: bool = True):
+		self.host = host
+		self.http_port = http_port
+		self.ws_port = ws_port
+		self.users = dict(users or {'test': 'test'})
+		self.verbose = verbose
+		self.tokens: Dict[str, str] = {}  # token -> user
+		self.sessions: Dict[str, Session] = {}  # resume token -> session
+		self.events: List[Event] = []
+		self.delay_ms = 0.0  # added before every message sent to a client
+		self.sent_at: Dict[int, float] = {}  # cmdId -> time.perf_counter() when sent
+		self._cmd_ids = itertools.count(1)
+		self._event_added: Optional[asyncio.Condition] = None
+		self._http_server = None
+		self._ws_server = None
+		self._heartbeat: Optional[asyncio.Task] = None
+
+	@property
+	def http_url(self) -> str:
+		return f"http://{self.host}:{self.http_port}"
+
+	@property
+	def ws_url(self) -> str:
+		return f"ws://{self.host}:{self.ws_port}"
+
+	def log(self, msg: str) -> None:
+		if self.verbose:
+			print(f"[fake-controller] {msg}", flush=True)
+
+	async def start(self) -> None:
+		self._event_added = asyncio.Condition()
+		self._http_server = await asyncio.start_server(self._serve_http, self.host, self.http_port)
+		self._ws_server = await websockets.serve(self._serve_ws, self.host, self.ws_port)
+		self._heartbeat = asyncio.ensure_future(self._heartbeat_loop())
+		self.log(f"HTTP on {self.http_url}, WebSocket on {self.ws_url}")
+
+	async def stop(self) -> None:
+		if self._heartbeat:
+			self._heartbeat.cancel()
+		for server in (self._ws_server, self._http_server):
+			if server is not None:
+				server.close()
+				await server.wait_closed()
+
+	# ----- scripting API -----
+
+	def connected(self, pc: str) -> bool:
+		return self._session_for(pc) is not None
+
+	async def wait_connected(self, pcs=PCS, timeout: float = 30.0) -> None:
+		deadline = time.perf_counter() + timeout
+		while not all(self.connected(pc) for pc in pcs):
+			if time.perf_counter() > deadline:
+				raise TimeoutError(f"PCs not connected: {[pc for pc in pcs if not self.connected(pc)]}")
+			await asyncio.sleep(0.05)
+
+	async def send_bet(self, pc: str, amount: int, side: str, bet_id: Optional[str] = None,
+			fire_at: Optional[float] = None, platform: str = 'Pragmatic', table: Optional[str] = None,
+			**extra) -> Optional[int]:
+		"""Send placeBet to one PC; returns its cmdId (None if not connected)"""
+		message = {'type': 'placeBet', 'betId': bet_id or secrets.token_hex(6), 'platform': platform,
+			'amount': amount, 'side': side, **extra}
+		if fire_at is not None:
+			message['fireAt'] = fire_at
+		# Layout profile of the table on PCs that bet on several (omitted like server.js does)
+		if table is not None:
+			message['table'] = table
+		return await self._send_command(pc, message)
+
+	async def send_dual_bet(self, pc: str, amount: int, side: str, fire_delay_ms: float = FIRE_LEAD_MS,
+			bet_id: Optional[str] = None, table: Optional[str] = None) -> Dict[str, Optional[int]]:
+		"""Same as /api/bet without `single`: opposite sides on both PCs, common fire instant"""
+		bet_id = bet_id or secrets.token_hex(6)
+		fire_at = round(now_ms() + fire_delay_ms)
+		other = 'PC2' if pc == 'PC1' else 'PC1'
+		opposite = 'Banker' if side == 'Player' else 'Player'
+		return {
+			pc: await self.send_bet(pc, amount, side, bet_id, fire_at, table=table),
+			other: await self.send_bet(other, amount, opposite, bet_id, fire_at, table=table),
+		}
+
+	async def send_cancel(self, pc: str, table: Optional[str] = None) -> Optional[int]:
+		message = {'type': 'cancelBet', 'platform': '', 'amount': None, 'side': ''}
+		if table is not None:
+			message['table'] = table
+		return await self._send_command(pc, message)
+
+	async def send_raw(self, pc: str, message: dict) -> bool:
+		session = self._session_for(pc)
+		if session is None:
+			return False
+		await self._send(session.ws, message)
+		return True
+
+	async def disconnect(self, pc: str) -> None:
+		"""Drop the PC's socket without a close handshake, like a network failure"""
+		session = self._session_for(pc)
+		if session is not None:
+			self.log(f"Dropping connection of {pc}")
+			session.ws.transport.abort()
+
+	def set_delay(self, ms: float) -> None:
+		self.delay_ms = float(ms)
+
+	async def wait_for(self, msg_type: str, pc: Optional[str] = None, cmd_id: Optional[int] = None,
+			timeout: float = 30.0, since: int = 0) -> Event:
+		"""Wait for a message of msg_type (optionally from pc / for cmd_id), searching events[since:]"""
+		def match(event: Event) -> bool:
+			return (event.data.get('type') == msg_type and (pc is None or event.pc == pc)
+				and (cmd_id is None or event.data.get('cmdId') == cmd_id))
+
+		async with self._event_added:
+			deadline = time.perf_counter() + timeout
+			while True:
+				for event in self.events[since:]:
+					if match(event):
+						return event
+				since = len(self.events)
+				remaining = deadline - time.perf_counter()
+				if remaining <= 0:
+					raise TimeoutError(f"No {msg_type} from {pc or 'any PC'} within {timeout} s")
+				try:
+					await asyncio.wait_for(self._event_added.wait(), remaining)
+				except asyncio.TimeoutError:
+					pass
+
+	async def run_script(self, steps: List[dict]) -> None:
+		started = time.perf_counter()
+		for step in sorted(steps, key=lambda s: s.get('at', 0)):
+			wait = step.get('at', 0) - (time.perf_counter() - started)
+			if wait > 0:
+				await asyncio.sleep(wait)
+			action = step['action']
+			if action == 'wait_connected':
+				await self.wait_connected(step.get('pcs', PCS), step.get('timeout', 30.0))
+			elif action == 'bet':
+				await self.send_bet(step['pc'], step['amount'], step['side'], step.get('betId'), table=step.get('table'))
+			elif action == 'dual_bet':
+				await self.send_dual_bet(step['pc'], step['amount'], step['side'], step.get('fireDelayMs', FIRE_LEAD_MS), step.get('betId'),
+					step.get('table'))
+			elif action == 'cancel':
+				await self.send_cancel(step['pc'], step.get('table'))
+			elif action == 'disconnect':
+				await self.disconnect(step['pc'])
+			elif action == 'delay':
+				self.set_delay(step['ms'])
+			elif action == 'raw':
+				await self.send_raw(step['pc'], step['message'])
+			else:
+				raise ValueError(f"Unknown script action: {action}")
+
+	# ----- WebSocket protocol -----
+
+	def _session_for(self, pc: str) -> Optional[Session]:
+		for session in self.sessions.values():
+			if session.pc == pc and session.ws is not None:
+				return session
+		return None
+
+	async def _send(self, ws, message: dict) -> None:
+		if self.delay_ms:
+			await asyncio.sleep(self.delay_ms / 1000.0)
+		try:
+			await ws.send(json.dumps(message))
+		except websockets.ConnectionClosed:
+			pass
+
+	async def _send_command(self, pc: str, command: dict) -> Optional[int]:
+		session = self._session_for(pc)
+		if session is None:
+			self.log(f"{pc} is not connected; {command['type']} not sent")
+			return None
+		message = dict(command, cmdId=next(self._cmd_ids))
+		session.pending[message['cmdId']] = message
+		self.sent_at[message['cmdId']] = time.perf_counter()
+		await self._send(session.ws, message)
+		return message['cmdId']
+
+	async def _record(self, pc: Optional[str], data: dict, at: float) -> None:
+		self.events.append(Event(at, pc, data))
+		async with self._event_added:
+			self._event_added.notify_all()
+
+	async def _serve_ws(self, ws, path=None) -> None:
+		user = None
+		session: Optional[Session] = None
+		provisional_pc: Optional[str] = None
+		try:
+			async for raw in ws:
+				received_at = now_ms()
+				at = time.perf_counter()
+				data = json.loads(raw)
+				msg_type = data.get('type')
+				if msg_type == 'hello':
+					user = self.tokens.get(data.get('token'))
+					if user is None:
+						await self._send(ws, {'type': 'error', 'message': 'Invalid or expired token'})
+						await ws.close()
+						return
+					if data.get('resume'):
+						session = await self._resume(ws, data['resume'])
+				elif user is None:
+					await self._send(ws, {'type': 'error', 'message': 'Send hello first'})
+				elif msg_type == 'requestAssignment':
+					taken = {s.pc for s in self.sessions.values()}
+					free = [pc for pc in PCS if pc not in taken]
+					if not free:
+						await self._send(ws, {'type': 'error', 'message': 'Both PC slots are occupied'})
+						continue
+					provisional_pc = free[0]
+					await self._send(ws, {'type': 'assignment', 'pc': provisional_pc})
+				elif msg_type == 'register':
+					pc = data.get('pc') or provisional_pc
+					session = Session(pc, secrets.token_hex(16), ws)
+					self.sessions[session.resume_token] = session
+					await self._send(ws, {'type': 'registered', 'pc': pc, 'resumeToken': session.resume_token})
+					self.log(f"{pc} registered")
+				elif msg_type in ('pong', 'clockPing'):
+					if data.get('t0') is not None:
+						await self._send(ws, {'type': 'clockSync', 't0': data['t0'], 't1': received_at, 't2': now_ms()})
+				else:
+					pc = session.pc if session else data.get('pc')
+					if session and data.get('cmdId') in session.pending and msg_type in ('betSuccess', 'betError', 'cancelSuccess', 'cancelError'):
+						del session.pending[data['cmdId']]
+					if msg_type != 'clientMetrics':
+						self.log(f"{pc}: {msg_type} {({k: v for k, v in data.items() if k not in ('type', 'pc', 'timestamp')})}")
+					await self._record(pc, data, at)
+		except websockets.ConnectionClosed:
+			pass
+		finally:
+			if session is not None and session.ws is ws:
+				self._detach(session)
+
+	def _detach(self, session: Session) -> None:
+		session.ws = None
+		self.log(f"{session.pc} disconnected; holding its slot for {RESUME_GRACE_S:.0f} s")
+		loop = asyncio.get_running_loop()
+		session.expiry = loop.call_later(RESUME_GRACE_S, self.sessions.pop, session.resume_token, None)
+
+	async def _resume(self, ws, token: str) -> Optional[Session]:
+		session = self.sessions.get(token)
+		if session is None:
+			await self._send(ws, {'type': 'resumeRejected'})
+			return None
+		if session.expiry is not None:
+			session.expiry.cancel()
+			session.expiry = None
+		if session.ws is not None and session.ws is not ws:
+			# Half-open old socket: the new one takes over
+			await session.ws.close()
+		session.ws = ws
+		await self._send(ws, {'type': 'resumed', 'pc': session.pc, 'resumeToken': session.resume_token})
+		self.log(f"{session.pc} resumed; replaying {len(session.pending)} command(s)")
+		for message in list(session.pending.values()):
+			await self._send(ws, message)
+		return session
+
+	async def _heartbeat_loop(self) -> None:
+		while True:
+			await asyncio.sleep(HEARTBEAT_INTERVAL_S)
+			for session in list(self.sessions.values()):
+				if session.ws is not None:
+					await self._send(session.ws, {'type': 'ping'})
+
+	# ----- HTTP API -----
+
+	async def _serve_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+		try:
+			request_line = (await reader.readline()).decode('latin-1').split()
+			headers = {}
+			while True:
+				line = (await reader.readline()).decode('latin-1').strip()
+				if not line:
+					break
+				name, _, value = line.partition(':')
+				headers[name.strip().lower()] = value.strip()
+			body = await reader.readexactly(int(headers.get('content-length', 0) or 0))
+			method, path = (request_line + ['', ''])[:2]
+			status, payload = await self._route(method, path, json.loads(body) if body else {})
+		except Exception as e:
+			status, payload = 400, {'success': False, 'message': str(e)}
+		encoded = json.dumps(payload).encode()
+		writer.write(f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+			f"Content-Type: application/json\r\nContent-Length: {len(encoded)}\r\nConnection: close\r\n\r\n".encode() + encoded)
+		await writer.drain()
+		writer.close()
+
+	async def _route(self, method: str, path: str, body: dict):
+		if method == 'POST' and path == '/api/login':
+			if self.users.get(body.get('username')) != body.get('password'):
+				return 401, {'success': False, 'message': 'Invalid credentials'}
+			token = secrets.token_hex(16)
+			self.tokens[token] = body['username']
+			return 200, {'success': True, 'token': token, 'licenseEndDate': None}
+		if method == 'POST' and path == '/api/bet':
+			if body.get('single'):
+				cmd_id = await self.send_bet(body['pc'], body['amount'], body['side'], body.get('betId'), table=body.get('table'))
+				if cmd_id is None:
+					return 404, {'success': False, 'message': f"{body['pc']} is not connected"}
+				return 200, {'success': True, 'cmdIds': {body['pc']: cmd_id}}
+			cmd_ids = await self.send_dual_bet(body['pc'], body['amount'], body['side'],
+				body.get('fireDelayMs', FIRE_LEAD_MS), body.get('betId'), body.get('table'))
+			if None in cmd_ids.values():
+				return 404, {'success': False, 'message': 'One or both PCs are not connected'}
+			return 200, {'success': True, 'cmdIds': cmd_ids}
+		if method == 'POST' and path == '/api/cancelBetAll':
+			return 200, {'success': True, 'cmdIds': {pc: await self.send_cancel(pc, body.get('table')) for pc in PCS if self.connected(pc)}}
+		if method == 'GET' and path == '/api/status':
+			return 200, {pc: self.connected(pc) for pc in PCS}
+		return 404, {'success': False, 'message': f"No route for {method} {path}"}
+
+
+async def _main(args) -> None:
+	controller = FakeController(args.host, args.http_port, args.ws_port, {args.user: args.password})
+	await controller.start()
+	print(f"CONTROLLER_HTTP_URL={controller.http_url} CONTROLLER_WS_URL={controller.ws_url}", flush=True)
+	try:
+		if args.script:
+			with open(args.script, 'r') as f:
+				await controller.run_script(json.load(f))
+		await asyncio.Event().wait()
+	finally:
+		await controller.stop()
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Local stand-in for the Node controller')
+	parser.add_argument('--host', default='127.0.0.1')
+	parser.add_argument('--http-port', type=int, default=3100)
+	parser.add_argument('--ws-port', type=int, default=3101)
+	parser.add_argument('--user', default='test')
+	parser.add_argument('--password', default='test')
+	parser.add_argument('--script', help='JSON list of timed actions to run')
+	try:
+		asyncio.run(_main(parser.parse_args()))
+	except KeyboardInterrupt:
+		pass
@@ -0,0 +1,197 @@
+"""Fake baccarat table window for end-to-end tests without a casino site.
+
+Draws the bundled assets (chip row, player and banker areas, cancel button)
+on a Tk canvas at a fixed position and reacts to real mouse clicks the way
+the live table does:
+
+- Clicking a chip selects it.
+- Clicking a bet area while betting is open stacks the selected chip there.
+- The cancel button takes back the last chip.
+
+Betting alternates between open and closed phases. Every change is printed
+to stdout as one JSON object per line, stamped with time.time() in ms so
+another process on the same machine can measure latency against it:
+
+	{"event": "ready", "t_ms": ..., "config": "/tmp/fake_table.json"}
+	{"event": "phase", "t_ms": ..., "open": true}
+	{"event": "chip", "t_ms": ..., "side": "Player", "amount": 25000, "total": 26000}
+	{"event": "rejected", "t_ms": ..., "side": "Player", "reason": "closed"}
+	{"event": "cancel", "t_ms": ..., "side": "Player", "amount": 1000, "total": 25000}
+
+--config-out writes a macro configuration whose layout profile 'fake_table'
+points at the window, so the desktop client can bet on it without being
+configured by hand. Runs on a plain Linux box under Xvfb (see e2e_latency.py).
+
+	python fake_table.py --config-out /tmp/fake_table.json --open-s 12 --closed-s 4
+"""
+import argparse
+import base64
+import json
+import time
+import tkinter as tk
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from synthetic_screens import load_templates
+
+WIDTH, HEIGHT = 1280, 720
+FELT = '#1e5a1e'
+AREA_CENTERS = {'Player': (400, 300), 'Banker': (880, 300)}
+CHIP_ROW_Y = 610
+CHIP_SPACING = 130
+CANCEL_CENTER = (1200, 610)
+CHIP_SIZE = 100
+PROFILE = 'fake_table'
+
+
+def _photo(bgr: np.ndarray, alpha: Optional[np.ndarray], size: Optional[Tuple[int, int]] = None) -> tk.PhotoImage:
+	"""Tk image from a BGR(+alpha) array, via PNG so no imaging library is needed"""
+	img = np.dstack([bgr, alpha]) if alpha is not None else bgr
+	if size is not None:
+		img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+	ok, png = cv2.imencode('.png', img)
+	return tk.PhotoImage(data=base64.b64encode(png.tobytes()))
+
+
+def _emit(event: str, **data) -> None:
+	print(json.dumps({'event': event, 't_ms': round(time.time() * 1000.0, 3), **data}), flush=True)
+
+
+class FakeTable:
+	def __init__(self, root: tk.Tk, open_s: float = 12.0, closed_s: float = 4.0):
+		self.root = root
+		self.open_s = open_s
+		self.closed_s = closed_s
+		self.betting_open = False
+		self.selected_chip: Optional[int] = None
+		self.stacks: Dict[str, List[int]] = {'Player': [], 'Banker': []}
+		self._phase_ends = 0.0
+		self._images = []  # Tk drops images that are not referenced
+		self._hit_boxes: List[Tuple[str, object, Tuple[int, int, int, int]]] = []
+
+		root.title('Fake Baccarat Table')
+		# No window decorations, fixed spot: canvas coordinates + window origin = screen coordinates
+		root.overrideredirect(True)
+		root.geometry(f"{WIDTH}x{HEIGHT}+0+0")
+		self.canvas = tk.Canvas(root, width=WIDTH, height=HEIGHT, bg=FELT, highlightthickness=0)
+		self.canvas.pack()
+		self.canvas.bind('<Button-1>', self._on_click)
+		self._draw_layout()
+		self.status = self.canvas.create_text(WIDTH // 2, 60, text='', fill='white', font=('Arial', 24, 'bold'))
+		self.stack_items: Dict[str, List[int]] = {'Player': [], 'Banker': []}
+
+	def _place(self, image: tk.PhotoImage, center: Tuple[int, int], kind: str, value) -> None:
+		self._images.append(image)
+		self.canvas.create_image(*center, image=image)
+		w, h = image.width(), image.height()
+		self._hit_boxes.append((kind, value, (center[0] - w // 2, center[1] - h // 2, w, h)))
+
+	def _draw_layout(self) -> None:
+		templates = load_templates()
+		for side, name in (('Player', 'player_area'), ('Banker', 'banker_area')):
+			tpl = templates[name]
+			self._place(_photo(tpl.bgr, tpl.alpha), AREA_CENTERS[side], 'area', side)
+		self.chips = sorted(int(name[len('chip_'):]) for name in templates if name.startswith('chip_'))
+		start_x = (WIDTH - CHIP_SPACING * (len(self.chips) - 1)) // 2 - 60
+		self.chip_centers: Dict[int, Tuple[int, int]] = {}
+		for i, amount in enumerate(self.chips):
+			tpl = templates[f"chip_{amount}"]
+			center = (start_x + i * CHIP_SPACING, CHIP_ROW_Y)
+			self.chip_centers[amount] = center
+			self._place(_photo(tpl.bgr, tpl.alpha, (CHIP_SIZE, CHIP_SIZE)), center, 'chip', amount)
+		tpl = templates['cancel_button']
+		self._place(_photo(tpl.bgr, tpl.alpha), CANCEL_CENTER, 'cancel', None)
+
+	def macro_config(self) -> dict:
+		"""Layout profile in macro_config.json format with screen coordinates of this window"""
+		self.root.update_idletasks()
+		ox, oy = self.root.winfo_rootx(), self.root.winfo_rooty()
+
+		def position(name: str, center: Tuple[int, int], size: int = 60) -> dict:
+			return {'x': ox + center[0], 'y': oy + center[1], 'width': size, 'height': size, 'name': name}
+
+		positions = {
+			'player_area': position('player_area', AREA_CENTERS['Player'], 120),
+			'banker_area': position('banker_area', AREA_CENTERS['Banker'], 120),
+			'cancel_button': position('cancel_button', CANCEL_CENTER, 40),
+		}
+		chips = [{'amount': amount, 'position': position(f"chip_{amount}", center)} for amount, center in self.chip_centers.items()]
+		profile = {'display': None, 'monitor_index': 1, 'positions': positions, 'chips': chips, 'anchor': None}
+		return {'active_profile': PROFILE, 'profiles': {PROFILE: profile}}
+
+	def _hit(self, x: int, y: int):
+		for kind, value, (bx, by, bw, bh) in self._hit_boxes:
+			if bx <= x < bx + bw and by <= y < by + bh:
+				return kind, value
+		return None, None
+
+	def _on_click(self, event) -> None:
+		kind, value = self._hit(event.x, event.y)
+		if kind == 'chip':
+			self.selected_chip = value
+		elif kind == 'area':
+			if not self.betting_open:
+				_emit('rejected', side=value, reason='closed')
+			elif self.selected_chip is None:
+				_emit('rejected', side=value, reason='no_chip_selected')
+			else:
+				self.stacks[value].append(self.selected_chip)
+				self._draw_stack(value)
+				_emit('chip', side=value, amount=self.selected_chip, total=sum(self.stacks[value]))
+		elif kind == 'cancel':
+			# Undo the most recent chip on either side
+			side = max(self.stacks, key=lambda s: len(self.stacks[s]))
+			if self.stacks[side]:
+				amount = self.stacks[side].pop()
+				self._draw_stack(side)
+				_emit('cancel', side=side, amount=amount, total=sum(self.stacks[side]))
+
+	def _draw_stack(self, side: str) -> None:
+		for item in self.stack_items[side]:
+			self.canvas.delete(item)
+		self.stack_items[side] = []
+		cx, cy = AREA_CENTERS[side]
+		for i, amount in enumerate(self.stacks[side][-12:]):
+			y = cy + 70 - 6 * i
+			self.stack_items[side].append(self.canvas.create_oval(cx - 22, y - 8, cx + 22, y + 8, fill='#d4af37', outline='black'))
+		if self.stacks[side]:
+			self.stack_items[side].append(self.canvas.create_text(cx, cy + 100, text=f"{sum(self.stacks[side]):,}", fill='white', font=('Arial', 14)))
+
+	def run_phases(self) -> None:
+		"""Alternate open / closed betting; tables are cleared when betting opens"""
+		self.betting_open = not self.betting_open
+		if self.betting_open:
+			for side in self.stacks:
+				self.stacks[side] = []
+				self._draw_stack(side)
+		self._phase_ends = time.time() + (self.open_s if self.betting_open else self.closed_s)
+		_emit('phase', open=self.betting_open)
+		self.root.after(int((self.open_s if self.betting_open else self.closed_s) * 1000), self.run_phases)
+		self._tick()
+
+	def _tick(self) -> None:
+		remaining = max(0.0, self._phase_ends - time.time())
+		text = f"PLACE YOUR BETS {remaining:.0f}" if self.betting_open else 'NO MORE BETS'
+		self.canvas.itemconfigure(self.status, text=text)
+		if remaining > 0:
+			self.root.after(250, self._tick)
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Fake baccarat table reacting to real clicks')
+	parser.add_argument('--open-s', type=float, default=12.0, help='seconds betting stays open')
+	parser.add_argument('--closed-s', type=float, default=4.0, help='seconds betting stays closed')
+	parser.add_argument('--config-out', help='write a macro configuration for this window here')
+	args = parser.parse_args()
+
+	root = tk.Tk()
+	table = FakeTable(root, args.open_s, args.closed_s)
+	root.update()
+	if args.config_out:
+		with open(args.config_out, 'w') as f:
+			json.dump(table.macro_config(), f, indent=2)
+	_emit('ready', config=args.config_out)
+	table.run_phases()
+	root.mainloop()
@@ -0,0 +1,317 @@
+"""Where screen frames come from: the live display or a recorded session.
+
+cv_utils.screenshot(), grab_region() and virtual_screen_bounds() capture
+live unless a FrameSource is installed with cv_utils.set_frame_source().
+Installing a ReplayFrameSource makes every matcher (PragmaticBaccarat, the
+anchor tracker, ...) run against recorded frames, deterministically and at
+full speed:
+
+	from cv_utils import set_frame_source
+	from frame_source import ReplayFrameSource
+	set_frame_source(ReplayFrameSource('recordings/session-1'))
+
+Archive layout (one directory):
+
+	index.json           chunk list with per-frame timestamp, origin and scale
+	frames-00000.bin     raw uint8 frames of one shape, back to back
+	frames-00001.bin     ...
+
+Frames are stored uncompressed so chunks can be memory-mapped and a frame
+read without copying. A chunk holds frames of a single shape; a new chunk is
+started when the shape changes or the chunk is full. Each frame records the
+screen position of its top-left pixel (origin) and the factor it was scaled
+by when stored, so a downscaled or ROI-only frame still maps back to global
+screen coordinates.
+"""
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+import cv_utils
+from lazy_import import lazy_module
+
+cv2 = lazy_module('cv2', __name__)
+np = lazy_module('numpy', __name__, 'np')
+
+INDEX_FILE = 'index.json'
+ARCHIVE_VERSION = 1
+DEFAULT_CHUNK_FRAMES = 120
+
+
+class EndOfReplay(Exception):
+	"""The replay ran past the last recorded frame"""
+
+
+@dataclass
+class FrameInfo:
+	t_ms: float  # capture time, milliseconds on the recorder's clock
+	left: int  # global screen position of the frame's top-left pixel
+	top: int
+	scale: float = 1.0  # stored size / on-screen size
+
+
+class FrameSource:
+	"""Interface used by cv_utils for every capture"""
+
+	def frame(self) -> np.ndarray:
+		"""The selected monitor as BGR"""
+		raise NotImplementedError
+
+	def region(self, left: int, top: int, width: int, height: int) -> np.ndarray:
+		"""A rectangle in global screen coordinates as BGR"""
+		raise NotImplementedError
+
+	def virtual_bounds(self) -> Tuple[int, int, int, int]:
+		"""(left, top, width, height) of everything this source can show"""
+		raise NotImplementedError
+
+	def origin(self) -> Tuple[int, int]:
+		"""Global screen position of the top-left pixel of frame()"""
+		raise NotImplementedError
+
+
+class LiveFrameSource(FrameSource):
+	"""Captures the display with mss (what cv_utils does with no source set)"""
+
+	def frame(self) -> np.ndarray:
+		return cv_utils.capture_monitor()
+
+	def region(self, left: int, top: int, width: int, height: int) -> np.ndarray:
+		return cv_utils.capture_region(left, top, width, height)
+
+	def virtual_bounds(self) -> Tuple[int, int, int, int]:
+		return cv_utils.capture_bounds()
+
+	def origin(self) -> Tuple[int, int]:
+		cv_utils.ensure_monitor()
+		return cv_utils.MON_LEFT, cv_utils.MON_TOP
+
+
+def _write_json_atomic(path: str, data: dict) -> None:
+	directory = os.path.dirname(path)
+	fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.json', dir=directory)
+	try:
+		with os.fdopen(fd, 'w') as f:
+			json.dump(data, f)
+		os.replace(tmp_path, path)
+	except BaseException:
+		if os.path.exists(tmp_path):
+			os.remove(tmp_path)
+		raise
+
+
+class FrameArchiveWriter:
+	"""Appends frames to an archive directory (see module docstring).
+
+	The index is rewritten whenever a chunk is completed and on flush() /
+	close(), so a crash loses at most the frames of the open chunk.
+	"""
+
+	def __init__(self, path: str, chunk_frames: int = DEFAULT_CHUNK_FRAMES, meta: Optional[dict] = None):
+		os.makedirs(path, exist_ok=True)
+		self.path = path
+		self.chunk_frames = chunk_frames
+		self.chunks: List[dict] = []
+		self.meta = dict(meta or {})
+		self.bytes_written = 0
+		self._file = None
+		self._chunk: Optional[dict] = None
+		self._next_chunk = 0
+
+	def __enter__(self) -> 'FrameArchiveWriter':
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.close()
+
+	def write(self, frame: np.ndarray, info: FrameInfo) -> None:
+		frame = np.ascontiguousarray(frame, dtype=np.uint8)
+		shape = list(frame.shape)
+		if self._chunk is None or self._chunk['shape'] != shape or len(self._chunk['frames']) >= self.chunk_frames:
+			self._start_chunk(shape)
+		self._file.write(frame.data)
+		self._chunk['frames'].append(asdict(info))
+		self.bytes_written += frame.nbytes
+
+	def _start_chunk(self, shape: List[int]) -> None:
+		if self._file is not None:
+			self._file.close()
+			self._write_index()
+		name = f"frames-{self._next_chunk:05d}.bin"
+		self._next_chunk += 1
+		self._file = open(os.path.join(self.path, name), 'wb')
+		self._chunk = {'file': name, 'shape': shape, 'frames': []}
+		self.chunks.append(self._chunk)
+
+	def drop_oldest_chunk(self) -> int:
+		"""Delete the oldest completed chunk (bounded recordings); returns bytes freed"""
+		if len(self.chunks) < 2:
+			return 0
+		chunk = self.chunks.pop(0)
+		self._write_index()
+		path = os.path.join(self.path, chunk['file'])
+		freed = os.path.getsize(path)
+		os.remove(path)
+		return freed
+
+	def _write_index(self) -> None:
+		_write_json_atomic(os.path.join(self.path, INDEX_FILE),
+			{'version': ARCHIVE_VERSION, 'meta': self.meta, 'chunks': self.chunks})
+
+	def flush(self) -> None:
+		if self._file is not None:
+			self._file.flush()
+		self._write_index()
+
+	def close(self) -> None:
+		if self._file is not None:
+			self._file.close()
+			self._file = None
+		self._write_index()
+
+
+class FrameArchive:
+	"""Read side of an archive; chunks are memory-mapped on first use"""
+
+	def __init__(self, path: str):
+		self.path = path
+		with open(os.path.join(path, INDEX_FILE), 'r') as f:
+			index = json.load(f)
+		if index.get('version') != ARCHIVE_VERSION:
+			raise ValueError(f"Unsupported frame archive version {index.get('version')} in {path}")
+		self.meta: dict = index.get('meta', {})
+		self._chunks: List[dict] = index['chunks']
+		self._maps: Dict[int, np.ndarray] = {}
+		self.infos: List[FrameInfo] = []
+		self._locations: List[Tuple[int, int]] = []
+		for c, chunk in enumerate(self._chunks):
+			for i, info in enumerate(chunk['frames']):
+				self.infos.append(FrameInfo(**info))
+				self._locations.append((c, i))
+		self.timestamps: List[float] = [info.t_ms for info in self.infos]
+
+	def __len__(self) -> int:
+		return len(self.infos)
+
+
+	def _chunk_map(self, c: int) -> np.ndarray:
+		frames = self._maps.get(c)
+		if frames is None:
+			chunk = self._chunks[c]
+			frames = np.memmap(os.path.join(self.path, chunk['file']), dtype=np.uint8, mode='r',
+				shape=(len(chunk['frames']), *chunk['shape']))
+			self._maps[c] = frames
+		return frames
+
+	def frame(self, index: int) -> Tuple[np.ndarray, FrameInfo]:
+		"""Frame as stored (read-only view into the memory map) and its info"""
+		c, i = self._locations[index]
+		return self._chunk_map(c)[i], self.infos[index]
+
+
+class ReplayFrameSource(FrameSource):
+	"""Serves frames from a FrameArchive.
+
+	advance='grab' moves to the next frame on every frame() call (full
+	speed, deterministic); 'manual' stays on a frame until next() or seek();
+	'realtime' picks the frame whose original timestamp matches the time
+	elapsed since the replay started (times `speed`). region() and
+	virtual_bounds() always refer to the current frame. Downscaled frames are
+	scaled back up to screen size. Past the end EndOfReplay is raised, unless
+	loop=True.
+	"""
+
+	def __init__(self, archive, advance: str = 'grab', loop: bool = False, speed: float = 1.0):
+		if advance not in ('grab', 'manual', 'realtime'):
+			raise ValueError(f"Unknown advance mode '{advance}'")
+		self.archive = archive if isinstance(archive, FrameArchive) else FrameArchive(archive)
+		if not len(self.archive):
+			raise ValueError(f"Frame archive {self.archive.path} is empty")
+		self.advance = advance
+		self.loop = loop
+		self.speed = speed
+		self.index = -1 if advance == 'grab' else 0
+		self._started: Optional[float] = None
+
+	@property
+	def info(self) -> FrameInfo:
+		return self.archive.infos[max(self.index, 0)]
+
+	@property
+	def timestamp_ms(self) -> float:
+		"""Original capture time of the current frame"""
+		return self.info.t_ms
+
+	def seek(self, index: int) -> None:
+		"""Make frame `index` current (in 'grab' mode: the one the next frame() returns)"""
+		self.index = index - 1 if self.advance == 'grab' else index
+
+	def next(self) -> None:
+		self.index += 1
+		if self.index >= len(self.archive):
+			if not self.loop:
+				self.index = len(self.archive) - 1
+				raise EndOfReplay()
+			self.index = 0
+
+	def _sync_realtime(self) -> None:
+		now = time.perf_counter()
+		if self._started is None:
+			self._started = now
+		t0 = self.archive.infos[0].t_ms
+		target = t0 + (now - self._started) * 1000.0 * self.speed
+		stamps = self.archive.timestamps
+		while self.index + 1 < len(stamps) and stamps[self.index + 1] <= target:
+			self.index += 1
+		if self.index + 1 >= len(stamps) and target > stamps[-1]:
+			if not self.loop:
+				raise EndOfReplay()
+			self._started = now
+			self.index = 0
+
+	def _current(self) -> Tuple[np.ndarray, FrameInfo]:
+		if self.index < 0:
+			self.index = 0
+		return self.archive.frame(self.index)
+
+	def _screen_frame(self) -> Tuple[np.ndarray, FrameInfo]:
+		frame, info = self._current()
+		if info.scale != 1.0:
+			h, w = frame.shape[:2]
+			size = (max(1, round(w / info.scale)), max(1, round(h / info.scale)))
+			frame = cv2.resize(frame, size, interpolation=cv2.INTER_LINEAR)
+		return frame, info
+
+	def frame(self) -> np.ndarray:
+		if self.advance == 'grab':
+			self.next()
+		elif self.advance == 'realtime':
+			self._sync_realtime()
+		return self._screen_frame()[0]
+
+	def region(self, left: int, top: int, width: int, height: int) -> np.ndarray:
+		if self.advance == 'realtime':
+			self._sync_realtime()
+		frame, info = self._screen_frame()
+		out = np.zeros((height, width, frame.shape[2]), dtype=np.uint8)
+		# Intersection of the requested rectangle with the recorded one, in frame pixels
+		x0, y0 = max(left - info.left, 0), max(top - info.top, 0)
+		x1, y1 = min(left + width - info.left, frame.shape[1]), min(top + height - info.top, frame.shape[0])
+		if x1 > x0 and y1 > y0:
+			ox, oy = x0 + info.left - left, y0 + info.top - top
+			out[oy:oy + y1 - y0, ox:ox + x1 - x0] = frame[y0:y1, x0:x1]
+		return out
+
+	def virtual_bounds(self) -> Tuple[int, int, int, int]:
+		frame, info = self._current()
+		h, w = frame.shape[:2]
+		return info.left, info.top, round(w / info.scale), round(h / info.scale)
+
+	def origin(self) -> Tuple[int, int]:
+		info = self.info
+		return info.left, info.top
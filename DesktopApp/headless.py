@@ -0,0 +1,139 @@
+"""Desktop client without the Tk UI, for running as a service or in benchmarks.
+
+Logs in, loads the layout profile for the current display (or the one given
+with --profile), connects to the controller and executes bets, logging to
+stdout. Positions must already be configured with the normal app.
+
+With --tables LEFT,RIGHT (or BET_TABLES) it bets on several tables at once,
+one layout profile per table; see BetRunner.for_tables.
+
+Credentials come from --credentials (JSON file with "username" and
+"password") or from CONTROLLER_USER / CONTROLLER_PASSWORD. Controller URLs
+are taken from CONTROLLER_HTTP_URL / CONTROLLER_WS_URL as in main.py.
+
+	CONTROLLER_USER=alice CONTROLLER_PASSWORD=... python headless.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from typing import Tuple
+
+import requests
+
+from app_config import load_config
+from bet_runner import BetRunner
+from macro_betting import MacroBaccarat
+from macro_config import MacroConfig
+
+# How often to check for monitor / resolution changes
+DISPLAY_CHECK_S = 3.0
+
+
+def log(msg: str) -> None:
+	print(f"{time.strftime('%H:%M:%S')} {msg}", flush=True)
+
+
+def load_credentials(path: str = None) -> Tuple[str, str]:
+	if path:
+		with open(path, 'r') as f:
+			data = json.load(f)
+		return data['username'], data['password']
+	user = os.environ.get('CONTROLLER_USER')
+	password = os.environ.get('CONTROLLER_PASSWORD')
+	if not user or password is None:
+		raise SystemExit('Set CONTROLLER_USER and CONTROLLER_PASSWORD or pass --credentials')
+	return user, password
+
+
+def login(http_url: str, user: str, password: str) -> str:
+	resp = requests.post(f"{http_url}/api/login", json={'username': user, 'password': password}, timeout=10)
+	data = resp.json()
+	if not data.get('success'):
+		raise SystemExit(f"Login failed: {data.get('message', 'Login failed')}")
+	return data['token']
+
+
+async def watch_display(macro: MacroConfig) -> None:
+	loop = asyncio.get_running_loop()
+	while True:
+		await asyncio.sleep(DISPLAY_CHECK_S)
+		previous = macro.active_profile
+		if await loop.run_in_executor(None, macro.check_display_change) and macro.active_profile != previous:
+			log(f"Display changed - using layout profile '{macro.active_profile}'")
+
+
+async def run(args) -> int:
+	cfg = load_config()
+	user, password = load_credentials(args.credentials)
+
+	macro = MacroConfig(args.config)
+	# Config file edits are applied on this loop, not on the watcher thread
+	macro.set_reload_loop(asyncio.get_running_loop())
+	tables = tuple(t.strip() for t in args.tables.split(',') if t.strip()) if args.tables else cfg.tables
+	for name in tables:
+		if name not in macro.profiles:
+			raise SystemExit(f"No layout profile named '{name}' (have: {', '.join(macro.profiles)})")
+	if args.profile and not macro.switch_profile(args.profile):
+		raise SystemExit(f"No layout profile named '{args.profile}' (have: {', '.join(macro.profiles)})")
+	if not tables:
+		if not macro.is_configured():
+			log(f"Warning: layout profile '{macro.active_profile}' is not fully configured; bets will fail")
+		log(f"Using layout profile '{macro.active_profile}' ({len(macro.positions)} areas, {len(macro.chips)} chips)")
+
+	token = await asyncio.get_running_loop().run_in_executor(None, login, cfg.controller_http, user, password)
+	log(f"Logged in as {user}")
+
+	if tables:
+		runner = BetRunner.for_tables(macro, tables, log=log)
+		for name, engine in runner.tables.items():
+			if not engine.is_configured():
+				log(f"Warning: layout profile '{name}' is not fully configured; bets on that table will fail")
+		log(f"Betting on tables {', '.join(tables)}")
+	else:
+		runner = BetRunner(MacroBaccarat(macro, logger=log), log=log)
+	fatal = []
+	client = runner.create_client(cfg.controller_ws, token, log=log, on_status=log, on_error=fatal.append,
+		log_messages=args.verbose)
+
+	loop = asyncio.get_running_loop()
+	for sig in (signal.SIGINT, signal.SIGTERM):
+		try:
+			loop.add_signal_handler(sig, lambda: asyncio.ensure_future(client.close()))
+		except (NotImplementedError, RuntimeError):
+			# Windows event loops have no signal handlers; Ctrl+C raises KeyboardInterrupt instead
+			pass
+
+	runner.start_warm_up(cfg.warm_up_amounts)
+	record_dir = args.record or cfg.record_dir
+	if record_dir:
+		runner.start_recording(record_dir, cfg.record_scale, cfg.record_max_mb * 1024 * 1024)
+	watcher = asyncio.ensure_future(watch_display(macro))
+	try:
+		await client.run()
+	finally:
+		watcher.cancel()
+		runner.stop_recording()
+		macro.close()
+	if fatal:
+		log(f"Stopped: {fatal[0]}")
+		return 1
+	return 0
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Run the desktop client without a UI')
+	parser.add_argument('--credentials', help='JSON file with "username" and "password"')
+	parser.add_argument('--profile', help='layout profile to use instead of matching the display')
+	parser.add_argument('--tables', help='comma list of layout profiles, one per table, to bet on at once (default: BET_TABLES)')
+	parser.add_argument('--config', default='macro_config.json', help='macro configuration file')
+	parser.add_argument('--record', metavar='DIR', help='record frames, clicks and bet traffic under DIR (see session_recorder.py)')
+	parser.add_argument('--verbose', action='store_true', help='log every message exchanged with the controller')
+	args = parser.parse_args()
+	try:
+		sys.exit(asyncio.run(run(args)))
+	except KeyboardInterrupt:
+		pass
@@ -0,0 +1,69 @@
+"""Pluggable mouse input, so the bet engine can run without touching the mouse.
+
+cv_utils.click_center() and input_pause() use PyAutoGUI and real sleeps
+unless an InputBackend is installed with cv_utils.set_input_backend().
+RecordingInputBackend records every action instead and advances a
+SimulatedClock by the time the real action would have taken, which makes
+bet-engine runs fast and their timing deterministic (see bench_macro.py).
+"""
+from dataclasses import dataclass, field
+from typing import List
+
+
+class InputBackend:
+	def click(self, x: int, y: int, move_ms: float, settle_ms: float) -> None:
+		"""Move to (x, y) over move_ms, click, then wait settle_ms"""
+		raise NotImplementedError
+
+	def pause(self, seconds: float) -> None:
+		raise NotImplementedError
+
+	def warm_up(self) -> None:
+		"""Pay any one-off setup cost (see MacroBaccarat.warm_up)"""
+
+
+class SimulatedClock:
+	"""Millisecond clock that only moves when told to"""
+
+	def __init__(self, start_ms: float = 0.0):
+		self.ms = start_ms
+
+	def now_ms(self) -> float:
+		return self.ms
+
+	def advance(self, ms: float) -> None:
+		self.ms += ms
+
+	def sleep(self, seconds: float) -> None:
+		self.ms += seconds * 1000.0
+
+
+@dataclass
+class InputEvent:
+	t_ms: float  # simulated time the action started
+	kind: str  # 'click' or 'pause'
+	x: int = 0
+	y: int = 0
+	duration_ms: float = 0.0
+
+
+@dataclass
+class RecordingInputBackend(InputBackend):
+	clock: SimulatedClock = field(default_factory=SimulatedClock)
+	events: List[InputEvent] = field(default_factory=list)
+
+	def click(self, x: int, y: int, move_ms: float, settle_ms: float) -> None:
+		duration = move_ms + settle_ms
+		self.events.append(InputEvent(self.clock.now_ms(), 'click', x, y, duration))
+		self.clock.advance(duration)
+
+	def pause(self, seconds: float) -> None:
+		self.events.append(InputEvent(self.clock.now_ms(), 'pause', duration_ms=seconds * 1000.0))
+		self.clock.sleep(seconds)
+
+	@property
+	def clicks(self) -> List[InputEvent]:
+		return [event for event in self.events if event.kind == 'click']
+
+	def reset(self) -> None:
+		self.events.clear()
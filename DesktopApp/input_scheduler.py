@@ -0,0 +1,101 @@
+"""One mouse, several tables: decides whose clicks go next.
+
+Every MacroBaccarat clicks only while it holds a turn from an
+InputScheduler. With a single table the scheduler is just a lock. When one
+client drives several tables (see BetRunner.for_tables), all of their
+engines share one scheduler. That makes the mouse a single queue, and the
+order in which waiting bets get it decides how long each table waits.
+
+Waiting turns are granted shortest remaining work first (predicted click
+time). For a single machine this minimizes the sum of completion times
+across tables. A turn's holder offers the mouse back at safe points
+(checkpoint(); MacroBaccarat calls it before each chip selection). A
+waiting job that is shorter than what the holder still has to do takes over
+there, and the holder resumes afterwards; its table keeps its selected chip
+in the meantime. Cancels ask for a turn with zero remaining work, so they
+go next.
+
+	scheduler = InputScheduler()
+	with scheduler.turn(900.0, table='left') as turn:
+		...click...
+		turn.checkpoint(450.0)  # may pause here while a shorter bet runs
+"""
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class Turn:
+	"""A request for the mouse; remaining_ms is the work it still has to do"""
+
+	def __init__(self, scheduler: 'InputScheduler', remaining_ms: float, table: Optional[str], seq: int):
+		self.scheduler = scheduler
+		self.remaining_ms = remaining_ms
+		self.table = table
+		self.seq = seq
+		self.preempted = 0
+
+	def checkpoint(self, remaining_ms: float) -> None:
+		"""Safe point: let a shorter waiting job go first, then continue"""
+		self.scheduler._checkpoint(self, remaining_ms)
+
+
+class InputScheduler:
+	def __init__(self):
+		self._cond = threading.Condition()
+		self._owner: Optional[Turn] = None
+		self._waiting: List[Tuple[float, int, Turn]] = []
+		self._seq = itertools.count()
+		self.metrics = {'turns': 0, 'preemptions': 0, 'max_waiting': 0, 'wait_ms': {}}
+
+	@contextmanager
+	def turn(self, remaining_ms: float, table: Optional[str] = None) -> Iterator[Turn]:
+		"""Hold the mouse for a job of about remaining_ms; blocks until granted"""
+		ticket = Turn(self, max(0.0, remaining_ms), table, next(self._seq))
+		started = time.perf_counter()
+		with self._cond:
+			self._wait_for_turn(ticket)
+			self.metrics['turns'] += 1
+			waits: Dict[str, float] = self.metrics['wait_ms']
+			key = table or 'default'
+			waits[key] = round(waits.get(key, 0.0) + (time.perf_counter() - started) * 1000.0, 2)
+		try:
+			yield ticket
+		finally:
+			with self._cond:
+				if self._owner is ticket:
+					self._owner = None
+				self._cond.notify_all()
+
+	def backlog_ms(self, remaining_ms: float) -> float:
+		"""Work that would go before a new job of remaining_ms: the holder plus shorter waiting jobs"""
+		with self._cond:
+			backlog = self._owner.remaining_ms if self._owner is not None else 0.0
+			return backlog + sum(cost for cost, _, _ in self._waiting if cost <= remaining_ms)
+
+	def waiting(self) -> int:
+		with self._cond:
+			return len(self._waiting)
+
+	def _wait_for_turn(self, ticket: Turn) -> None:
+		# Called with the condition held
+		heapq.heappush(self._waiting, (ticket.remaining_ms, ticket.seq, ticket))
+		self.metrics['max_waiting'] = max(self.metrics['max_waiting'], len(self._waiting))
+		while self._owner is not None or self._waiting[0][2] is not ticket:
+			self._cond.wait()
+		heapq.heappop(self._waiting)
+		self._owner = ticket
+
+	def _checkpoint(self, ticket: Turn, remaining_ms: float) -> None:
+		with self._cond:
+			ticket.remaining_ms = max(0.0, remaining_ms)
+			if self._owner is not ticket or not self._waiting or self._waiting[0][0] >= ticket.remaining_ms:
+				return
+			ticket.preempted += 1
+			self.metrics['preemptions'] += 1
+			self._owner = None
+			self._cond.notify_all()
+			self._wait_for_turn(ticket)
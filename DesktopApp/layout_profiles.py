@@ -0,0 +1,84 @@
+import sys
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class DisplaySignature:
+    """Identifies a display setup: platform, system DPI and monitor geometry"""
+    platform: str
+    dpi: int
+    monitors: Tuple[Tuple[int, int, int, int], ...]  # (left, top, width, height) per monitor
+
+    def key(self) -> str:
+        return f"{self.platform}|{self.dpi}|{self.geometry_key()}"
+
+    def geometry_key(self) -> str:
+        return f"{self.platform}|" + ";".join(f"{l},{t},{w}x{h}" for l, t, w, h in self.monitors)
+
+    def describe(self) -> str:
+        sizes = ", ".join(f"{w}x{h}" for _, _, w, h in self.monitors)
+        return f"{len(self.monitors)} monitor(s) [{sizes}] @ {self.dpi} DPI ({self.platform})"
+
+    def to_dict(self) -> dict:
+        return {'platform': self.platform, 'dpi': self.dpi, 'monitors': [list(m) for m in self.monitors]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'DisplaySignature':
+        return cls(
+            platform=data.get('platform', ''),
+            dpi=int(data.get('dpi', 96)),
+            monitors=tuple(tuple(int(v) for v in m) for m in data.get('monitors', []))
+        )
+
+
+def system_dpi() -> int:
+    """System DPI on Windows; 96 (100% scaling) where it cannot be queried"""
+    if sys.platform == 'win32':
+        try:
+            import ctypes
+            return int(ctypes.windll.user32.GetDpiForSystem())
+        except Exception:
+            pass
+    return 96
+
+
+def current_display_signature() -> DisplaySignature:
+    """Probe the monitors currently attached"""
+    from cv_utils import list_monitors
+    monitors = list_monitors()[1:]  # skip the combined "all monitors" entry
+    return DisplaySignature(
+        platform=sys.platform,
+        dpi=system_dpi(),
+        monitors=tuple((m['left'], m['top'], m['width'], m['height']) for m in monitors)
+    )
+
+
+class ProfileIndex:
+    """In-memory map from display signature to profile name.
+
+    Exact matches (geometry and DPI) win; otherwise a profile recorded for the
+    same monitor geometry at a different DPI is used.
+    """
+
+    def __init__(self):
+        self._by_key: Dict[str, str] = {}
+        self._by_geometry: Dict[str, str] = {}
+
+    def rebuild(self, entries: Iterable[Tuple[str, Optional[DisplaySignature]]]) -> None:
+        self._by_key = {}
+        self._by_geometry = {}
+        for name, signature in entries:
+            self.add(name, signature)
+
+    def add(self, name: str, signature: Optional[DisplaySignature]) -> None:
+        if signature is None:
+            return
+        self._by_key[signature.key()] = name
+        self._by_geometry.setdefault(signature.geometry_key(), name)
+
+    def lookup(self, signature: DisplaySignature) -> Optional[str]:
+        name = self._by_key.get(signature.key())
+        if name is None:
+            name = self._by_geometry.get(signature.geometry_key())
+        return name
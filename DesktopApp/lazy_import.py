@@ -0,0 +1,39 @@
+import importlib
+import sys
+from typing import Callable, Optional
+
+
+class LazyModule:
+	"""Stand-in for a module that is imported on first attribute access.
+
+	Used for the heavy dependencies (cv2, numpy, mss, pyautogui) so that
+	importing our modules stays cheap and the login window appears quickly.
+	After loading, the proxy replaces itself in the importing module's
+	globals, so later lookups hit the real module directly.
+	"""
+
+	def __init__(self, name: str, importer: str, alias: str, on_load: Optional[Callable] = None):
+		self._name = name
+		self._importer = importer
+		self._alias = alias
+		self._on_load = on_load
+		self._module = None
+
+	def _load(self):
+		if self._module is None:
+			module = importlib.import_module(self._name)
+			if self._on_load is not None:
+				self._on_load(module)
+			self._module = module
+			importer = sys.modules.get(self._importer)
+			if importer is not None and getattr(importer, self._alias, None) is self:
+				setattr(importer, self._alias, module)
+		return self._module
+
+	def __getattr__(self, attr: str):
+		return getattr(self._load(), attr)
+
+
+def lazy_module(name: str, importer: str, alias: Optional[str] = None, on_load: Optional[Callable] = None) -> LazyModule:
+	"""lazy_module('numpy', __name__, 'np') behaves like `import numpy as np`, deferred"""
+	return LazyModule(name, importer, alias or name, on_load)
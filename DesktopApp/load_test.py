@@ -0,0 +1,234 @@
+"""Load generator: many simulated desktop clients against a controller.
+
+Every room is one controller account with two simulated PCs. The PCs use
+ControllerClient, i.e. the same hello / assignment / register / resume
+logic as the desktop app, and acknowledge bets the moment they arrive. They
+then report success after a configurable service time. Bets are driven
+through /api/bet at a target rate.
+
+	python load_test.py --rooms 50 --rate 20 --duration 60 --credentials users.json
+
+users.json is a list of [username, password] pairs, one per room; a single
+--user/--password pair is enough for one room (or for fake_controller.py).
+
+Reported: command-to-ack and command-to-result latency (p50/p90/p99, from
+the moment /api/bet is called to the moment each PC sees the bet / the
+result is sent), HTTP errors, bets without an ack and missed heartbeats.
+"""
+import argparse
+import asyncio
+import json
+import random
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from controller_client import Backoff, ControllerClient
+
+# The controller pings every 10 s; a gap longer than this counts as missed heartbeats
+HEARTBEAT_INTERVAL_S = 10.0
+HEARTBEAT_TOLERANCE = 1.5
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+	if not values:
+		return None
+	ordered = sorted(values)
+	index = min(len(ordered) - 1, max(0, round(pct / 100.0 * (len(ordered) - 1))))
+	return ordered[index]
+
+
+class SimulatedClient(ControllerClient):
+	"""ControllerClient that records heartbeat arrival and answers bets after a service time"""
+
+	def __init__(self, test: 'LoadTest', ws_url: str, token: str):
+		super().__init__(ws_url, token, handlers={'placeBet': self._on_place_bet, 'cancelBet': self._on_cancel_bet},
+			on_accept=self._on_accept, backoff=Backoff(base_s=0.1, cap_s=5.0), log_messages=False)
+		self.test = test
+		self.last_ping: Optional[float] = None
+		self.missed_heartbeats = 0
+
+	async def _handle(self, data: dict) -> bool:
+		if data.get('type') == 'ping':
+			now = time.perf_counter()
+			if self.last_ping is not None:
+				gap = now - self.last_ping
+				if gap > HEARTBEAT_INTERVAL_S * HEARTBEAT_TOLERANCE:
+					self.missed_heartbeats += round(gap / HEARTBEAT_INTERVAL_S) - 1
+			self.last_ping = now
+		return await super()._handle(data)
+
+	async def _on_accept(self, data: dict, ahead: list) -> None:
+		self.test.record_ack(data.get('betId'))
+		await self.send({'type': 'betAck', 'cmdId': data.get('cmdId'), 'betId': data.get('betId'),
+			'predictedMs': self.test.service_ms, 'queued': len(ahead)})
+
+	async def _on_place_bet(self, data: dict) -> None:
+		service_ms = max(0.0, random.gauss(self.test.service_ms, self.test.service_jitter_ms))
+		await asyncio.sleep(service_ms / 1000.0)
+		result = {'type': 'betSuccess', 'cmdId': data.get('cmdId'), 'betId': data.get('betId'),
+			'platform': data.get('platform'), 'amount': data.get('amount'), 'side': data.get('side')}
+		await self.send(result)
+		self.test.record_result(data.get('betId'))
+
+	async def _on_cancel_bet(self, data: dict) -> None:
+		await self.send({'type': 'cancelSuccess', 'cmdId': data.get('cmdId')})
+
+
+class LoadTest:
+	def __init__(self, http_url: str, ws_url: str, credentials: List[Tuple[str, str]],
+			service_ms: float = 150.0, service_jitter_ms: float = 30.0):
+		self.http_url = http_url.rstrip('/')
+		self.ws_url = ws_url
+		self.credentials = credentials
+		self.service_ms = service_ms
+		self.service_jitter_ms = service_jitter_ms
+		self.clients: List[SimulatedClient] = []
+		self.http = requests.Session()
+		self.pool = ThreadPoolExecutor(max_workers=32)
+		self.sent_at: Dict[str, float] = {}  # betId -> perf_counter when /api/bet was called
+		self.ack_ms: List[float] = []
+		self.result_ms: List[float] = []
+		self.acked: Dict[str, int] = {}
+		self.http_errors = 0
+		self.http_ms: List[float] = []
+
+	def record_ack(self, bet_id: Optional[str]) -> None:
+		sent = self.sent_at.get(bet_id)
+		if sent is not None:
+			self.ack_ms.append((time.perf_counter() - sent) * 1000.0)
+			self.acked[bet_id] = self.acked.get(bet_id, 0) + 1
+
+	def record_result(self, bet_id: Optional[str]) -> None:
+		sent = self.sent_at.get(bet_id)
+		if sent is not None:
+			self.result_ms.append((time.perf_counter() - sent) * 1000.0)
+
+	async def _post(self, path: str, body: dict) -> Tuple[int, dict]:
+		def call():
+			resp = self.http.post(f"{self.http_url}{path}", json=body, timeout=10)
+			return resp.status_code, resp.json()
+		return await asyncio.get_running_loop().run_in_executor(self.pool, call)
+
+	async def connect(self, concurrency: int = 20) -> None:
+		"""Log every room in and start its two simulated PCs"""
+		limit = asyncio.Semaphore(concurrency)
+
+		async def start_room(user: str, password: str):
+			async with limit:
+				status, data = await self._post('/api/login', {'username': user, 'password': password})
+				if not data.get('success'):
+					raise RuntimeError(f"Login failed for {user}: {data.get('message')}")
+				for _ in range(2):
+					client = SimulatedClient(self, self.ws_url, data['token'])
+					self.clients.append(client)
+					asyncio.ensure_future(client.run())
+					# Assignment is first come, first served; let PC1 settle before PC2 asks
+					deadline = time.perf_counter() + 30.0
+					while client.pc_name is None:
+						if time.perf_counter() > deadline:
+							raise RuntimeError(f"No PC assignment for {user}")
+						await asyncio.sleep(0.01)
+
+		await asyncio.gather(*(start_room(user, password) for user, password in self.credentials))
+
+	async def drive(self, rate: float, duration_s: float) -> int:
+		"""Send dual bets round-robin over the rooms at `rate` per second"""
+		interval = 1.0 / rate
+		started = time.perf_counter()
+		sent = 0
+		tasks = []
+		while time.perf_counter() - started < duration_s:
+			user = self.credentials[sent % len(self.credentials)][0]
+			tasks.append(asyncio.ensure_future(self._bet(user)))
+			sent += 1
+			# Fixed schedule, so a slow controller does not lower the offered load
+			await asyncio.sleep(max(0.0, started + sent * interval - time.perf_counter()))
+		await asyncio.gather(*tasks)
+		return sent
+
+	async def _bet(self, user: str) -> None:
+		bet_id = secrets.token_hex(8)
+		body = {'user': user, 'pc': random.choice(('PC1', 'PC2')), 'amount': 25,
+			'side': random.choice(('Player', 'Banker')), 'platform': 'Pragmatic', 'betId': bet_id}
+		self.sent_at[bet_id] = time.perf_counter()
+		try:
+			status, data = await self._post('/api/bet', body)
+			self.http_ms.append((time.perf_counter() - self.sent_at[bet_id]) * 1000.0)
+			if status != 200 or not data.get('success'):
+				self.http_errors += 1
+		except Exception:
+			self.http_errors += 1
+
+	async def close(self) -> None:
+		for client in self.clients:
+			await client.close()
+		self.pool.shutdown(wait=False)
+
+	def report(self, sent: int, duration_s: float) -> dict:
+		def summary(values: List[float]) -> dict:
+			return {f"p{p}": None if not values else round(percentile(values, p), 2) for p in (50, 90, 99)} | {
+				'max': round(max(values), 2) if values else None, 'count': len(values)}
+
+		unacked = sum(1 for bet_id in self.sent_at if self.acked.get(bet_id, 0) < 2)
+		return {
+			'rooms': len(self.credentials),
+			'clients': len(self.clients),
+			'bets_sent': sent,
+			'offered_rate': round(sent / duration_s, 2),
+			'http_errors': self.http_errors,
+			'bets_missing_ack': unacked,
+			'http_ms': summary(self.http_ms),
+			'ack_ms': summary(self.ack_ms),
+			'result_ms': summary(self.result_ms),
+			'missed_heartbeats': sum(c.missed_heartbeats for c in self.clients),
+			'reconnects': sum(c.metrics['reconnects'] for c in self.clients),
+		}
+
+
+def _load_credentials(args) -> List[Tuple[str, str]]:
+	if args.credentials:
+		with open(args.credentials, 'r') as f:
+			pairs = [tuple(pair) for pair in json.load(f)]
+	else:
+		pairs = [(args.user, args.password)]
+	if args.rooms > len(pairs):
+		raise SystemExit(f"--rooms {args.rooms} needs {args.rooms} accounts, only {len(pairs)} given")
+	return pairs[:args.rooms]
+
+
+async def _main(args) -> None:
+	test = LoadTest(args.http_url, args.ws_url, _load_credentials(args), args.service_ms, args.service_jitter_ms)
+	try:
+		connect_started = time.perf_counter()
+		await test.connect()
+		print(f"{len(test.clients)} clients connected in {time.perf_counter() - connect_started:.1f} s", flush=True)
+		sent = await test.drive(args.rate, args.duration)
+		# Let the last bets finish
+		await asyncio.sleep((args.service_ms + 4 * args.service_jitter_ms) / 1000.0 + 1.0)
+		report = test.report(sent, args.duration)
+	finally:
+		await test.close()
+	print(json.dumps(report, indent=2))
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Simulate many desktop clients against a controller')
+	parser.add_argument('--http-url', default='http://localhost:3000')
+	parser.add_argument('--ws-url', default='ws://localhost:3000')
+	parser.add_argument('--credentials', help='JSON list of [username, password], one per room')
+	parser.add_argument('--user', default='test')
+	parser.add_argument('--password', default='test')
+	parser.add_argument('--rooms', type=int, default=1)
+	parser.add_argument('--rate', type=float, default=5.0, help='bets per second over all rooms')
+	parser.add_argument('--duration', type=float, default=30.0, help='seconds of load')
+	parser.add_argument('--service-ms', type=float, default=150.0, help='simulated time to place a bet')
+	parser.add_argument('--service-jitter-ms', type=float, default=30.0)
+	parser.add_argument('--output', help='write the report as JSON')
+	asyncio.run(_main(parser.parse_args()))
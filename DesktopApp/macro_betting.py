@@ -1,13 +1,122 @@
+import heapq
+import threading
 import time
-from typing import Dict, List, Optional, Tuple, Callable
-from macro_interface import MacroInterface, Position
-from cv_utils import click_center
+from functools import reduce
+from math import gcd
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple, Callable
+from macro_config import MacroConfig
+from config_snapshot import ConfigSnapshot, PositionRecord
+from clock_sync import local_ms, wait_until_local_ms
+from cv_utils import click_center, input_pause, match_template, screenshot, warm_up_input
+from input_scheduler import InputScheduler
+
+# Pause between consecutive clicks so the table registers each one
+CLICK_INTERVAL_S = 0.05
+
+# Starting duration estimates (ms) until real bets have been measured:
+# anchor search + planning, and one click (mouse move, click, settle, interval)
+INITIAL_PREPARE_MS = 150.0
+INITIAL_CLICK_MS = 300.0
+ESTIMATE_SMOOTHING = 0.3
+
+# Without configured stakes, warm_up() composes these multiples of every chip
+WARM_UP_MULTIPLES = (1, 2, 5)
+# Compositions remembered per configuration version
+COMPOSITION_CACHE_SIZE = 256
+
+ProgressCallback = Callable[[int, int, int, float], None]  # placed, total, chip amount, remaining ms
+
+Box = Tuple[int, int, int, int]
+
+
+@dataclass
+class BetPlan:
+    """A bet resolved down to screen clicks, ready to fire"""
+    amount: int
+    side: str
+    composition: List[int]
+    clicks: List[Tuple[str, Box, Optional[int]]] = field(default_factory=list)
+    generation: int = 0  # abort generation the plan was prepared in
+    
+    def add_click(self, label: str, box: Box, places_chip: Optional[int] = None) -> None:
+        """places_chip: amount of the chip this click puts on the table, if any"""
+        self.clicks.append((label, box, places_chip))
+
+
+class ChipComposer:
+    """Chip compositions for one set of denominations.
+    
+    Gives the same result as the original dynamic programme over every amount
+    up to the target (take the largest chip that leaves a composable rest),
+    but decides "composable" from a table over residues modulo the smallest
+    chip. Cost therefore depends on the number of chips placed, not on the
+    amount.
+    """
+    
+    def __init__(self, denominations: Iterable[int]):
+        self.chips = sorted((int(c) for c in set(denominations) if c > 0), reverse=True)
+        self.unit = reduce(gcd, self.chips, 0)
+        self._units = [c // self.unit for c in self.chips]
+        self._modulus = min(self._units) if self._units else 1
+        # Smallest composable amount (in units) in each residue class, by Dijkstra
+        self._least = [0] + [None] * (self._modulus - 1)
+        heap = [(0, 0)]
+        while heap:
+            value, residue = heapq.heappop(heap)
+            if value > self._least[residue]:
+                continue
+            for chip in self._units:
+                nxt, nxt_residue = value + chip, (residue + chip) % self._modulus
+                if self._least[nxt_residue] is None or nxt < self._least[nxt_residue]:
+                    self._least[nxt_residue] = nxt
+                    heapq.heappush(heap, (nxt, nxt_residue))
+    
+    def composable(self, amount: int) -> bool:
+        if amount == 0:
+            return True
+        if amount < 0 or not self.chips or amount % self.unit:
+            return False
+        units = amount // self.unit
+        least = self._least[units % self._modulus]
+        return least is not None and units >= least
+    
+    def compose(self, amount: int) -> Optional[List[int]]:
+        if not self.composable(amount):
+            return None
+        composition = []
+        while amount > 0:
+            chip = next(c for c in self.chips if self.composable(amount - c))
+            composition.append(chip)
+            amount -= chip
+        # The dynamic programme lists the chip chosen last first
+        composition.reverse()
+        return composition
+
 
 class MacroBaccarat:
-    def __init__(self, macro_interface: MacroInterface, logger: Optional[Callable[[str], None]] = None):
+    def __init__(self, macro_interface: MacroConfig, logger: Optional[Callable[[str], None]] = None,
+                 input_scheduler: Optional[InputScheduler] = None, table: Optional[str] = None):
+        """input_scheduler: shared by the engines of all tables one client drives (see input_scheduler.py)"""
         self.macro = macro_interface
         self.logger = logger
+        self.table = table
         self.last_bet_composition = []  # Track the last bet composition for cancel logic
+        # Smoothed timings of recent bets, used to predict how long the next one takes
+        self.prepare_ms_estimate = INITIAL_PREPARE_MS
+        self.click_ms_estimate = INITIAL_CLICK_MS
+        # abort() bumps the generation; plans from an older generation stop clicking
+        self._generation = 0
+        # Clock the click sequence is timed with (a SimulatedClock in bench_macro.py)
+        self.now_ms: Callable[[], float] = local_ms
+        # Mouse input is exclusive: a cancel waits until an aborted plan has let go,
+        # and with several tables their bets take turns (shortest remaining work first)
+        self.input = input_scheduler or InputScheduler()
+        # Composer and recent compositions for the configuration version they were built from
+        self._composition_lock = threading.Lock()
+        self._composition_version: Optional[int] = None
+        self._composer = ChipComposer(())
+        self._compositions: Dict[int, Optional[List[int]]] = {}
     
     def log(self, msg: str) -> None:
         if self.logger:
@@ -17,96 +126,154 @@ class MacroBaccarat:
         """Check if all required positions are configured"""
         return self.macro.is_configured()
     
-    def get_bet_area_position(self, side: str) -> Optional[Position]:
+    def get_bet_area_position(self, side: str, snapshot: Optional[ConfigSnapshot] = None) -> Optional[PositionRecord]:
         """Get the position for a bet area"""
+        snapshot = snapshot or self.macro.get_snapshot()
         if side == 'Player':
-            return self.macro.get_position('player_area')
+            return snapshot.get_position('player_area')
         elif side == 'Banker':
-            return self.macro.get_position('banker_area')
+            return snapshot.get_position('banker_area')
         return None
     
-    def get_chip_position(self, amount: int) -> Optional[Position]:
+    def get_chip_position(self, amount: int, snapshot: Optional[ConfigSnapshot] = None) -> Optional[PositionRecord]:
         """Get the position for a specific chip amount"""
-        return self.macro.get_chip_position(amount)
+        snapshot = snapshot or self.macro.get_snapshot()
+        return snapshot.get_chip_position(amount)
     
-    def get_cancel_button_position(self) -> Optional[Position]:
+    def get_cancel_button_position(self, snapshot: Optional[ConfigSnapshot] = None) -> Optional[PositionRecord]:
         """Get the position for the cancel button"""
-        return self.macro.get_position('cancel_button')
+        snapshot = snapshot or self.macro.get_snapshot()
+        return snapshot.get_position('cancel_button')
+    
+    def refresh_anchor(self, snapshot: Optional[ConfigSnapshot] = None) -> bool:
+        """Re-locate the table anchor once for this round (no-op without an anchor)"""
+        snapshot = snapshot or self.macro.get_snapshot()
+        tracker = snapshot.get_anchor_tracker()
+        if tracker is None:
+            return True
+        return tracker.locate()
     
-    def compose_amount(self, target: int) -> Optional[List[int]]:
+    def screen_point(self, pos: PositionRecord, snapshot: Optional[ConfigSnapshot] = None) -> Tuple[int, int]:
+        """Resolve a configured position to screen coordinates via the snapshot's anchor if possible"""
+        snapshot = snapshot or self.macro.get_snapshot()
+        tracker = snapshot.get_anchor_tracker()
+        if tracker is not None and tracker.found and pos.rel_x is not None and pos.rel_y is not None:
+            return tracker.to_screen(pos.rel_x, pos.rel_y)
+        return pos.x, pos.y
+    
+    def screen_box(self, pos: PositionRecord, snapshot: Optional[ConfigSnapshot] = None) -> Box:
+        x, y = self.screen_point(pos, snapshot)
+        return x, y, pos.width, pos.height
+    
+    def click(self, pos: PositionRecord, snapshot: Optional[ConfigSnapshot] = None) -> None:
+        """Click a configured position"""
+        click_center(self.screen_box(pos, snapshot))
+    
+    def compose_amount(self, target: int, snapshot: Optional[ConfigSnapshot] = None) -> Optional[List[int]]:
         """Find the best combination of chips to reach the target amount"""
-        available_chips = [chip.amount for chip in self.macro.get_all_chips()]
-        available_chips.sort(reverse=True)
-        
-        # Dynamic programming to find the best combination
-        dp = {0: []}
-        for t in range(1, target + 1):
-            for chip in available_chips:
-                if t - chip in dp:
-                    dp[t] = dp[t - chip] + [chip]
-                    break
-        return dp.get(target)
+        snapshot = snapshot or self.macro.get_snapshot()
+        with self._composition_lock:
+            if self._composition_version != snapshot.version:
+                self._composition_version = snapshot.version
+                self._composer = ChipComposer(snapshot.denominations)
+                self._compositions = {}
+            composer, cache = self._composer, self._compositions
+        composition = cache.get(target)
+        if composition is None and target not in cache:
+            composition = composer.compose(target)
+            if len(cache) >= COMPOSITION_CACHE_SIZE:
+                cache.clear()
+            cache[target] = composition
+        return list(composition) if composition is not None else None
     
-    def place_bet(self, amount: int, side: str) -> Tuple[bool, str]:
-        """Place a bet using macro positions"""
-        self.log(f"Place bet start: amount={amount}, side={side}")
+    def count_clicks(self, amount: int, snapshot: Optional[ConfigSnapshot] = None) -> int:
+        """Number of clicks place_bet will need for amount (0 if it cannot be placed)"""
+        snapshot = snapshot or self.macro.get_snapshot()
+        if amount <= 0:
+            return 0
+        if snapshot.get_chip_position(amount):
+            return 2
+        composition = self.compose_amount(amount, snapshot)
+        if not composition:
+            return 0
+        return len(composition) + len(set(composition))
+    
+    def predict_duration_ms(self, amount: int, lead_ms: float = 0.0) -> float:
+        """Expected time from now until the bet is fully placed"""
+        return lead_ms + self.prepare_ms_estimate + self.count_clicks(amount) * self.click_ms_estimate
+    
+    def abort(self) -> None:
+        """Stop any bet that is prepared or being clicked, before its next click"""
+        self._generation += 1
+    
+    def _smooth(self, current: float, sample: float) -> float:
+        return current + ESTIMATE_SMOOTHING * (sample - current)
+    
+    def prepare_bet(self, amount: int, side: str) -> Tuple[Optional[BetPlan], str]:
+        """Validate a bet and resolve every click to screen coordinates without clicking"""
+        started = time.perf_counter()
+        plan, reason = self._prepare_bet(amount, side)
+        if plan is not None:
+            self.prepare_ms_estimate = self._smooth(self.prepare_ms_estimate, (time.perf_counter() - started) * 1000.0)
+        return plan, reason
+    
+    def _prepare_bet(self, amount: int, side: str) -> Tuple[Optional[BetPlan], str]:
+        self.log(f"Prepare bet: amount={amount}, side={side}")
+        generation = self._generation
         
         # Validate inputs
         if side not in ('Player', 'Banker'):
             self.log("Error: invalid_side")
-            return False, 'invalid_side'
+            return None, 'invalid_side'
         
         if amount <= 0:
             self.log("Error: invalid_amount")
-            return False, 'invalid_amount'
+            return None, 'invalid_amount'
+        
+        # Read the configuration once; edits made meanwhile apply to the next bet
+        snapshot = self.macro.get_snapshot()
         
         # Check if configured
-        if not self.is_configured():
+        if not snapshot.is_configured():
             self.log("Error: not_configured")
-            return False, 'not_configured'
+            return None, 'not_configured'
+        
+        # Locate the table once; every click below is relative to it
+        if not self.refresh_anchor(snapshot):
+            self.log("Error: anchor_not_found")
+            return None, 'anchor_not_found'
         
         # Get bet area position
-        area_pos = self.get_bet_area_position(side)
+        area_pos = self.get_bet_area_position(side, snapshot)
         if not area_pos:
             self.log(f"Error: bet_area_not_found ({side})")
-            return False, 'bet_area_not_found'
+            return None, 'bet_area_not_found'
         
         # Check if any chips are configured
-        available_chips = self.macro.get_all_chips()
-        if not available_chips:
+        if not snapshot.chips:
             self.log("Error: no_chips_configured")
-            return False, 'no_chips_configured'
+            return None, 'no_chips_configured'
         
         # Try to find exact chip first
-        chip_pos = self.get_chip_position(amount)
+        chip_pos = self.get_chip_position(amount, snapshot)
         if chip_pos:
             self.log(f"Exact chip found: {amount} at ({chip_pos.x},{chip_pos.y})")
-            # Track bet composition for cancel logic
-            self.last_bet_composition = [amount]
-            # Click chip first
-            self.log(f"Clicking chip at coordinates: ({chip_pos.x},{chip_pos.y})")
-            click_center((chip_pos.x, chip_pos.y, chip_pos.width, chip_pos.height))
-            time.sleep(0.05)
-            # Then click bet area
-            self.log(f"Clicking bet area at coordinates: ({area_pos.x},{area_pos.y})")
-            click_center((area_pos.x, area_pos.y, area_pos.width, area_pos.height))
-            self.log("Click sequence completed (exact chip)")
-            return True, 'ok'
+            plan = BetPlan(amount, side, [amount], generation=generation)
+            plan.add_click(f"chip {amount}", self.screen_box(chip_pos, snapshot))
+            plan.add_click("bet area", self.screen_box(area_pos, snapshot), amount)
+            return plan, 'ok'
         
         # Compose amount using available chips
-        plan = self.compose_amount(amount)
-        if not plan:
+        composition = self.compose_amount(amount, snapshot)
+        if not composition:
             self.log("Error: cannot_compose_amount")
-            return False, 'cannot_compose_amount'
+            return None, 'cannot_compose_amount'
         
-        # Track bet composition for cancel logic
-        self.last_bet_composition = plan.copy()
-        
-        self.log(f"Chip composition plan: {plan}")
+        self.log(f"Chip composition plan: {composition}")
         
         # Group chips by amount and click them in sequence
         chip_groups = {}
-        for chip_amount in plan:
+        for chip_amount in composition:
             if chip_amount not in chip_groups:
                 chip_groups[chip_amount] = 0
             chip_groups[chip_amount] += 1
@@ -114,34 +281,81 @@ class MacroBaccarat:
         self.log(f"Chip groups: {chip_groups}")
         
         # For each unique chip amount, click the chip once, then click bet area multiple times
+        plan = BetPlan(amount, side, composition, generation=generation)
+        area_box = self.screen_box(area_pos, snapshot)
         for chip_amount, count in chip_groups.items():
-            chip_pos = self.get_chip_position(chip_amount)
+            chip_pos = self.get_chip_position(chip_amount, snapshot)
             if not chip_pos:
                 self.log(f"Error: chip_not_found ({chip_amount})")
-                return False, 'chip_not_found'
-            
-            # Click the chip once
-            self.log(f"Clicking chip {chip_amount} at ({chip_pos.x},{chip_pos.y})")
-            click_center((chip_pos.x, chip_pos.y, chip_pos.width, chip_pos.height))
-            time.sleep(0.05)
-            
-            # Click bet area 'count' times for this chip
+                return None, 'chip_not_found'
+            plan.add_click(f"chip {chip_amount}", self.screen_box(chip_pos, snapshot))
             for i in range(count):
-                self.log(f"Clicking bet area for chip {chip_amount} ({i+1}/{count})")
-                click_center((area_pos.x, area_pos.y, area_pos.width, area_pos.height))
-                time.sleep(0.05)
+                plan.add_click(f"bet area for chip {chip_amount} ({i+1}/{count})", area_box, chip_amount)
+        return plan, 'ok'
+    
+    def execute_plan(self, plan: BetPlan, fire_at_local_ms: Optional[float] = None,
+                     on_progress: Optional[ProgressCallback] = None) -> Optional[float]:
+        """Run a prepared click sequence, optionally starting exactly at fire_at_local_ms.
         
-        self.log("Click sequence completed (composed chips)")
+        on_progress is called after every chip placed on the table.
+        Returns the local_ms() reading at which the first click was issued, or
+        None if the plan was aborted before completing.
+        """
+        if fire_at_local_ms is not None:
+            wait_until_local_ms(fire_at_local_ms)
+        with self.input.turn(len(plan.clicks) * self.click_ms_estimate, self.table) as turn:
+            fired_at = self.now_ms()
+            paused_ms = 0.0
+            # Track the chips actually placed for cancel logic
+            self.last_bet_composition = []
+            total = len(plan.composition)
+            for i, (label, box, chip) in enumerate(plan.clicks):
+                if i and chip is None:
+                    # About to select the next chip: a shorter bet on another table may go first
+                    paused_at = self.now_ms()
+                    turn.checkpoint((len(plan.clicks) - i) * self.click_ms_estimate)
+                    paused_ms += self.now_ms() - paused_at
+                if plan.generation != self._generation:
+                    self.log(f"Bet aborted after {len(self.last_bet_composition)}/{total} chip(s)")
+                    return None
+                if i:
+                    input_pause(CLICK_INTERVAL_S)
+                self.log(f"Clicking {label} at {box[:2]}")
+                click_center(box)
+                if chip is not None:
+                    self.last_bet_composition.append(chip)
+                    if on_progress:
+                        on_progress(len(self.last_bet_composition), total, chip, (len(plan.clicks) - i - 1) * self.click_ms_estimate)
+            if plan.clicks:
+                per_click = (self.now_ms() - fired_at - paused_ms) / len(plan.clicks)
+                self.click_ms_estimate = self._smooth(self.click_ms_estimate, per_click)
+        self.log(f"Click sequence completed ({len(plan.clicks)} clicks)")
+        return fired_at
+    
+    def place_bet(self, amount: int, side: str) -> Tuple[bool, str]:
+        """Place a bet using macro positions"""
+        plan, reason = self.prepare_bet(amount, side)
+        if plan is None:
+            return False, reason
+        if self.execute_plan(plan) is None:
+            return False, 'aborted'
         return True, 'ok'
     
     def cancel_bet(self) -> Tuple[bool, str]:
         """Cancel bet using macro position"""
-        cancel_pos = self.get_cancel_button_position()
+        snapshot = self.macro.get_snapshot()
+        cancel_pos = self.get_cancel_button_position(snapshot)
         if not cancel_pos:
             self.log("Error: cancel_button_not_configured")
             return False, 'cancel_button_not_configured'
         
-        self.log(f"Clicking cancel button at ({cancel_pos.x},{cancel_pos.y})")
+        # Reuse this round's anchor fix; only search if the table was never located
+        tracker = snapshot.get_anchor_tracker()
+        if tracker is not None and not tracker.found and not tracker.locate():
+            self.log("Error: anchor_not_found")
+            return False, 'anchor_not_found'
+        
+        self.log(f"Clicking cancel button at {self.screen_point(cancel_pos, snapshot)}")
         
         # Calculate how many times to click cancel based on the last bet composition
         if self.last_bet_composition:
@@ -154,13 +368,64 @@ class MacroBaccarat:
             self.log(f"No bet history, using default {clicks_needed} cancel clicks")
         
         # Click cancel button the calculated number of times
-        for i in range(clicks_needed):
-            click_center((cancel_pos.x, cancel_pos.y, cancel_pos.width, cancel_pos.height))
-            time.sleep(0.05)
+        with self.input.turn(0.0, self.table):
+            for i in range(clicks_needed):
+                self.click(cancel_pos, snapshot)
+                input_pause(CLICK_INTERVAL_S)
         
         self.log(f"Cancel: clicked {clicks_needed} time(s)")
         return True, 'ok'
     
+    def warm_up(self, amounts: Iterable[int] = ()) -> Dict[str, object]:
+        """Pay the one-off costs of the first bet before any bet arrives.
+        
+        Captures the screen, runs template matching (and loads and locates the
+        table anchor), issues a no-op mouse move and composes the stakes in
+        amounts (or WARM_UP_MULTIPLES of every chip). Returns per-step
+        durations in ms and any step errors; a failed step does not stop the
+        others.
+        """
+        steps: Dict[str, float] = {}
+        errors: Dict[str, str] = {}
+        frame = None
+        
+        def step(name: str, func: Callable[[], object]) -> object:
+            started = time.perf_counter()
+            try:
+                return func()
+            except Exception as e:
+                errors[name] = str(e)
+                self.log(f"Warm-up {name} failed: {e}")
+            finally:
+                steps[name] = round((time.perf_counter() - started) * 1000.0, 1)
+        
+        def prime_matching() -> None:
+            if frame is not None:
+                match_template(frame[:64, :64], frame[:16, :16], threshold=1.1)
+            snapshot = self.macro.get_snapshot()
+            if snapshot.get_anchor_tracker() is not None and not self.refresh_anchor(snapshot):
+                raise RuntimeError('table anchor not found on screen')
+        
+        def prime_input() -> None:
+            with self.input.turn(0.0, self.table):
+                warm_up_input()
+        
+        def prime_compositions() -> int:
+            snapshot = self.macro.get_snapshot()
+            stakes = [amount for amount in amounts if amount > 0]
+            if not stakes:
+                stakes = [chip * n for chip in snapshot.denominations for n in WARM_UP_MULTIPLES]
+            for amount in stakes:
+                self.compose_amount(amount, snapshot)
+            return len(stakes)
+        
+        frame = step('capture', screenshot)
+        step('matching', prime_matching)
+        step('input', prime_input)
+        stakes = step('compositions', prime_compositions)
+        self.log(f"Warm-up done in {sum(steps.values()):.0f} ms {steps} ({stakes} stake sizes composed)")
+        return {'steps': steps, 'errors': errors}
+    
     def test_chip_click(self, amount: int) -> bool:
         """Test clicking a specific chip amount"""
         chip_pos = self.get_chip_position(amount)
@@ -168,8 +433,8 @@ class MacroBaccarat:
             self.log(f"Test: chip {amount} not found")
             return False
         
-        self.log(f"Test: clicking chip {amount} at ({chip_pos.x},{chip_pos.y})")
-        self.log(f"Test: About to click at coordinates: ({chip_pos.x},{chip_pos.y}) with size ({chip_pos.width},{chip_pos.height})")
-        click_center((chip_pos.x, chip_pos.y, chip_pos.width, chip_pos.height))
+        self.log(f"Test: clicking chip {amount} at {self.screen_point(chip_pos)}")
+        self.log(f"Test: About to click at coordinates: {self.screen_point(chip_pos)} with size ({chip_pos.width},{chip_pos.height})")
+        self.click(chip_pos)
         self.log(f"Test: Click completed for chip {amount}")
         return True 
\ No newline at end of file
@@ -0,0 +1,438 @@
+import os
+import queue
+import sys
+import threading
+from dataclasses import dataclass, asdict, field
+from typing import Callable, Dict, List, Optional, Tuple
+from layout_profiles import DisplaySignature, ProfileIndex, current_display_signature
+from config_snapshot import AnchorRef, ConfigSnapshot, PositionRecord, ChipRecord, build_snapshot
+from config_store import ConfigPersister
+
+@dataclass
+class Position:
+    x: int
+    y: int
+    width: int
+    height: int
+    name: str
+    # Offset from the table anchor's origin in anchor-template pixels (None = absolute only)
+    rel_x: Optional[int] = None
+    rel_y: Optional[int] = None
+
+@dataclass
+class ChipConfig:
+    amount: int
+    position: Position
+
+@dataclass
+class Anchor:
+    template: str  # captured anchor image, relative to the config directory
+    x: int
+    y: int
+    width: int
+    height: int
+
+@dataclass
+class LayoutProfile:
+    name: str
+    display: Optional[DisplaySignature] = None  # display setup this layout was configured on
+    monitor_index: int = 1
+    positions: Dict[str, Position] = field(default_factory=dict)
+    chips: List[ChipConfig] = field(default_factory=list)
+    anchor: Optional[Anchor] = None
+    anchor_ref: Optional[AnchorRef] = field(default=None, repr=False, compare=False)
+
+class MacroConfig:
+    """Layout profiles, snapshot publishing and persistence, without any UI.
+    
+    MacroInterface adds the Tk configuration windows on top; headless
+    clients and tools use this class directly so tkinter is never imported.
+    """
+    
+    def __init__(self, config_path: str = "macro_config.json", match_display: bool = True):
+        # Handle both script and executable paths
+        if getattr(sys, 'frozen', False):
+            # Running as executable (PyInstaller)
+            base_dir = os.path.dirname(sys.executable)
+        else:
+            # Running as script
+            base_dir = os.path.dirname(os.path.abspath(__file__))
+        
+        self.base_dir = base_dir
+        self.config_path = os.path.join(base_dir, config_path)
+        self.positions: Dict[str, Position] = {}
+        self.chips: List[ChipConfig] = []
+        self.anchor: Optional[Anchor] = None
+        # Anchor and tracker of the published snapshot
+        self._anchor_ref: Optional[AnchorRef] = None
+        self.profiles: Dict[str, LayoutProfile] = {}
+        self.active_profile: Optional[str] = None
+        self._profile_index = ProfileIndex()
+        self._display_signature: Optional[DisplaySignature] = None
+        # Published, immutable view of the active layout read by the bet engine
+        self._snapshot_version = 0
+        self._snapshot: ConfigSnapshot = build_snapshot(0, None, {}, [])
+        # Snapshot versions are drawn from one counter by the config thread and by every table's engine
+        self._snapshot_lock = threading.Lock()
+        # Snapshots of inactive profiles, for clients betting on several tables (see TableLayout)
+        self._profile_snapshots: Dict[str, Tuple[LayoutProfile, ConfigSnapshot]] = {}
+        # Called after an external edit was applied
+        self.on_config_reloaded: Optional[Callable[[], None]] = None
+        # External edits wait here for the thread that owns the layout (see apply_external_changes)
+        self._external_changes: "queue.Queue[dict]" = queue.Queue()
+        self._reload_loop = None
+        self._store = ConfigPersister(self.config_path, on_external_change=self._on_external_config_change)
+        self.load_config()
+        # Probing monitors opens mss; the desktop app defers it until after login
+        if match_display:
+            self.select_profile_for_display()
+        self._store.start_watching()
+        
+    def load_config(self):
+        """Load saved positions and chip configurations"""
+        # Define initial chip amounts for convenience
+        self.predefined_chips = [1000, 25000, 125000, 500000, 1250000, 2500000, 5000000, 50000000]
+        
+        if self._store.exists():
+            try:
+                self._apply_config_data(self._store.read())
+                print(f"Configuration loaded from {self.config_path}: {len(self.profiles)} profile(s); "
+                      f"active '{self.active_profile}' has {len(self.positions)} positions and {len(self.chips)} chips")
+            except Exception as e:
+                print(f"Error loading config: {e}")
+                # If there's an error loading, ensure initial chips exist
+                self._ensure_default_profile()
+                self._ensure_predefined_chips_exist()
+        else:
+            print(f"Config file not found: {self.config_path}")
+            # Only ensure initial chips exist if config file doesn't exist
+            self._ensure_default_profile()
+            self._ensure_predefined_chips_exist()
+    
+    def _apply_config_data(self, data: dict):
+        """Replace all profiles with the parsed contents of a config file"""
+        profiles = {}
+        if 'profiles' in data:
+            for name, profile_data in data['profiles'].items():
+                profiles[name] = self._parse_profile(name, profile_data)
+            stored_active = data.get('active_profile')
+        else:
+            # Single-layout file from before profiles existed
+            profiles['default'] = self._parse_profile('default', data)
+            stored_active = 'default'
+        if not profiles:
+            profiles['default'] = LayoutProfile(name='default')
+        
+        # Keep the profile chosen for this display if it still exists
+        if self.active_profile in profiles:
+            active = self.active_profile
+        elif stored_active in profiles:
+            active = stored_active
+        else:
+            active = next(iter(profiles))
+        # Trackers of unchanged anchors keep their fix across the reload
+        self._store_active_profile()
+        for name, profile in profiles.items():
+            previous = self.profiles.get(name)
+            if previous is not None:
+                profile.anchor_ref = self._anchor_ref_for(profile.anchor, previous.anchor_ref)
+        self.profiles = profiles
+        self._rebuild_profile_index()
+        self._activate_profile(active)
+    
+    def _on_external_config_change(self, data: dict):
+        """Config file edited by another program (called on the watcher thread)"""
+        self._external_changes.put(data)
+        loop = self._reload_loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self.apply_external_changes)
+            except RuntimeError:
+                # Loop already closed; nothing left to reload for
+                pass
+    
+    def set_reload_loop(self, loop) -> None:
+        """Apply external edits on this asyncio loop's thread (headless client)"""
+        self._reload_loop = loop
+        loop.call_soon_threadsafe(self.apply_external_changes)
+    
+    def apply_external_changes(self) -> bool:
+        """Apply queued external edits; call on the thread that owns the layout.
+        
+        Only the newest edit matters, as each one holds the whole file.
+        """
+        data = None
+        while True:
+            try:
+                data = self._external_changes.get_nowait()
+            except queue.Empty:
+                break
+        if data is None:
+            return False
+        self._hot_reload(data)
+        return True
+    
+    def _hot_reload(self, data: dict):
+        """Apply an external edit to the live configuration"""
+        try:
+            self._apply_config_data(data)
+        except Exception as e:
+            print(f"Ignoring invalid external config change: {e}")
+            return
+        print(f"Configuration reloaded from {self.config_path} (profile '{self.active_profile}')")
+        if self.on_config_reloaded:
+            self.on_config_reloaded()
+    
+    def _parse_profile(self, name: str, data: dict) -> LayoutProfile:
+        """Build a layout profile from its JSON form"""
+        profile = LayoutProfile(name=name, monitor_index=int(data.get('monitor_index', 1)))
+        display_data = data.get('display')
+        profile.display = DisplaySignature.from_dict(display_data) if display_data else None
+        
+        # Load positions
+        for pos_name, pos_data in data.get('positions', {}).items():
+            profile.positions[pos_name] = Position(**pos_data)
+        
+        # Load chips
+        for chip_data in data.get('chips', []):
+            position = Position(**chip_data['position'])
+            profile.chips.append(ChipConfig(
+                amount=chip_data['amount'],
+                position=position
+            ))
+        
+        # Load anchor
+        anchor_data = data.get('anchor')
+        profile.anchor = Anchor(**anchor_data) if anchor_data else None
+        return profile
+    
+    def _ensure_default_profile(self):
+        """Make sure there is an active profile to edit"""
+        if self.active_profile not in self.profiles:
+            if not self.profiles:
+                self.profiles['default'] = LayoutProfile(name='default')
+                self._rebuild_profile_index()
+            self._activate_profile(next(iter(self.profiles)))
+    
+    def _rebuild_profile_index(self):
+        self._profile_index.rebuild((name, profile.display) for name, profile in self.profiles.items())
+    
+    def _store_active_profile(self):
+        """Write the working layout back into the active profile"""
+        profile = self.profiles.get(self.active_profile)
+        if profile is None:
+            return
+        # It may have been edited while active; rebuild its snapshot when it is read inactive
+        with self._snapshot_lock:
+            self._profile_snapshots.pop(self.active_profile, None)
+        profile.positions = self.positions
+        profile.chips = self.chips
+        profile.anchor = self.anchor
+        profile.anchor_ref = self._anchor_ref_for(self.anchor, self._anchor_ref)
+    
+    def _activate_profile(self, name: str):
+        """Point the working layout at an in-memory profile (no file access)"""
+        profile = self.profiles[name]
+        self.active_profile = name
+        self.positions = profile.positions
+        self.chips = profile.chips
+        self.anchor = profile.anchor
+        self._anchor_ref = profile.anchor_ref
+        try:
+            from cv_utils import set_selected_monitor
+            set_selected_monitor(profile.monitor_index)
+        except Exception as e:
+            print(f"Could not select monitor {profile.monitor_index}: {e}")
+        self.publish_snapshot()
+    
+    def publish_snapshot(self) -> ConfigSnapshot:
+        """Replace the snapshot read by the bet engine with the current working layout"""
+        with self._snapshot_lock:
+            self._snapshot_version += 1
+            version = self._snapshot_version
+        self._anchor_ref = self._anchor_ref_for(self.anchor, self._anchor_ref)
+        snapshot = build_snapshot(version, self.active_profile, self.positions, self.chips, self._anchor_ref)
+        # A single reference assignment, so readers see either the old or the new snapshot
+        self._snapshot = snapshot
+        return snapshot
+    
+    def get_snapshot(self) -> ConfigSnapshot:
+        """Current configuration snapshot (immutable; no locking needed)"""
+        return self._snapshot
+    
+    def switch_profile(self, name: str) -> bool:
+        """Make another layout profile the active one"""
+        if name not in self.profiles:
+            return False
+        if name != self.active_profile:
+            self._store_active_profile()
+            self._activate_profile(name)
+            print(f"Switched to layout profile '{name}'")
+        return True
+    
+    def create_profile(self, name: str, signature: Optional[DisplaySignature] = None) -> LayoutProfile:
+        """Create a profile for the given (default: current) display, seeded from the active layout"""
+        if signature is None:
+            signature = current_display_signature()
+        from cv_utils import SELECTED_MONITOR_INDEX
+        self._store_active_profile()
+        profile = LayoutProfile(
+            name=name,
+            display=signature,
+            monitor_index=SELECTED_MONITOR_INDEX,
+            positions={n: Position(**asdict(pos)) for n, pos in self.positions.items()},
+            chips=[ChipConfig(amount=chip.amount, position=Position(**asdict(chip.position))) for chip in self.chips],
+            anchor=Anchor(**asdict(self.anchor)) if self.anchor else None
+        )
+        self.profiles[name] = profile
+        self._rebuild_profile_index()
+        return profile
+    
+    def select_profile_for_display(self, signature: Optional[DisplaySignature] = None) -> Optional[str]:
+        """Activate the profile recorded for the current display setup, if there is one"""
+        if signature is None:
+            try:
+                signature = current_display_signature()
+            except Exception as e:
+                print(f"Could not probe displays: {e}")
+                return None
+        self._display_signature = signature
+        name = self._profile_index.lookup(signature)
+        if name:
+            self.switch_profile(name)
+        return name
+    
+    def check_display_change(self) -> bool:
+        """Re-select the layout profile if the display setup changed since the last check"""
+        try:
+            signature = current_display_signature()
+        except Exception:
+            return False
+        if signature == self._display_signature:
+            return False
+        self.select_profile_for_display(signature)
+        return True
+    
+    def _ensure_predefined_chips_exist(self):
+        """Ensure all initial chips exist in the config with default positions if not set"""
+        print("Ensuring initial chips exist in config...")
+        
+        # Initial chip amounts
+        initial_chips = [1000, 25000, 125000, 500000, 1250000, 2500000, 5000000, 50000000]
+        
+        for amount in initial_chips:
+            # Check if chip already exists
+            existing_chip = next((chip for chip in self.chips if chip.amount == amount), None)
+            
+            if not existing_chip:
+                # Create chip with default position (not set)
+                default_position = Position(x=0, y=0, width=50, height=50, name=f"chip_{amount}")
+                new_chip = ChipConfig(amount=amount, position=default_position)
+                self.chips.append(new_chip)
+                print(f"Added initial chip {amount} with default position")
+        
+        # Save the updated config immediately
+        self.save_config()
+        print("Initial chips ensured and config saved")
+    
+    def _config_data(self) -> dict:
+        """Serializable form of the current configuration"""
+        self._store_active_profile()
+        profiles = {}
+        for name, profile in self.profiles.items():
+            profiles[name] = {
+                'display': profile.display.to_dict() if profile.display else None,
+                'monitor_index': profile.monitor_index,
+                'positions': {pos_name: asdict(pos) for pos_name, pos in profile.positions.items()},
+                'chips': [{'amount': chip.amount, 'position': asdict(chip.position)} for chip in profile.chips],
+                'anchor': asdict(profile.anchor) if profile.anchor else None
+            }
+        return {'active_profile': self.active_profile, 'profiles': profiles}
+    
+    def save_config(self):
+        """Save current positions and chip configurations"""
+        data = self._config_data()
+        self.publish_snapshot()
+        # Written in the background once edits settle
+        self._store.save(data)
+    
+    def close(self):
+        """Write pending changes and stop watching the config file"""
+        self._store.stop()
+    
+    def get_position(self, name: str) -> Optional[PositionRecord]:
+        """Get a saved position by name"""
+        return self._snapshot.get_position(name)
+    
+    def get_chip_position(self, amount: int) -> Optional[PositionRecord]:
+        """Get position for a specific chip amount"""
+        return self._snapshot.get_chip_position(amount)
+    
+    def get_anchor_tracker(self):
+        """Tracker of the published layout's table anchor (None if no anchor is set)"""
+        return self._snapshot.get_anchor_tracker()
+    
+    def _anchor_ref_for(self, anchor: Optional[Anchor], current: Optional[AnchorRef]) -> Optional[AnchorRef]:
+        """current while it still refers to anchor, otherwise a new (lazily loaded) one"""
+        if anchor is None:
+            return None
+        if current is not None and current.anchor == anchor:
+            return current
+        return AnchorRef(anchor, self._create_anchor_tracker)
+    
+    def _create_anchor_tracker(self, anchor: Anchor):
+        from anchor_tracker import AnchorTracker
+        return AnchorTracker(os.path.join(self.base_dir, anchor.template), (anchor.x, anchor.y))
+    
+    def get_profile_snapshot(self, name: str) -> Optional[ConfigSnapshot]:
+        """Snapshot of any layout profile; for the active one this is the published snapshot"""
+        if name == self.active_profile:
+            return self._snapshot
+        profile = self.profiles.get(name)
+        if profile is None:
+            return None
+        with self._snapshot_lock:
+            cached = self._profile_snapshots.get(name)
+            # A reload replaces the profile objects, which invalidates the cached snapshot
+            if cached is None or cached[0] is not profile:
+                self._snapshot_version += 1
+                profile.anchor_ref = self._anchor_ref_for(profile.anchor, profile.anchor_ref)
+                cached = (profile, build_snapshot(self._snapshot_version, name, profile.positions, profile.chips, profile.anchor_ref))
+                self._profile_snapshots[name] = cached
+        return cached[1]
+    
+    def get_profile_anchor_tracker(self, name: str):
+        """Anchor tracker of any layout profile (None if it has no anchor)"""
+        snapshot = self.get_profile_snapshot(name)
+        return snapshot.get_anchor_tracker() if snapshot is not None else None
+    
+    def get_all_chips(self) -> Tuple[ChipRecord, ...]:
+        """Get all configured chips"""
+        return self._snapshot.chips
+    
+    def is_configured(self) -> bool:
+        """Check if all required positions are configured"""
+        return self._snapshot.is_configured()
+
+
+class TableLayout:
+    """One layout profile of a MacroConfig, seen as the layout of one table.
+    
+    A client betting on several tables gives each table's MacroBaccarat one
+    of these instead of the MacroConfig itself, so every table keeps its own
+    positions, chips and anchor regardless of which profile is active.
+    """
+    
+    def __init__(self, config: MacroConfig, profile: str):
+        self.config = config
+        self.profile = profile
+    
+    def get_snapshot(self) -> ConfigSnapshot:
+        snapshot = self.config.get_profile_snapshot(self.profile)
+        return snapshot if snapshot is not None else build_snapshot(0, self.profile, {}, [])
+    
+    def get_anchor_tracker(self):
+        return self.config.get_profile_anchor_tracker(self.profile)
+    
+    def is_configured(self) -> bool:
+        return self.get_snapshot().is_configured()
@@ -6,21 +6,15 @@ from tkinter import ttk, messagebox, simpledialog
 from typing import Dict, List, Optional, Tuple, Callable
 import threading
 import time
-from dataclasses import dataclass, asdict
+from dataclasses import asdict, replace
 from enum import Enum
+from config_snapshot import AnchorRef
+from macro_config import MacroConfig, Position, ChipConfig, Anchor, LayoutProfile
 
-@dataclass
-class Position:
-    x: int
-    y: int
-    width: int
-    height: int
-    name: str
-
-@dataclass
-class ChipConfig:
-    amount: int
-    position: Position
+# Anchor image captured in the configuration window but not saved yet
+PENDING_ANCHOR_SUFFIX = '.pending.png'
+# How often the Tk thread applies config file edits queued by the watcher
+EXTERNAL_CHANGE_POLL_MS = 250
 
 class SelectionMode(Enum):
     NONE = "none"
@@ -28,120 +22,56 @@ class SelectionMode(Enum):
     BANKER_AREA = "banker_area"
     CANCEL_BUTTON = "cancel_button"
     CHIP = "chip"
+    ANCHOR = "anchor"
 
-class MacroInterface:
-    def __init__(self, root: Optional[tk.Tk] = None, config_path: str = "macro_config.json"):
+class MacroInterface(MacroConfig):
+    def __init__(self, root: Optional[tk.Tk] = None, config_path: str = "macro_config.json",
+                 match_display: bool = True):
         self.root = root
-        
-        # Handle both script and executable paths
-        if getattr(sys, 'frozen', False):
-            # Running as executable (PyInstaller)
-            base_dir = os.path.dirname(sys.executable)
-        else:
-            # Running as script
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        self.config_path = os.path.join(base_dir, config_path)
-        self.positions: Dict[str, Position] = {}
-        self.chips: List[ChipConfig] = []
         self.selection_mode = SelectionMode.NONE
         self.on_position_selected: Optional[Callable] = None
         self.selection_window: Optional[tk.Toplevel] = None
         self.overlay_window: Optional[tk.Toplevel] = None
-        self.load_config()
-        
-    def load_config(self):
-        """Load saved positions and chip configurations"""
-        # Define initial chip amounts for convenience
-        self.predefined_chips = [1000, 25000, 125000, 500000, 1250000, 2500000, 5000000, 50000000]
-        
-        if os.path.exists(self.config_path):
-            try:
-                with open(self.config_path, 'r') as f:
-                    data = json.load(f)
-                    
-                # Load positions
-                for name, pos_data in data.get('positions', {}).items():
-                    self.positions[name] = Position(**pos_data)
-                    print(f"Loaded position: {name} at ({pos_data['x']}, {pos_data['y']})")
-                    
-                # Load chips
-                self.chips = []
-                for chip_data in data.get('chips', []):
-                    position = Position(**chip_data['position'])
-                    self.chips.append(ChipConfig(
-                        amount=chip_data['amount'],
-                        position=position
-                    ))
-                    print(f"Loaded chip: {chip_data['amount']} at ({position.x}, {position.y})")
-                
-                print(f"Configuration loaded successfully from {self.config_path}")
-                print(f"Loaded {len(self.positions)} positions and {len(self.chips)} chips")
-            except Exception as e:
-                print(f"Error loading config: {e}")
-                # If there's an error loading, ensure initial chips exist
-                self._ensure_predefined_chips_exist()
-        else:
-            print(f"Config file not found: {self.config_path}")
-            # Only ensure initial chips exist if config file doesn't exist
-            self._ensure_predefined_chips_exist()
+        self._pending_external: Optional[dict] = None
+        # (anchor, tracker) the configuration window measures offsets with; the bet
+        # engine keeps the published tracker until the configuration is saved
+        self._edit_tracker: Optional[Tuple[Anchor, object]] = None
+        # Loads the configuration and starts watching the file
+        super().__init__(config_path, match_display)
+        if self.root:
+            self._poll_external_changes()
     
-    def _ensure_predefined_chips_exist(self):
-        """Ensure all initial chips exist in the config with default positions if not set"""
-        print("Ensuring initial chips exist in config...")
-        
-        # Initial chip amounts
-        initial_chips = [1000, 25000, 125000, 500000, 1250000, 2500000, 5000000, 50000000]
-        
-        for amount in initial_chips:
-            # Check if chip already exists
-            existing_chip = next((chip for chip in self.chips if chip.amount == amount), None)
-            
-            if not existing_chip:
-                # Create chip with default position (not set)
-                default_position = Position(x=0, y=0, width=50, height=50, name=f"chip_{amount}")
-                new_chip = ChipConfig(amount=amount, position=default_position)
-                self.chips.append(new_chip)
-                print(f"Added initial chip {amount} with default position")
-        
-        # Save the updated config immediately
-        self.save_config()
-        print("Initial chips ensured and config saved")
+    def _poll_external_changes(self):
+        """Apply external edits on the Tk thread; the watcher thread only queues them"""
+        self.apply_external_changes()
+        self.root.after(EXTERNAL_CHANGE_POLL_MS, self._poll_external_changes)
     
-    def save_config(self):
-        """Save current positions and chip configurations"""
-        data = {
-            'positions': {name: asdict(pos) for name, pos in self.positions.items()},
-            'chips': [{'amount': chip.amount, 'position': asdict(chip.position)} for chip in self.chips]
-        }
-        
-        try:
-            with open(self.config_path, 'w') as f:
-                json.dump(data, f, indent=2)
-            print(f"Configuration saved successfully to {self.config_path}")
-            print(f"Saved {len(self.positions)} positions and {len(self.chips)} chips")
-            for name, pos in self.positions.items():
-                print(f"  - {name}: ({pos.x}, {pos.y})")
-            for chip in self.chips:
-                print(f"  - Chip {chip.amount}: ({chip.position.x}, {chip.position.y})")
-        except Exception as e:
-            print(f"Error saving config: {e}")
+    def _hot_reload(self, data: dict):
+        """Apply an external edit unless the configuration window is open"""
+        if self.selection_window is not None:
+            # Do not pull the layout out from under the configuration window;
+            # applied on Cancel, superseded by Save
+            self._pending_external = data
+            print("Config file changed externally; will apply after the configuration window closes")
+            return
+        super()._hot_reload(data)
     
     def start_position_selection(self):
         """Start position selection mode"""
-        # Load config to ensure we have the latest data
-        self.load_config()
-        
-        # Create backup of current state for reverting changes
-        self._backup_positions = {name: Position(**asdict(pos)) for name, pos in self.positions.items()}
-        self._backup_chips = [ChipConfig(amount=chip.amount, position=Position(**asdict(chip.position))) for chip in self.chips]
-        
         # Check if window already exists
         if hasattr(self, 'selection_window') and self.selection_window and self.selection_window.winfo_exists():
             self.selection_window.lift()
             self.selection_window.focus_force()
             return
         
+        # No reload needed: the watcher keeps the in-memory layout in sync with the file
+        # Offsets are measured from where the bet engine last saw the table
+        self._edit_tracker = None
+        # Create backup of current state for reverting changes
+        self._backup_positions = {name: Position(**asdict(pos)) for name, pos in self.positions.items()}
+        self._backup_chips = [ChipConfig(amount=chip.amount, position=Position(**asdict(chip.position))) for chip in self.chips]
+        self._backup_anchor = self.anchor
+        
         print("Creating selection window...")
         self._create_selection_window()
         print("Selection window created successfully")
@@ -224,6 +154,23 @@ class MacroInterface:
                                       command=self._show_all_positions_visual, bg="#9C27B0", fg="white")
         show_positions_btn.pack(side="left", padx=5)
         
+        # Layout profile selection
+        profile_frame = tk.LabelFrame(main_frame, text="Layout Profile", font=("Arial", 10, "bold"))
+        profile_frame.pack(fill="x", pady=(0, 10))
+        
+        self.profile_var = tk.StringVar(value=self.active_profile)
+        self.profile_menu = tk.OptionMenu(profile_frame, self.profile_var, *sorted(self.profiles.keys()),
+                                          command=self._on_profile_selected)
+        self.profile_menu.pack(side="left", padx=5)
+        
+        new_profile_btn = tk.Button(profile_frame, text="New Profile for This Display", 
+                                    command=self._create_profile_for_display)
+        new_profile_btn.pack(side="right", padx=5)
+        
+        self.profile_display_label = tk.Label(main_frame, text="", fg="gray")
+        self.profile_display_label.pack(fill="x")
+        self._update_profile_display_label()
+        
         # Create scrollable frame
         canvas = tk.Canvas(main_frame)
         scrollbar = tk.Scrollbar(main_frame, orient="vertical", command=canvas.yview)
@@ -294,6 +241,20 @@ class MacroInterface:
                               command=lambda: self._start_area_selection(SelectionMode.CANCEL_BUTTON))
         cancel_btn.pack(side="right", padx=5)
         
+        # Table Anchor
+        anchor_frame = tk.Frame(areas_frame)
+        anchor_frame.pack(fill="x", pady=2)
+        
+        anchor_label = tk.Label(anchor_frame, text="Table Anchor (Optional):")
+        anchor_label.pack(side="left", padx=5)
+        
+        self.anchor_status_label = tk.Label(anchor_frame, text="Not set", fg="red")
+        self.anchor_status_label.pack(side="left", padx=5)
+        
+        anchor_btn = tk.Button(anchor_frame, text="Select Position", 
+                              command=lambda: self._start_area_selection(SelectionMode.ANCHOR))
+        anchor_btn.pack(side="right", padx=5)
+        
         # Chips Section
         chips_frame = tk.LabelFrame(scrollable_frame, text="Chips", font=("Arial", 10, "bold"))
         chips_frame.pack(fill="x", padx=5, pady=5)
@@ -371,6 +332,54 @@ class MacroInterface:
         self.selection_window.bind("<Key>", self._on_key_press)
         self.selection_window.focus_set()
     
+    def _update_profile_display_label(self):
+        """Show which display setup the active profile belongs to"""
+        if not hasattr(self, 'profile_display_label'):
+            return
+        profile = self.profiles.get(self.active_profile)
+        if profile and profile.display:
+            text = f"Used on: {profile.display.describe()}"
+        else:
+            text = "Not tied to a display (used when no other profile matches)"
+        self.profile_display_label.config(text=text)
+    
+    def _refresh_profile_menu(self):
+        menu = self.profile_menu['menu']
+        menu.delete(0, 'end')
+        for name in sorted(self.profiles.keys()):
+            menu.add_command(label=name, command=lambda n=name: (self.profile_var.set(n), self._on_profile_selected(n)))
+        self.profile_var.set(self.active_profile)
+    
+    def _on_profile_selected(self, name: str):
+        """Switch the configuration window to another layout profile"""
+        self._update_chip_amounts_from_entries()
+        if not self.switch_profile(name):
+            return
+        # Edits made before switching stay with the previous profile
+        self._backup_positions = {n: Position(**asdict(pos)) for n, pos in self.positions.items()}
+        self._backup_chips = [ChipConfig(amount=chip.amount, position=Position(**asdict(chip.position))) for chip in self.chips]
+        self._backup_anchor = self.anchor
+        self._update_profile_display_label()
+        self._rebuild_chip_ui()
+        self._update_status_displays()
+    
+    def _create_profile_for_display(self):
+        """Create a new profile bound to the current monitors, starting from the active layout"""
+        name = simpledialog.askstring("New Layout Profile", "Profile name:", parent=self.selection_window)
+        if not name:
+            return
+        name = name.strip()
+        if name in self.profiles:
+            messagebox.showwarning("Duplicate Profile", f"Profile '{name}' already exists!")
+            return
+        try:
+            self.create_profile(name)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to create profile: {e}")
+            return
+        self._refresh_profile_menu()
+        self._on_profile_selected(name)
+    
     def _show_all_positions_visual(self):
         """Show visual indicators for all configured positions on screen"""
         # Create a fullscreen overlay to show position indicators
@@ -524,7 +533,8 @@ class MacroInterface:
                 SelectionMode.PLAYER_AREA: "Player Bet Area",
                 SelectionMode.BANKER_AREA: "Banker Bet Area", 
                 SelectionMode.CANCEL_BUTTON: "Cancel Button",
-                SelectionMode.CHIP: "Chip Position"
+                SelectionMode.CHIP: "Chip Position",
+                SelectionMode.ANCHOR: "Table Anchor"
             }.get(self.selection_mode, "Unknown")
             
             self.instruction_label.config(
@@ -573,7 +583,8 @@ class MacroInterface:
                 SelectionMode.PLAYER_AREA: "Player Bet Area",
                 SelectionMode.BANKER_AREA: "Banker Bet Area", 
                 SelectionMode.CANCEL_BUTTON: "Cancel Button",
-                SelectionMode.CHIP: "Chip Position"
+                SelectionMode.CHIP: "Chip Position",
+                SelectionMode.ANCHOR: "Table Anchor"
             }.get(self.selection_mode, "Unknown")
             
             # Update the instruction label
@@ -682,20 +693,31 @@ class MacroInterface:
         if hasattr(self, 'mouse_canvas') and self.mouse_canvas:
             self.mouse_canvas.delete("mouse_circle")
         
+        # The anchor is captured from the screen, so the overlay must be gone first
+        if self.selection_mode == SelectionMode.ANCHOR:
+            self.selection_mode = SelectionMode.NONE
+            try:
+                self.overlay_window.grab_release()
+            except:
+                pass
+            self.overlay_window.withdraw()
+            self.overlay_window.after(200, lambda: self._capture_anchor(x, y))
+            return
+        
         # Store position based on selection mode
         if self.selection_mode == SelectionMode.PLAYER_AREA:
-            self.positions['player_area'] = Position(x=x, y=y, width=50, height=50, name='player_area')
+            self.positions['player_area'] = self._anchored(Position(x=x, y=y, width=50, height=50, name='player_area'))
             print(f"Player area set at ({x}, {y}) - {monitor_info}")
         elif self.selection_mode == SelectionMode.BANKER_AREA:
-            self.positions['banker_area'] = Position(x=x, y=y, width=50, height=50, name='banker_area')
+            self.positions['banker_area'] = self._anchored(Position(x=x, y=y, width=50, height=50, name='banker_area'))
             print(f"Banker area set at ({x}, {y}) - {monitor_info}")
         elif self.selection_mode == SelectionMode.CANCEL_BUTTON:
-            self.positions['cancel_button'] = Position(x=x, y=y, width=50, height=50, name='cancel_button')
+            self.positions['cancel_button'] = self._anchored(Position(x=x, y=y, width=50, height=50, name='cancel_button'))
             print(f"Cancel button set at ({x}, {y}) - {monitor_info}")
         elif self.selection_mode == SelectionMode.CHIP:
             if hasattr(self, '_pending_chip_amount') and self._pending_chip_amount:
                 amount = self._pending_chip_amount
-                position = Position(x=x, y=y, width=50, height=50, name=f"chip_{amount}")
+                position = self._anchored(Position(x=x, y=y, width=50, height=50, name=f"chip_{amount}"))
                 
                 # Check if chip already exists
                 existing_chip = next((chip for chip in self.chips if chip.amount == amount), None)
@@ -725,7 +747,7 @@ class MacroInterface:
                                         "Enter the chip amount:",
                                         minvalue=1, maxvalue=999999999)
         if amount is not None:
-            position = Position(x=x, y=y, width=50, height=50, name=f"chip_{amount}")
+            position = self._anchored(Position(x=x, y=y, width=50, height=50, name=f"chip_{amount}"))
             
             # Check if chip already exists
             existing_chip = next((chip for chip in self.chips if chip.amount == amount), None)
@@ -736,7 +758,7 @@ class MacroInterface:
             
             # Save configuration immediately
             self._update_chip_amounts_from_entries()
-            self.save_config()
+            self._save_with_anchor()
             print("Chip configuration saved immediately")
             
             # Properly reset selection mode and release grab
@@ -916,6 +938,12 @@ class MacroInterface:
             else:
                 self.cancel_status_label.config(text="Not set", fg="red")
         
+        if hasattr(self, 'anchor_status_label'):
+            if self.anchor:
+                self.anchor_status_label.config(text=f"({self.anchor.x}, {self.anchor.y})", fg="green")
+            else:
+                self.anchor_status_label.config(text="Not set", fg="red")
+        
         # Update chip status labels
         if hasattr(self, 'chip_status_labels'):
             for amount, status_label in self.chip_status_labels.items():
@@ -951,7 +979,7 @@ class MacroInterface:
         if messagebox.askyesno("Remove Chip", f"Remove chip {chip.amount}?"):
             self.chips.remove(chip)
             # Save configuration immediately after removing chip
-            self.save_config()
+            self._save_with_anchor()
             print(f"Removed chip {chip.amount} and saved configuration")
             self._rebuild_chip_ui()
             # Bring the message box to front
@@ -1092,52 +1120,103 @@ class MacroInterface:
         elif event.keysym == 'F4' and event.state & 0x20000:  # Alt+F4
             self._cancel_configuration()
     
-    def get_position(self, name: str) -> Optional[Position]:
-        """Get a saved position by name"""
-        return self.positions.get(name)
+    def _editing_tracker(self):
+        """Private tracker for the anchor being edited (None without an anchor)"""
+        if not self.anchor:
+            return None
+        if self._edit_tracker is None or self._edit_tracker[0] != self.anchor:
+            tracker = self._create_anchor_tracker(self.anchor)
+            published = self.get_snapshot().anchor
+            live = published.tracker() if published is not None and published.anchor == self.anchor else None
+            if live is not None and live.found:
+                tracker.reset(live.origin, live.scale)
+            else:
+                # Assume the table has not moved since the anchor was captured
+                tracker.reset((self.anchor.x, self.anchor.y))
+            self._edit_tracker = (self.anchor, tracker)
+        return self._edit_tracker[1]
     
-    def get_chip_position(self, amount: int) -> Optional[Position]:
-        """Get position for a specific chip amount"""
-        for chip in self.chips:
-            if chip.amount == amount:
-                return chip.position
-        return None
+    def _anchored(self, position: Position) -> Position:
+        """Record the position's offset from the anchor's current location"""
+        tracker = self._editing_tracker()
+        if tracker is not None:
+            position.rel_x, position.rel_y = tracker.to_relative(position.x, position.y)
+        return position
+    
+    def _capture_anchor(self, x: int, y: int, width: int = 160, height: int = 80):
+        """Capture the screen area centred on (x, y) as the table anchor template"""
+        try:
+            import cv2
+            from cv_utils import grab_region
+            left, top = x - width // 2, y - height // 2
+            img = grab_region(left, top, width, height)
+            # Kept beside the saved anchor until the configuration is saved, so cancelling restores both
+            template = f"anchor_{self.active_profile}{PENDING_ANCHOR_SUFFIX}"
+            cv2.imwrite(os.path.join(self.base_dir, template), img)
+            self.anchor = Anchor(template=template, x=left, y=top, width=width, height=height)
+            tracker = self._create_anchor_tracker(self.anchor)
+            tracker.reset((left, top))
+            self._edit_tracker = (self.anchor, tracker)
+            # Existing absolute positions were picked for the table at its current place
+            for pos in list(self.positions.values()) + [chip.position for chip in self.chips]:
+                if pos.x > 0:
+                    pos.rel_x, pos.rel_y = tracker.to_relative(pos.x, pos.y)
+            print(f"Anchor captured at ({left}, {top}) {width}x{height}")
+        except Exception as e:
+            print(f"Error capturing anchor: {e}")
+            messagebox.showerror("Anchor", f"Failed to capture anchor: {e}")
+        self._update_status_displays()
+        self._hide_overlay_and_restore_windows()
     
-    def get_all_chips(self) -> List[ChipConfig]:
-        """Get all configured chips"""
-        return self.chips.copy()
+    def _commit_captured_anchor(self):
+        """Move a newly captured anchor image over the profile's saved one and hand its tracker to the bet engine"""
+        if not self.anchor or not self.anchor.template.endswith(PENDING_ANCHOR_SUFFIX):
+            return
+        tracker = self._editing_tracker()
+        from cv_utils import match_mode_path
+        template = self.anchor.template[:-len(PENDING_ANCHOR_SUFFIX)] + '.png'
+        path = os.path.join(self.base_dir, template)
+        os.replace(os.path.join(self.base_dir, self.anchor.template), path)
+        # A match mode calibrated on the previous image does not apply to the new one
+        if os.path.exists(match_mode_path(path)):
+            os.remove(match_mode_path(path))
+        # The tracker already holds the image, so it stays valid
+        self.anchor = replace(self.anchor, template=template)
+        self._edit_tracker = (self.anchor, tracker)
+        # Published with the next snapshot, together with the offsets measured against it
+        self._anchor_ref = AnchorRef(self.anchor, self._create_anchor_tracker, tracker)
+    
+    def _save_with_anchor(self):
+        """Immediate save: chip offsets are relative to a newly captured anchor, so it is saved with them"""
+        self._commit_captured_anchor()
+        self._backup_anchor = self.anchor
+        self.save_config()
+    
+    def _discard_captured_anchor(self):
+        if self.anchor and self.anchor.template.endswith(PENDING_ANCHOR_SUFFIX):
+            try:
+                os.remove(os.path.join(self.base_dir, self.anchor.template))
+            except OSError:
+                pass
     
-    def is_configured(self) -> bool:
-        """Check if all required positions are configured"""
-        required_positions = ['player_area', 'banker_area', 'cancel_button']
-        return all(pos in self.positions for pos in required_positions) 
-
     def _save_configuration(self):
         """Save current configuration to file"""
         # Update chip amounts from entry fields before saving
         self._update_chip_amounts_from_entries()
+        self._commit_captured_anchor()
         
         # Save to file (without ensuring initial chips exist)
-        data = {
-            'positions': {name: asdict(pos) for name, pos in self.positions.items()},
-            'chips': [{'amount': chip.amount, 'position': asdict(chip.position)} for chip in self.chips]
-        }
-        
-        try:
-            with open(self.config_path, 'w') as f:
-                json.dump(data, f, indent=2)
-            print(f"Configuration saved successfully to {self.config_path}")
-            print(f"Saved {len(self.positions)} positions and {len(self.chips)} chips")
-            for name, pos in self.positions.items():
-                print(f"  - {name}: ({pos.x}, {pos.y})")
-            for chip in self.chips:
-                print(f"  - Chip {chip.amount}: ({chip.position.x}, {chip.position.y})")
-        except Exception as e:
-            print(f"Error saving config: {e}")
+        data = self._config_data()
+        self.publish_snapshot()
+        self._store.save(data)
+        # Our own save supersedes an external edit made while the window was open
+        self._pending_external = None
+        print(f"Configuration saved: {len(self.positions)} positions and {len(self.chips)} chips")
         
         # Update backup to current state
         self._backup_positions = {name: Position(**asdict(pos)) for name, pos in self.positions.items()}
         self._backup_chips = [ChipConfig(amount=chip.amount, position=Position(**asdict(chip.position))) for chip in self.chips]
+        self._backup_anchor = self.anchor
         
         # Close the window
         if self.selection_window:
@@ -1152,10 +1231,22 @@ class MacroInterface:
         # Revert chips to backup
         self.chips = [ChipConfig(amount=chip.amount, position=Position(**asdict(chip.position))) for chip in self._backup_chips]
         
+        # Revert anchor to backup; the saved image and the bet engine's tracker were never touched
+        if self.anchor != self._backup_anchor:
+            self._discard_captured_anchor()
+            self.anchor = self._backup_anchor
+        self._edit_tracker = None
+        self.publish_snapshot()
+        
         # Close the window
         if self.selection_window:
             self.selection_window.destroy()
             self.selection_window = None 
+        
+        # Apply an external edit that arrived while the window was open
+        if self._pending_external is not None:
+            data, self._pending_external = self._pending_external, None
+            self._hot_reload(data)
 
     def _hide_overlay_and_restore_windows(self):
         """Hide overlay window and restore configuration and main windows"""
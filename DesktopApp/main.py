@@ -3,25 +3,24 @@ import json
 import threading
 import time
 import sys
-from dataclasses import dataclass
 from typing import Optional
 
-import requests
-import websockets
 import tkinter as tk
 from tkinter import messagebox
 import os
-from datetime import datetime, timezone
 
+from app_config import Config, load_config
+from lazy_import import lazy_module
+from bet_runner import BetRunner
+from controller_client import ControllerClient
 from macro_interface import MacroInterface, SelectionMode
 from macro_betting import MacroBaccarat
 
+# Only needed once the user logs in
+requests = lazy_module('requests', __name__)
 
-@dataclass
-class Config:
-	controller_http: str
-	controller_ws: str
-	raw: dict
+# How often to check for monitor / resolution changes
+DISPLAY_CHECK_MS = 3000
 
 
 class BetAutomationApp:
@@ -30,15 +29,15 @@ class BetAutomationApp:
 		self.token: Optional[str] = None
 		self.current_user: Optional[str] = None
 		self.pc_name: Optional[str] = None
-		self.ws: Optional[websockets.WebSocketClientProtocol] = None
+		self.client: Optional[ControllerClient] = None
 		self.pragmatic = None # Removed: self.pragmatic = PragmaticBaccarat(cfg.raw, logger=self._append_log)
 		self.loop = asyncio.new_event_loop()
 		self.ws_thread = threading.Thread(target=self._run_loop, daemon=True)
-		self.keep_running: bool = False
 		
 		# Macro interface - will be initialized after root is created
 		self.macro_interface = None
 		self.macro_betting = None
+		self.bet_runner = None
 		
 		# UI refs
 		self.root = None
@@ -68,8 +67,15 @@ class BetAutomationApp:
 		# Remove fixed geometry to let window size adjust to content
 
 		# Initialize macro interface after root is created
-		self.macro_interface = MacroInterface(self.root)
-		self.macro_betting = MacroBaccarat(self.macro_interface, logger=self._append_log)
+		# Display matching waits for login so the window is not held up probing monitors
+		self.macro_interface = MacroInterface(self.root, match_display=False)
+		if self.cfg.tables:
+			# One engine per table profile (BET_TABLES); the first one backs the status display
+			self.bet_runner = BetRunner.for_tables(self.macro_interface, self.cfg.tables, log=self._append_log)
+			self.macro_betting = self.bet_runner.macro_betting
+		else:
+			self.macro_betting = MacroBaccarat(self.macro_interface, logger=self._append_log)
+			self.bet_runner = BetRunner(self.macro_betting, log=self._append_log)
 
 		# Main container with padding
 		main_frame = tk.Frame(self.root, padx=20, pady=20)
@@ -222,7 +228,7 @@ class BetAutomationApp:
 			chips = self.macro_interface.chips
 			status_text = f"Ready - {len(positions)} areas, {len(chips)} chips configured"
 			self._set_status(status_text)
-			self._append_log(f"Configuration loaded: {len(positions)} areas, {len(chips)} chips")
+			self._append_log(f"Configuration loaded: {len(positions)} areas, {len(chips)} chips (profile '{self.macro_interface.active_profile}')")
 			
 			# Show detailed configuration
 			self._append_log("Configured positions:")
@@ -257,8 +263,9 @@ class BetAutomationApp:
 			self._show_configure_button(True)
 			self._show_log(True)
 			
-			# Check configuration status after login
-			self.root.after(100, self._check_configuration_status)
+			# Pick the layout profile for this display, report configuration status and warm up
+			self.root.after(100, self._select_display_profile)
+			self.root.after(DISPLAY_CHECK_MS, self._watch_display)
 			
 			# Resize window to fit logged-in content
 			self.root.after(150, self._resize_window_for_logged_in)
@@ -266,6 +273,24 @@ class BetAutomationApp:
 		except Exception as e:
 			messagebox.showerror('Error', f'Login error: {e}')
 
+	def _select_display_profile(self):
+		self.macro_interface.select_profile_for_display()
+		self._check_configuration_status()
+		# Runs in the background so the first bet does not pay for lazy loading
+		self.bet_runner.start_warm_up(self.cfg.warm_up_amounts)
+		if self.cfg.record_dir:
+			self.bet_runner.start_recording(self.cfg.record_dir, self.cfg.record_scale, self.cfg.record_max_mb * 1024 * 1024)
+
+	def _watch_display(self):
+		"""Switch layout profile when monitors or resolution change while logged in"""
+		if not self.token:
+			return
+		previous = self.macro_interface.active_profile
+		if self.macro_interface.check_display_change() and self.macro_interface.active_profile != previous:
+			self._append_log(f"Display changed - using layout profile '{self.macro_interface.active_profile}'")
+			self._check_configuration_status()
+		self.root.after(DISPLAY_CHECK_MS, self._watch_display)
+
 	def _resize_window_for_logged_in(self):
 		"""Resize window to accommodate logged-in content"""
 		self.root.update_idletasks()
@@ -278,12 +303,13 @@ class BetAutomationApp:
 
 	def logout(self):
 		# Stop WS loop and close connection
-		self.keep_running = False
 		try:
-			if self.ws:
-				asyncio.run_coroutine_threadsafe(self.ws.close(), self.loop)
+			if self.client:
+				asyncio.run_coroutine_threadsafe(self.client.close(), self.loop)
 		except Exception:
 			pass
+		self.client = None
+		self.bet_runner.stop_recording()
 		# Clear auth and UI state
 		self.token = None
 		self.current_user = None
@@ -308,126 +334,24 @@ class BetAutomationApp:
 		self.root.geometry(f"{width}x{height}+{x}+{y}")
 
 	def _connect_ws(self, user: str):
-		async def run():
-			self.keep_running = True
-			while self.keep_running:
-				try:
-					async with websockets.connect(self.cfg.controller_ws) as ws:
-						self.ws = ws
-						await ws.send(json.dumps({'type': 'hello', 'token': self.token}))
-						# Request assignment
-						await ws.send(json.dumps({'type': 'requestAssignment'}))
-						self._set_status('Connected. Awaiting assignment...')
-						while self.keep_running:
-							msg = await ws.recv()
-							data = json.loads(msg)
-							self._append_log(f"Recv: {data}")
-							# Respond to server heartbeat
-							if data.get('type') == 'ping':
-								await ws.send(json.dumps({'type': 'pong'}))
-								continue
-							if data.get('type') == 'assignment':
-								self.pc_name = data['pc']
-								await ws.send(json.dumps({'type': 'register', 'pc': self.pc_name}))
-								user_txt = self.current_user or ''
-								self._set_status(f'Logged in as {user_txt} - Assigned as {self.pc_name}. Ready.')
-							elif data.get('type') == 'error':
-								# Invalid token / license issues
-								self._append_log(f"Error: {data.get('message','')}")
-								self.root.after(0, lambda: messagebox.showerror('Connection error', data.get('message', 'Unknown error')))
-								break
-							elif data.get('type') == 'placeBet':
-								self._append_log(f"Cmd: placeBet {data.get('amount')} {data.get('side')}")
-								await self._handle_place_bet(data)
-							elif data.get('type') == 'cancelBet':
-								self._append_log('Cmd: cancelBet')
-								await self._handle_cancel_bet()
-				except Exception as e:
-					if self.keep_running:
-						self._set_status(f'WS error: {e}. Reconnecting...')
-						self._append_log(f'WS error: {e}. Reconnecting...')
-						await asyncio.sleep(3)
-						continue
-					else:
-						break
-
+		def on_status(text: str):
+			if text.startswith('Assigned as'):
+				self.pc_name = self.client.pc_name
+				text = f'Logged in as {self.current_user or ""} - {text}'
+			self._set_status(text)
+
+		def on_error(message: str):
+			self.root.after(0, lambda: messagebox.showerror('Connection error', message))
+
+		self.client = self.bet_runner.create_client(
+			self.cfg.controller_ws,
+			self.token,
+			log=self._append_log,
+			on_status=on_status,
+			on_error=on_error,
+		)
 		# Schedule coroutine on the background event loop thread-safely
-		asyncio.run_coroutine_threadsafe(run(), self.loop)
-
-	async def _handle_place_bet(self, data: dict):
-		platform = data.get('platform', 'Pragmatic')
-		amount = int(data.get('amount', 0))
-		side = data.get('side', 'Player')
-		
-		# Use macro-based betting only
-		if not self.macro_betting.is_configured():
-			self._append_log("Error: Macro positions not configured")
-			await self._send_ws({'type': 'betError', 'message': 'Macro positions not configured', 'platform': platform, 'amount': amount, 'side': side, 'errorType': 'not_configured'})
-			return
-		
-		ok, reason = self.macro_betting.place_bet(amount, side)
-		
-		if ok:
-			self._append_log(f"Bet success: amount={amount} side={side}")
-			await self._send_ws({'type': 'betSuccess', 'platform': platform, 'amount': amount, 'side': side})
-		else:
-			self._append_log(f"Bet error: {reason}")
-			await self._send_ws({'type': 'betError', 'message': self._error_message(reason), 'platform': platform, 'amount': amount, 'side': side, 'errorType': reason})
-
-	async def _handle_cancel_bet(self):
-		# Use macro-based cancel only
-		ok, reason = self.macro_betting.cancel_bet()
-		
-		if not ok:
-			self._append_log(f"Cancel error: {reason}")
-			await self._send_ws({'type': 'betError', 'message': self._error_message(reason), 'errorType': reason})
-		else:
-			self._append_log("Cancel success")
-
-	async def _send_ws(self, obj: dict):
-		try:
-			# Always include pc name if assigned
-			if self.pc_name and 'pc' not in obj:
-				obj['pc'] = self.pc_name
-			# Add timestamp for server/UI logs
-			if 'timestamp' not in obj:
-				obj['timestamp'] = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
-			if self.ws:
-				await self.ws.send(json.dumps(obj))
-				self._append_log(f"Sent: {obj}")
-		except Exception as e:
-			self._append_log(f"Send error: {e}")
-
-	def _error_message(self, code: str) -> str:
-		return {
-			'invalid_side': 'Invalid bet side',
-			'invalid_amount': 'Invalid bet amount',
-			'wrong_tab': 'Cannot place bet: You are not on the betting tab. Please navigate to the casino game.',
-			'not_betting_time': 'Cannot place bet: You are on the right tab but it is not betting time. Please wait for the betting phase.',
-			'cannot_compose_amount': 'Cannot compose amount with available chips',
-			'no_chips_found': 'No chip templates found on screen',
-			'cancel_unavailable': 'Cancel button not configured',
-			'cancel_not_found': 'Cancel button not found',
-			'not_configured': 'Macro positions not configured. Please configure positions first.',
-			'bet_area_not_found': 'Bet area position not found in configuration',
-			'chip_not_found': 'Chip position not found in configuration',
-			'cancel_button_not_configured': 'Cancel button position not configured',
-			'no_chips_configured': 'No chips are configured. Please configure at least one chip position.',
-		}.get(code, code)
-
-
-def load_config() -> Config:
-    server_config = {
-        'controller': {
-            'http_url': 'http://localhost:3000',
-            'ws_url': 'http://localhost:8080'
-        }
-    }
-    return Config(
-        controller_http=server_config['controller']['http_url'],
-        controller_ws=server_config['controller']['ws_url'],
-        raw=server_config
-    )
+		asyncio.run_coroutine_threadsafe(self.client.run(), self.loop)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,191 @@
+"""Process-pool template matching over frames in shared memory.
+
+cv2.matchTemplate releases the GIL, but the Python work around it (scaling,
+masking, minMaxLoc, bookkeeping) does not. On large monitors with many
+templates and scales this makes matching from threads stall. MatchPool
+instead spreads the (template, scale) pairs over worker processes:
+
+- Each frame is copied once into a multiprocessing.shared_memory block.
+  Workers map the block and match against it in place, so the frame itself
+  is never pickled.
+- The templates (and their masks) are sent to every worker once at
+  start-up. Each worker keeps the scaled copies it builds, so a scale sweep
+  pays for resizing only the first time.
+- A request carries only names, scales and the frame shape, and a result is
+  a small tuple per hit.
+
+The pool uses the 'spawn' start method on every platform, matching Windows.
+Frozen executables must therefore call multiprocessing.freeze_support()
+first.
+
+	pool = MatchPool({'chip_1000': (bgr, mask), 'player_area': (bgr, None)}, workers=4)
+	pool.start()
+	img = screenshot()
+	best = pool.find_any(img, ['chip_1000', 'player_area'], threshold=0.8, scales=[0.9, 1.0, 1.1])
+	pool.close()
+
+Results use the cv_utils conventions: (x, y, w, h, score, scale) boxes in
+frame coordinates, found with match_template_masked when the template has a
+mask and with match_template otherwise.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from lazy_import import lazy_module
+
+np = lazy_module('numpy', __name__, 'np')
+
+Hit = Tuple[int, int, int, int, float, float]  # x, y, w, h, score, scale
+Roi = Tuple[int, int, int, int]  # left, top, width, height within the frame
+
+
+class SharedFrame:
+	"""A shared-memory block holding the latest frame as a contiguous uint8 array"""
+
+	def __init__(self):
+		self.shm: Optional[shared_memory.SharedMemory] = None
+		self.shape: Tuple[int, ...] = ()
+
+	def publish(self, img: np.ndarray) -> Tuple[str, Tuple[int, ...]]:
+		"""Copy img into the block (growing it if needed); returns what a worker needs to map it"""
+		if self.shm is None or self.shm.size < img.nbytes:
+			self.close()
+			self.shm = shared_memory.SharedMemory(create=True, size=img.nbytes)
+		self.shape = img.shape
+		view = np.ndarray(img.shape, dtype=np.uint8, buffer=self.shm.buf)
+		# Also makes mss' non-contiguous BGR view contiguous, which matchTemplate wants anyway
+		np.copyto(view, img, casting='no')
+		return self.shm.name, self.shape
+
+	def close(self) -> None:
+		if self.shm is not None:
+			self.shm.close()
+			self.shm.unlink()
+			self.shm = None
+
+
+# ----- worker side -----
+
+_templates: Dict[str, Tuple[np.ndarray, Optional[np.ndarray]]] = {}
+_scaled: Dict[Tuple[str, float], Tuple[np.ndarray, Optional[np.ndarray]]] = {}
+_attached: Optional[shared_memory.SharedMemory] = None
+
+
+def _init_worker(templates: Dict[str, Tuple[np.ndarray, Optional[np.ndarray]]]) -> None:
+	global _templates
+	_templates = templates
+	_scaled.clear()
+
+
+def _frame(shm_name: str, shape: Tuple[int, ...]) -> np.ndarray:
+	global _attached
+	if _attached is None or _attached.name != shm_name:
+		if _attached is not None:
+			_attached.close()
+		_attached = shared_memory.SharedMemory(name=shm_name)
+	return np.ndarray(shape, dtype=np.uint8, buffer=_attached.buf)
+
+
+def _template(name: str, scale: float) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+	"""The template (and mask) at scale, the same way match_template_multiscale_masked scales them"""
+	key = (name, scale)
+	cached = _scaled.get(key)
+	if cached is None:
+		from cv_utils import resize_image, resize_mask
+		bgr, mask = _templates[name]
+		if scale != 1.0:
+			bgr = resize_image(bgr, scale)
+			mask = resize_mask(mask, scale) if mask is not None else None
+			if mask is not None and mask.shape[:2] != bgr.shape[:2]:
+				mask = None
+		cached = _scaled[key] = (bgr, mask)
+	return cached
+
+
+def _match_batch(shm_name: str, shape: Tuple[int, ...], roi: Optional[Roi], jobs: List[Tuple[str, float]],
+		threshold: float) -> List[Tuple[str, Hit]]:
+	"""Best hit above threshold for each (template, scale) job, in frame coordinates"""
+	from cv_utils import match_template, match_template_masked
+	img = _frame(shm_name, shape)
+	left = top = 0
+	if roi is not None:
+		left, top, width, height = roi
+		img = img[top:top + height, left:left + width]
+	hits = []
+	for name, scale in jobs:
+		tpl, mask = _template(name, scale)
+		if mask is not None:
+			res = match_template_masked(img, tpl, mask, threshold)
+		else:
+			res = match_template(img, tpl, threshold)
+		if res is not None:
+			x, y, w, h, score = res
+			hits.append((name, (x + left, y + top, w, h, float(score), scale)))
+	return hits
+
+
+# ----- caller side -----
+
+class MatchPool:
+	def __init__(self, templates: Dict[str, Tuple[np.ndarray, Optional[np.ndarray]]], workers: Optional[int] = None):
+		"""templates: name -> (BGR template, mask or None)"""
+		self.templates = templates
+		self.workers = workers or os.cpu_count() or 1
+		self._frame = SharedFrame()
+		self._executor: Optional[ProcessPoolExecutor] = None
+		# One frame is in flight at a time: publishing the next one would overwrite it
+		self._lock = threading.Lock()
+
+	def start(self) -> None:
+		if self._executor is not None:
+			return
+		self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+			initializer=_init_worker, initargs=(self.templates,))
+		# Spawning happens lazily on first submit; do it now so the first frame is not slow
+		for future in [self._executor.submit(os.getpid) for _ in range(self.workers)]:
+			future.result()
+
+	def close(self) -> None:
+		if self._executor is not None:
+			self._executor.shutdown(wait=True)
+			self._executor = None
+		self._frame.close()
+
+	def __enter__(self) -> 'MatchPool':
+		self.start()
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.close()
+
+	def match(self, img: np.ndarray, names: Sequence[str], threshold: float = 0.8,
+			scales: Sequence[float] = (1.0,), roi: Optional[Roi] = None) -> Dict[str, Optional[Hit]]:
+		"""Best hit per template over all scales (None where nothing reaches threshold)"""
+		self.start()
+		jobs = [(name, float(scale)) for name in names for scale in scales]
+		# Interleave so every worker gets a mix of large and small templates
+		batches = [jobs[i::self.workers] for i in range(min(self.workers, len(jobs)))]
+		best: Dict[str, Optional[Hit]] = {name: None for name in names}
+		with self._lock:
+			shm_name, shape = self._frame.publish(img)
+			futures = [self._executor.submit(_match_batch, shm_name, shape, roi, batch, threshold) for batch in batches]
+			for future in futures:
+				for name, hit in future.result():
+					if best[name] is None or hit[4] > best[name][4]:
+						best[name] = hit
+		return best
+
+	def find_any(self, img: np.ndarray, names: Sequence[str], threshold: float = 0.8,
+			scales: Sequence[float] = (1.0,), roi: Optional[Roi] = None) -> Optional[Tuple[int, int, int, int, float, str]]:
+		"""Like cv_utils.find_any but returns the template name: (x, y, w, h, score, name)"""
+		best = None
+		for name, hit in self.match(img, names, threshold, scales, roi).items():
+			if hit is not None and (best is None or hit[4] > best[4]):
+				best = (*hit[:5], name)
+		return best
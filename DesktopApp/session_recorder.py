@@ -0,0 +1,195 @@
+"""Opt-in recorder of what the client saw and did, for investigating misfires.
+
+A background thread captures a frame every `interval_s` and whenever
+request_frame() is called (e.g. when a bet starts and ends). The frame is
+either downscaled or cropped to a region of interest, and it goes into a
+frame_source archive in the recording directory. Every click (through
+cv_utils.set_input_observer) and every bet command and result is written to
+events-NNNNN.jsonl next to it. Timestamps on both use clock_sync.local_ms()
+so frames and events line up.
+
+Bet-path calls (record_event, request_frame and the click observer) only
+append to a queue; capture, scaling and disk writes all happen on the
+recorder thread. When the directory grows past `max_bytes` the oldest frame
+chunks are deleted first, then the oldest event files.
+
+	recorder = SessionRecorder('recordings/2024-05-01', scale=0.5)
+	recorder.start()
+	...
+	recorder.stop()
+
+Frames replay with frame_source.ReplayFrameSource(path); read_events(path)
+yields the events in order.
+"""
+from __future__ import annotations
+
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from typing import Iterator, Optional, Tuple
+
+import cv_utils
+from clock_sync import local_ms
+from frame_source import FrameArchiveWriter, FrameInfo, FrameSource, LiveFrameSource
+from lazy_import import lazy_module
+
+cv2 = lazy_module('cv2', __name__)
+
+DEFAULT_INTERVAL_S = 1.0
+DEFAULT_SCALE = 0.5
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+EVENTS_PER_FILE = 5000
+# Frames per archive chunk; also the granularity at which old frames are deleted
+CHUNK_FRAMES = 30
+# Bet-path calls never block: beyond this many pending items new ones are dropped
+QUEUE_LIMIT = 1024
+
+
+def read_events(path: str) -> Iterator[dict]:
+	"""Events of a recording, oldest first"""
+	for name in sorted(glob.glob(os.path.join(path, 'events-*.jsonl'))):
+		with open(name, 'r') as f:
+			for line in f:
+				if line.strip():
+					yield json.loads(line)
+
+
+class SessionRecorder:
+	def __init__(self, path: str, scale: float = DEFAULT_SCALE, roi: Optional[Tuple[int, int, int, int]] = None,
+			interval_s: float = DEFAULT_INTERVAL_S, max_bytes: int = DEFAULT_MAX_BYTES,
+			source: Optional[FrameSource] = None, log=None):
+		"""roi: (left, top, width, height) in global screen coordinates; None records the whole monitor"""
+		self.path = path
+		self.scale = scale
+		self.roi = roi
+		self.interval_s = interval_s
+		self.max_bytes = max_bytes
+		self.source = source or LiveFrameSource()
+		self.log = log or (lambda msg: None)
+		self.dropped = 0
+		self.frames_written = 0
+		self._frame_pending = False
+		self._queue: queue.Queue = queue.Queue(QUEUE_LIMIT)
+		self._thread: Optional[threading.Thread] = None
+		self._writer: Optional[FrameArchiveWriter] = None
+		self._events_file = None
+		self._events_index = 0
+		self._events_in_file = 0
+
+	def start(self) -> None:
+		os.makedirs(self.path, exist_ok=True)
+		self._writer = FrameArchiveWriter(self.path, chunk_frames=CHUNK_FRAMES,
+			meta={'scale': self.scale, 'roi': self.roi, 'started_ms': local_ms()})
+		cv_utils.set_input_observer(self._on_input)
+		self._thread = threading.Thread(target=self._run, name='session-recorder', daemon=True)
+		self._thread.start()
+		self.log(f"Recording session to {self.path}")
+
+	def stop(self) -> None:
+		if self._thread is None:
+			return
+		cv_utils.set_input_observer(None)
+		self._queue.put(None)
+		self._thread.join()
+		self._thread = None
+
+	def _put(self, item) -> None:
+		try:
+			self._queue.put_nowait(item)
+		except queue.Full:
+			self.dropped += 1
+
+	def record_event(self, kind: str, **data) -> None:
+		"""Log an event (bet command, result, ...); cheap enough for the bet path"""
+		data['t_ms'] = local_ms()
+		data['kind'] = kind
+		self._put(data)
+
+	def request_frame(self) -> None:
+		"""Capture a frame as soon as the recorder thread gets to it"""
+		# Requests made before the thread gets to the first one share its frame
+		if not self._frame_pending:
+			self._frame_pending = True
+			self._put('frame')
+
+	def _on_input(self, kind: str, x: int, y: int) -> None:
+		self.record_event(kind, x=x, y=y)
+
+	def _run(self) -> None:
+		try:
+			self._capture()
+			# Periodic frames are due by the clock, also while events keep arriving (e.g. clicks during a bet)
+			next_due = time.monotonic() + self.interval_s
+			while True:
+				try:
+					item = self._queue.get(timeout=max(0.0, next_due - time.monotonic()))
+				except queue.Empty:
+					item = 'tick'
+				if item is None:
+					break
+				if item not in ('frame', 'tick'):
+					self._write_event(item)
+				if item == 'frame' or time.monotonic() >= next_due:
+					self._capture()
+					next_due = time.monotonic() + self.interval_s
+		finally:
+			self._writer.close()
+			if self._events_file is not None:
+				self._events_file.close()
+
+	def _capture(self) -> None:
+		self._frame_pending = False
+		try:
+			t_ms = local_ms()
+			if self.roi is not None:
+				left, top, width, height = self.roi
+				frame = self.source.region(left, top, width, height)
+			else:
+				frame = self.source.frame()
+				left, top = self.source.origin()
+			if self.scale != 1.0:
+				h, w = frame.shape[:2]
+				size = (max(1, round(w * self.scale)), max(1, round(h * self.scale)))
+				frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+			self._writer.write(frame, FrameInfo(t_ms, left, top, self.scale))
+			self.frames_written += 1
+		except Exception as e:
+			self.log(f"Recorder capture failed: {e}")
+			return
+		self._enforce_limit()
+
+	def _write_event(self, event: dict) -> None:
+		if self._events_file is None or self._events_in_file >= EVENTS_PER_FILE:
+			if self._events_file is not None:
+				self._events_file.close()
+			name = os.path.join(self.path, f"events-{self._events_index:05d}.jsonl")
+			self._events_index += 1
+			self._events_file = open(name, 'w')
+			self._events_in_file = 0
+		self._events_file.write(json.dumps(event, default=str) + '\n')
+		self._events_file.flush()
+		self._events_in_file += 1
+
+	def disk_usage(self) -> int:
+		return sum(os.path.getsize(p) for p in glob.glob(os.path.join(self.path, '*')) if os.path.isfile(p))
+
+	def _enforce_limit(self) -> None:
+		used = self.disk_usage()
+		while used > self.max_bytes:
+			freed = self._writer.drop_oldest_chunk()
+			if not freed:
+				freed = self._drop_oldest_events()
+			if not freed:
+				break
+			used -= freed
+
+	def _drop_oldest_events(self) -> int:
+		files = sorted(glob.glob(os.path.join(self.path, 'events-*.jsonl')))
+		if len(files) < 2:
+			return 0
+		freed = os.path.getsize(files[0])
+		os.remove(files[0])
+		return freed
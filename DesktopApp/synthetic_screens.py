@@ -0,0 +1,159 @@
+"""Synthetic table screens for benchmarking and testing the template matchers.
+
+Composites the PNGs in assets/ (chips, bet areas, cancel button) onto
+generated backgrounds at a chosen screen resolution, object scale and noise
+level, and returns the screen together with the ground-truth box of every
+pasted object. Everything is derived from a seed, so a screen can be
+regenerated exactly.
+"""
+import glob
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from cv_utils import BASE_DIR
+
+# Largest side of a template as a user would capture it from a 1080p table;
+# some chip assets are 1000 px renders and are shrunk to this
+CAPTURE_SIZE = 140
+BACKGROUNDS = ('felt', 'gradient', 'clutter')
+
+Box = Tuple[int, int, int, int]
+
+
+@dataclass
+class Template:
+	name: str
+	bgr: np.ndarray
+	alpha: Optional[np.ndarray]  # None for opaque templates
+
+
+@dataclass
+class Placement:
+	name: str
+	box: Box  # x, y, w, h on the screen
+	scale: float
+
+
+@dataclass
+class Screen:
+	image: np.ndarray
+	placements: List[Placement]
+	background: str
+	noise: float
+
+	def box_of(self, name: str) -> Optional[Box]:
+		for placement in self.placements:
+			if placement.name == name:
+				return placement.box
+		return None
+
+
+def load_template(path: str, name: Optional[str] = None) -> Optional[Template]:
+	"""One asset PNG as a template, shrunk to CAPTURE_SIZE if larger (None if unreadable)"""
+	img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+	if img is None:
+		return None
+	name = name or os.path.splitext(os.path.basename(path))[0]
+	if img.ndim == 2:
+		img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+	bgr, alpha = (img[:, :, :3], img[:, :, 3]) if img.shape[2] == 4 else (img, None)
+	factor = CAPTURE_SIZE / max(bgr.shape[:2])
+	if factor < 1.0:
+		size = (max(1, round(bgr.shape[1] * factor)), max(1, round(bgr.shape[0] * factor)))
+		bgr = cv2.resize(bgr, size, interpolation=cv2.INTER_AREA)
+		alpha = cv2.resize(alpha, size, interpolation=cv2.INTER_AREA) if alpha is not None else None
+	return Template(name, np.ascontiguousarray(bgr), alpha)
+
+
+def template_name(path: str) -> str:
+	"""'chip_<amount>' for files in a chips/ directory, else the file name without extension"""
+	stem = os.path.splitext(os.path.basename(path))[0]
+	return f"chip_{stem}" if os.path.basename(os.path.dirname(path)) == 'chips' else stem
+
+
+def load_templates(assets_dir: Optional[str] = None) -> Dict[str, Template]:
+	"""Every asset PNG, keyed by template_name()"""
+	assets_dir = assets_dir or os.path.join(BASE_DIR, 'assets')
+	templates = {}
+	paths = sorted(glob.glob(os.path.join(assets_dir, '*.png'))) + sorted(glob.glob(os.path.join(assets_dir, 'chips', '*.png')))
+	for path in paths:
+		name = template_name(path)
+		template = load_template(path, name)
+		if template is not None:
+			templates[name] = template
+	return templates
+
+
+def make_background(width: int, height: int, kind: str, rng: np.random.Generator) -> np.ndarray:
+	if kind == 'felt':
+		# Casino-table green with a vignette
+		base = np.array([40, 110, 30], dtype=np.float32) * rng.uniform(0.8, 1.2)
+		yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+		dist = np.sqrt(((xx - width / 2) / width) ** 2 + ((yy - height / 2) / height) ** 2)
+		img = base[None, None, :] * (1.0 - 0.8 * dist[:, :, None])
+	elif kind == 'gradient':
+		top, bottom = rng.uniform(0, 255, 3), rng.uniform(0, 255, 3)
+		t = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None, None]
+		img = np.broadcast_to(top * (1.0 - t) + bottom * t, (height, width, 3))
+	elif kind == 'clutter':
+		# UI-like rectangles and lines that the matchers must ignore
+		img = np.full((height, width, 3), rng.uniform(20, 60), dtype=np.float32)
+		for _ in range(60):
+			x0, y0 = int(rng.integers(0, width)), int(rng.integers(0, height))
+			x1, y1 = x0 + int(rng.integers(20, width // 4)), y0 + int(rng.integers(10, height // 6))
+			color = tuple(float(c) for c in rng.uniform(0, 255, 3))
+			cv2.rectangle(img, (x0, y0), (x1, y1), color, -1 if rng.random() < 0.6 else 3)
+	else:
+		raise ValueError(f"Unknown background '{kind}'")
+	return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def paste(screen: np.ndarray, template: Template, x: int, y: int, scale: float) -> Box:
+	bgr, alpha = template.bgr, template.alpha
+	if scale != 1.0:
+		size = (max(1, round(bgr.shape[1] * scale)), max(1, round(bgr.shape[0] * scale)))
+		interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+		bgr = cv2.resize(bgr, size, interpolation=interpolation)
+		alpha = cv2.resize(alpha, size, interpolation=interpolation) if alpha is not None else None
+	h, w = bgr.shape[:2]
+	target = screen[y:y + h, x:x + w]
+	if alpha is None:
+		target[:] = bgr
+	else:
+		a = (alpha.astype(np.float32) / 255.0)[:, :, None]
+		target[:] = (bgr * a + target * (1.0 - a)).astype(np.uint8)
+	return x, y, w, h
+
+
+def generate_screen(templates: Dict[str, Template], names: List[str], width: int, height: int,
+		scale: float = 1.0, noise: float = 0.0, background: str = 'felt', seed: int = 0) -> Screen:
+	"""Screen showing the templates `names` once each at random, non-overlapping positions"""
+	rng = np.random.default_rng(seed)
+	image = make_background(width, height, background, rng)
+	placements: List[Placement] = []
+	for name in names:
+		tpl = templates[name]
+		h, w = round(tpl.bgr.shape[0] * scale), round(tpl.bgr.shape[1] * scale)
+		for _ in range(100):
+			x, y = int(rng.integers(0, width - w)), int(rng.integers(0, height - h))
+			if all(iou((x, y, w, h), p.box) == 0.0 for p in placements):
+				break
+		placements.append(Placement(name, paste(image, tpl, x, y, scale), scale))
+	if noise > 0:
+		noisy = image.astype(np.float32) + rng.normal(0.0, noise, image.shape).astype(np.float32)
+		image = np.clip(noisy, 0, 255).astype(np.uint8)
+	return Screen(image, placements, background, noise)
+
+
+def iou(a: Box, b: Box) -> float:
+	ax, ay, aw, ah = a
+	bx, by, bw, bh = b
+	ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+	iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+	inter = ix * iy
+	union = aw * ah + bw * bh - inter
+	return inter / union if union else 0.0
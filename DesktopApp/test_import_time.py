@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Import-time budget: the login window must not wait for cv2, numpy, mss,
+pyautogui, requests or websockets. Each module is imported in a fresh
+interpreter so earlier imports do not hide the cost.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+# Milliseconds allowed for `import main`; generous for slow machines, the
+# heavy-module check is the stricter guard
+BUDGET_MS = 400
+HEAVY_MODULES = ('cv2', 'numpy', 'mss', 'pyautogui', 'requests', 'websockets')
+MODULES = ('main', 'cv_utils', 'macro_config', 'macro_betting', 'bet_runner', 'controller_client')
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - started) * 1000.0
+print(json.dumps({{'ms': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module):
+    here = os.path.dirname(os.path.abspath(__file__))
+    out = subprocess.run([sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                         cwd=here, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_import_time():
+    for module in MODULES:
+        result = measure(module)
+        print(f"import {module}: {result['ms']:.0f} ms, heavy modules loaded: {result['loaded'] or 'none'}")
+        assert not result['loaded'], f"import {module} loads {result['loaded']}"
+    result = measure('main')
+    assert result['ms'] < BUDGET_MS, f"import main took {result['ms']:.0f} ms (budget {BUDGET_MS} ms)"
+
+
+if __name__ == "__main__":
+    test_import_time()
+    print("Import-time budget OK")